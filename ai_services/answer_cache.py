@@ -0,0 +1,112 @@
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from config import (
+    logger, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL,
+    ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_MAX_LECTURES
+)
+
+# 강의별 의미 기반 답변 캐시
+# task_id → OrderedDict(entry_id → {"tone", "question", "embedding", "answer", "created_at"})
+# 강의 목록과 강의별 항목 모두 LRU 순서로 유지
+answer_cache = OrderedDict()
+cache_lock = threading.Lock()
+
+cache_stats = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0,
+    "expired": 0
+}
+
+_next_entry_id = 0
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+def _purge_expired(entries, now):
+    """TTL이 지난 항목 제거"""
+    expired = [entry_id for entry_id, entry in entries.items() if now - entry["created_at"] > ANSWER_CACHE_TTL]
+    for entry_id in expired:
+        del entries[entry_id]
+    cache_stats["expired"] += len(expired)
+
+def lookup_answer(task_id, tone, question_embedding):
+    """
+    같은 강의/어조에서 유사한 이전 질문의 답변 조회
+    코사인 유사도가 기준값 이상인 가장 유사한 항목이 있으면 답변 반환, 없으면 None
+    """
+    query = _normalize(question_embedding)
+    now = time.time()
+
+    with cache_lock:
+        entries = answer_cache.get(task_id)
+        if entries:
+            _purge_expired(entries, now)
+
+        candidates = [
+            (entry_id, entry) for entry_id, entry in (entries or {}).items() if entry["tone"] == tone
+        ]
+        if not candidates:
+            cache_stats["misses"] += 1
+            return None
+
+        similarities = np.stack([entry["embedding"] for _, entry in candidates]) @ query
+        best = int(np.argmax(similarities))
+        if similarities[best] < ANSWER_CACHE_THRESHOLD:
+            cache_stats["misses"] += 1
+            return None
+
+        entry_id, entry = candidates[best]
+        entries.move_to_end(entry_id)
+        answer_cache.move_to_end(task_id)
+        cache_stats["hits"] += 1
+
+    logger.info(f"답변 캐시 적중: {task_id} (유사도 {similarities[best]:.3f})")
+    return entry["answer"]
+
+def store_answer(task_id, tone, question, question_embedding, answer):
+    """답변을 캐시에 저장 (강의별/전체 용량 초과 시 가장 오래 사용되지 않은 항목 제거)"""
+    global _next_entry_id
+
+    with cache_lock:
+        entries = answer_cache.get(task_id)
+        if entries is None:
+            entries = OrderedDict()
+            answer_cache[task_id] = entries
+        answer_cache.move_to_end(task_id)
+
+        entries[_next_entry_id] = {
+            "tone": tone,
+            "question": question,
+            "embedding": _normalize(question_embedding),
+            "answer": answer,
+            "created_at": time.time()
+        }
+        _next_entry_id += 1
+
+        while len(entries) > ANSWER_CACHE_MAX_ENTRIES:
+            entries.popitem(last=False)
+            cache_stats["evictions"] += 1
+
+        while len(answer_cache) > ANSWER_CACHE_MAX_LECTURES:
+            _, evicted = answer_cache.popitem(last=False)
+            cache_stats["evictions"] += len(evicted)
+
+def invalidate_answers(task_id):
+    """강의 내용이 바뀌면(재인덱싱) 해당 강의 캐시 삭제"""
+    with cache_lock:
+        answer_cache.pop(task_id, None)
+
+def get_answer_cache_stats():
+    """답변 캐시 적중/미스 통계 반환"""
+    with cache_lock:
+        stats = dict(cache_stats)
+        stats["lectures"] = len(answer_cache)
+        stats["entries"] = sum(len(entries) for entries in answer_cache.values())
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / total if total else 0.0
+    return stats
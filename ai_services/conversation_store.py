@@ -0,0 +1,73 @@
+import time
+from config import logger, CONVERSATION_DB_PATH, CONVERSATION_HISTORY_SIZE
+from utils.db_utils import get_connection
+
+# 강의별 질의응답 대화 기록 (SQLite - 여러 gunicorn 워커 프로세스가 같은 기록을 공유)
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_task ON messages(task_id, id);
+"""
+
+_initialized = False
+
+def _connect():
+    global _initialized
+    conn = get_connection(CONVERSATION_DB_PATH)
+    if not _initialized:
+        conn.executescript(_SCHEMA)
+        _initialized = True
+    return conn
+
+def get_conversation(task_id, limit=CONVERSATION_HISTORY_SIZE):
+    """최근 대화 기록 [(역할, 내용), ...] 반환 (오래된 순)"""
+    try:
+        conn = _connect()
+        try:
+            rows = conn.execute(
+                "SELECT role, content FROM messages WHERE task_id = ? ORDER BY id DESC LIMIT ?",
+                (task_id, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"대화 기록 조회 실패: {task_id} - {str(e)}")
+        return []
+    return [(row["role"], row["content"]) for row in reversed(rows)]
+
+def add_message(task_id, role, content, limit=CONVERSATION_HISTORY_SIZE):
+    """대화 기록에 메시지 추가 (최근 limit개만 유지)"""
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO messages (task_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                    (task_id, role, content, time.time())
+                )
+                conn.execute(
+                    "DELETE FROM messages WHERE task_id = ? AND id NOT IN "
+                    "(SELECT id FROM messages WHERE task_id = ? ORDER BY id DESC LIMIT ?)",
+                    (task_id, task_id, limit)
+                )
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"대화 기록 저장 실패: {task_id} - {str(e)}")
+
+def clear_conversation(task_id):
+    """강의의 대화 기록 삭제 (강의 내용이 바뀌었을 때)"""
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM messages WHERE task_id = ?", (task_id,))
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"대화 기록 삭제 실패: {task_id} - {str(e)}")
@@ -0,0 +1,138 @@
+import os
+import time
+import hashlib
+import threading
+import numpy as np
+from config import (
+    logger, EMBEDDING_MODEL, EMBEDDING_DIM, EMBEDDING_BATCH_SIZE, CACHE_FOLDER
+)
+from utils.db_utils import get_connection
+from utils.model_loader import register_model, configure_torch_threads
+
+def _load_embedding_model():
+    # llama_index/torch import가 무거우므로 처음 사용할 때 import
+    configure_torch_threads()
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    from llama_index.core import Settings
+
+    model = HuggingFaceEmbedding(model_name=EMBEDDING_MODEL)
+    Settings.embed_model = model
+    return model
+
+# HuggingFace 임베딩 모델 (처음 사용할 때 로드)
+embedding_model = register_model("embedding", _load_embedding_model)
+
+# 임베딩 캐시 (청크 텍스트 + 모델명 해시 → 벡터)
+EMBEDDING_CACHE_PATH = os.path.join(CACHE_FOLDER, "embeddings.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    vector BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+# 누적 통계
+embedding_stats = {
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "embedded_texts": 0,
+    "embedding_seconds": 0.0
+}
+stats_lock = threading.Lock()
+
+def _connect():
+    conn = get_connection(EMBEDDING_CACHE_PATH)
+    conn.executescript(_SCHEMA)
+    return conn
+
+def _cache_key(text):
+    """청크 텍스트와 모델명으로 캐시 키 생성"""
+    return hashlib.sha256(f"{EMBEDDING_MODEL}\n{text}".encode('utf-8')).hexdigest()
+
+def _load_cached(conn, keys):
+    """캐시에서 키 목록에 해당하는 벡터 조회 (SQLite 변수 개수 제한 고려하여 나누어 조회)"""
+    cached = {}
+    unique_keys = list(set(keys))
+    for start in range(0, len(unique_keys), 500):
+        batch = unique_keys[start:start + 500]
+        placeholders = ",".join("?" * len(batch))
+        for row in conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch):
+            cached[row["key"]] = np.frombuffer(row["vector"], dtype=np.float32)
+    return cached
+
+def embed_texts(texts, batch_size=EMBEDDING_BATCH_SIZE):
+    """
+    텍스트 목록 임베딩 (캐시 우선 조회, 미스만 배치 단위로 임베딩 후 캐시에 저장)
+    반환값: (len(texts), EMBEDDING_DIM) float32 배열
+    """
+    model = embedding_model.get()
+
+    vectors = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    if not texts:
+        return vectors
+
+    keys = [_cache_key(text) for text in texts]
+    conn = _connect()
+    try:
+        cached = _load_cached(conn, keys)
+
+        # 캐시에 없는 텍스트만 (중복 제거 후) 임베딩
+        missing = {}
+        for i, key in enumerate(keys):
+            if key in cached:
+                vectors[i] = cached[key]
+            else:
+                missing.setdefault(key, []).append(i)
+
+        missing_keys = list(missing.keys())
+        total_seconds = 0.0
+        for start in range(0, len(missing_keys), batch_size):
+            batch_keys = missing_keys[start:start + batch_size]
+            batch_texts = [texts[missing[key][0]] for key in batch_keys]
+
+            started = time.time()
+            batch_vectors = np.asarray(model.get_text_embedding_batch(batch_texts), dtype=np.float32)
+            elapsed = time.time() - started
+            total_seconds += elapsed
+
+            logger.info(
+                f"임베딩 배치 {start // batch_size + 1}: {len(batch_texts)}개, "
+                f"{elapsed:.2f}초 ({len(batch_texts) / max(elapsed, 1e-6):.1f}개/초)"
+            )
+
+            now = time.time()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                    [(key, vector.tobytes(), now) for key, vector in zip(batch_keys, batch_vectors)]
+                )
+
+            for key, vector in zip(batch_keys, batch_vectors):
+                for i in missing[key]:
+                    vectors[i] = vector
+    finally:
+        conn.close()
+
+    hits = len(texts) - sum(len(indices) for indices in missing.values())
+    with stats_lock:
+        embedding_stats["cache_hits"] += hits
+        embedding_stats["cache_misses"] += len(texts) - hits
+        embedding_stats["embedded_texts"] += len(missing_keys)
+        embedding_stats["embedding_seconds"] += total_seconds
+
+    logger.info(f"임베딩 완료: 전체 {len(texts)}개 중 캐시 적중 {hits}개, 신규 임베딩 {len(missing_keys)}개")
+    return vectors
+
+def embed_query(text):
+    """검색 질의 임베딩 (질의는 매번 달라 캐시하지 않음)"""
+    return np.asarray(embedding_model.get().get_query_embedding(text), dtype=np.float32)
+
+def get_embedding_stats():
+    """누적 임베딩 통계 반환"""
+    with stats_lock:
+        stats = dict(embedding_stats)
+    embedded = stats["embedded_texts"]
+    stats["texts_per_second"] = embedded / stats["embedding_seconds"] if stats["embedding_seconds"] else 0.0
+    return stats
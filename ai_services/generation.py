@@ -1,94 +1,273 @@
 import os
+import re
 import json
-from groq import Groq
-from config import logger, GROQ_API_KEY, GROQ_MODEL, RESULTS_FOLDER
+import asyncio
+import shutil
+import hashlib
+from concurrent.futures import as_completed
+from config import (
+    logger, GROQ_MODEL, RESULTS_FOLDER, LLM_CONTEXT_TOKENS, LLM_MAX_OUTPUT_TOKENS,
+    SUMMARY_SECTION_TOKENS, SUMMARY_SECTION_OUTPUT_TOKENS, SUMMARY_MAP_CONCURRENCY,
+    LLM_CACHE_ENABLED, LLM_CACHE_REPLAY_CHUNK
+)
 from utils.queue_worker import update_progress
+from utils.async_loop import run_coroutine, submit_coroutine
+from ai_services.llm_cache import make_cache_key, get_cached_response, store_response
+from ai_services.llm_gateway import (
+    PRIORITY_BATCH, PRIORITY_INTERACTIVE, achat_completion, astream_chat_completion, estimate_tokens
+)
+
+def _summary_path(task_id):
+    return os.path.join(RESULTS_FOLDER, task_id, f"{task_id}_summary.json")
+
+def save_summary(task_id, summary_text):
+    """
+    요약을 결과 폴더에 저장 (프로세스 전역 변수 대신 파일을 사용하여
+    다른 gunicorn 워커/독립 워커 프로세스에서도 같은 요약을 조회)
+    """
+    result_path = _summary_path(task_id)
+    os.makedirs(os.path.dirname(result_path), exist_ok=True)
+
+    summary_data = {
+        "status": "summarized",
+        "message": "요약 완료",
+        "summary_text": summary_text
+    }
+
+    # 다른 프로세스가 쓰는 도중의 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+    tmp_path = f"{result_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(summary_data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, result_path)
+
+def load_summary(task_id):
+    """저장된 요약 조회 (없으면 None)"""
+    try:
+        with open(_summary_path(task_id), 'r', encoding='utf-8') as f:
+            return json.load(f).get("summary_text") or None
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"요약 파일 읽기 실패: {task_id} - {str(e)}")
+        return None
+
+async def aget_ai_response(messages, temperature=0.5, max_tokens=LLM_MAX_OUTPUT_TOKENS, priority=PRIORITY_BATCH):
+    """Groq API로 AI 응답 생성 (같은 요청은 응답 캐시 사용)"""
+    cache_key = make_cache_key(GROQ_MODEL, messages, temperature, max_tokens) if LLM_CACHE_ENABLED else None
+    if cache_key:
+        cached = await asyncio.to_thread(get_cached_response, cache_key)
+        if cached is not None:
+            logger.info("LLM 응답 캐시 적중")
+            return cached
 
-# Groq 클라이언트 설정
-try:
-    groq_client = Groq(api_key=GROQ_API_KEY)
-    logger.info("Groq client initialized for text generation")
-except Exception as e:
-    logger.error(f"Groq client 초기화 실패: {str(e)}")
-    groq_client = None
-
-# 전역 요약 저장소
-global_summary = {}
-
-def get_ai_response(messages, temperature=0.5):
-    """Groq API로 AI 응답 생성"""
-    if not groq_client:
-        raise ValueError("Groq 클라이언트가 초기화되지 않았습니다.")
-    
     try:
-        response = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=4000
-        )
-        return response.choices[0].message.content
+        content = await achat_completion(messages, temperature, max_tokens, priority)
     except Exception as e:
         logger.error(f"Groq AI 응답 생성 실패: {str(e)}")
         raise
 
-def get_streaming_ai_response(messages, temperature=0.5):
-    """Groq API로 스트리밍 AI 응답 생성"""
-    if not groq_client:
-        raise ValueError("Groq 클라이언트가 초기화되지 않았습니다.")
-    
+    if cache_key:
+        await asyncio.to_thread(store_response, cache_key, GROQ_MODEL, content)
+    return content
+
+def get_ai_response(messages, temperature=0.5, max_tokens=LLM_MAX_OUTPUT_TOKENS, priority=PRIORITY_BATCH):
+    """동기 코드용 AI 응답 생성 (워커 이벤트 루프에서 실행하고 결과를 기다림)"""
+    return run_coroutine(aget_ai_response(messages, temperature, max_tokens, priority))
+
+async def aget_streaming_ai_response(messages, temperature=0.5, max_tokens=LLM_MAX_OUTPUT_TOKENS, priority=PRIORITY_INTERACTIVE):
+    """Groq API로 스트리밍 AI 응답 생성 (캐시된 응답은 스트림으로 재생)"""
+    cache_key = make_cache_key(GROQ_MODEL, messages, temperature, max_tokens) if LLM_CACHE_ENABLED else None
+    if cache_key:
+        cached = await asyncio.to_thread(get_cached_response, cache_key)
+        if cached is not None:
+            logger.info("LLM 응답 캐시 적중 (스트림 재생)")
+            for start in range(0, len(cached), LLM_CACHE_REPLAY_CHUNK):
+                yield cached[start:start + LLM_CACHE_REPLAY_CHUNK]
+            return
+
+    parts = []
     try:
-        stream = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=4000,
-            stream=True
-        )
-        for chunk in stream:
-            if chunk.choices[0].delta.content is not None:
-                yield chunk.choices[0].delta.content
+        async for content in astream_chat_completion(messages, temperature, max_tokens, priority):
+            parts.append(content)
+            yield content
     except Exception as e:
         logger.error(f"Groq 스트리밍 응답 생성 실패: {str(e)}")
         raise
 
-def generate_summary(task_id, transcribed_text):
-    """강의 내용 요약 생성"""
-    try:
-        update_progress(task_id, "summarizing", 91, "강의 내용 요약 중...")
+    # 끝까지 받은 응답만 캐시 (클라이언트가 중간에 끊으면 저장하지 않음)
+    if cache_key:
+        await asyncio.to_thread(store_response, cache_key, GROQ_MODEL, "".join(parts))
 
-        # 요약 생성
-        messages = [
-                {'role': 'system', 'content': 'you are a helpful assistant'},
-                {"role": "user", "content": f'''아래의 강의 내용을 자세하게 핵심요약해서 정리해줘
+# 요약 프롬프트 (한 번에 요약 / 구간 요약 통합 공통)
+SUMMARY_INSTRUCTIONS = '''
                 1. 강의주제를 먼저 정리해줘.
                 2. 요약을 그다음에 형식에 맞춰서 정리해줘.
                 3. 주제별로 번호를 메겨서 학생들이 공부할 수 있도록 자세하게 정리해줘.
-                4. 학생들이 강의 요약만 보고도 강의 핵심 개념에 대해 알고 공부할 수 있도록 내용을 완전히 이해하고 적용할 수 있는 요약이어야 해.
-            {transcribed_text}
+                4. 학생들이 강의 요약만 보고도 강의 핵심 개념에 대해 알고 공부할 수 있도록 내용을 완전히 이해하고 적용할 수 있는 요약이어야 해.'''
+
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?。])\s+|\n+')
+
+def _fits_single_prompt(text):
+    """프롬프트와 응답이 모델 컨텍스트 안에 들어가는지 확인"""
+    return estimate_tokens(SUMMARY_INSTRUCTIONS) + estimate_tokens(text) + 200 + LLM_MAX_OUTPUT_TOKENS <= LLM_CONTEXT_TOKENS
+
+def split_by_token_budget(text, budget=SUMMARY_SECTION_TOKENS):
+    """문장 경계를 유지하며 토큰 예산 단위로 텍스트 분할 (예산보다 긴 문장은 글자 수로 자름)"""
+    sections = []
+    current = []
+    current_tokens = 0
+
+    for sentence in _SENTENCE_SPLIT_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+
+        tokens = estimate_tokens(sentence)
+        pieces = [sentence]
+        if tokens > budget:
+            piece_length = max(1, len(sentence) * budget // tokens)
+            pieces = [sentence[i:i + piece_length] for i in range(0, len(sentence), piece_length)]
+
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > budget:
+                sections.append(" ".join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+
+    if current:
+        sections.append(" ".join(current))
+    return sections
+
+def _section_dir(task_id):
+    return os.path.join(RESULTS_FOLDER, task_id, "summary_sections")
+
+def _load_section_summary(path, section_hash):
+    """저장된 구간 요약 로드 (원문이 바뀌었으면 None)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("hash") == section_hash:
+            return data["summary"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+def _save_section_summary(path, section_hash, summary):
+    """구간 요약 저장 (임시 파일에 쓴 뒤 교체)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({"hash": section_hash, "summary": summary}, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+async def _summarize_section(task_id, key, section_text, total, semaphore):
+    """구간 하나 요약 (이미 요약된 구간은 저장된 결과 재사용)"""
+    section_hash = hashlib.sha256(f"{GROQ_MODEL}\n{section_text}".encode('utf-8')).hexdigest()
+    path = os.path.join(_section_dir(task_id), f"{key}.json")
+
+    cached = await asyncio.to_thread(_load_section_summary, path, section_hash)
+    if cached is not None:
+        return cached, True
+
+    messages = [
+            {'role': 'system', 'content': 'you are a helpful assistant'},
+            {"role": "user", "content": f'''아래는 긴 강의를 {total}개 구간으로 나눈 것 중 한 구간이야.
+                이 구간에서 다루는 개념, 정의, 예시, 핵심 설명을 빠짐없이 자세하게 요약해줘.
+            {section_text}
+                '''}
+    ]
+    async with semaphore:
+        summary = await aget_ai_response(messages, temperature=0.5, max_tokens=SUMMARY_SECTION_OUTPUT_TOKENS)
+
+    # 재시도 시 다시 요약하지 않도록 구간 요약 저장
+    await asyncio.to_thread(_save_section_summary, path, section_hash, summary)
+    return summary, False
+
+def _map_sections(task_id, sections, key_prefix):
+    """구간들을 워커 이벤트 루프에서 제한된 동시성으로 요약하여 순서대로 반환"""
+    summaries = [None] * len(sections)
+    reused = 0
+    errors = []
+
+    semaphore = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+    futures = {
+        submit_coroutine(_summarize_section(task_id, f"{key_prefix}{i:04d}", section, len(sections), semaphore)): i
+        for i, section in enumerate(sections)
+    }
+    done = 0
+    for future in as_completed(futures):
+        i = futures[future]
+        try:
+            summaries[i], from_cache = future.result()
+            reused += from_cache
+        except Exception as e:
+            logger.error(f"구간 요약 실패: {task_id} 구간 {i + 1} - {str(e)}")
+            errors.append(e)
+        done += 1
+        # 진행 상황은 호출 스레드에서만 갱신 (단계 그래프의 스레드별 단계 정보 유지)
+        update_progress(task_id, "summarizing", 91, f"구간 요약 중 ({done}/{len(sections)})")
+
+    if errors:
+        raise errors[0]
+
+    logger.info(f"구간 요약 완료: {task_id} {len(sections)}개 구간 (저장된 결과 재사용 {reused}개)")
+    return summaries
+
+def _summarize_hierarchical(task_id, transcribed_text):
+    """긴 강의 요약: 토큰 예산으로 분할 → 구간별 동시 요약 → 통합 (통합 입력이 길면 반복)"""
+    sections = split_by_token_budget(transcribed_text)
+    logger.info(f"map-reduce 요약 시작: {task_id} ({len(sections)}개 구간)")
+
+    summaries = _map_sections(task_id, sections, "s")
+    combined = "\n\n".join(f"[구간 {i + 1}]\n{summary}" for i, summary in enumerate(summaries))
+
+    level = 1
+    while not _fits_single_prompt(combined):
+        # 구간 요약을 합쳐도 길면 한 단계 더 요약
+        groups = split_by_token_budget(combined)
+        if len(groups) <= 1:
+            break
+        summaries = _map_sections(task_id, groups, f"r{level}_")
+        combined = "\n\n".join(f"[구간 {i + 1}]\n{summary}" for i, summary in enumerate(summaries))
+        level += 1
+
+    update_progress(task_id, "summarizing", 91, "구간 요약 통합 중...")
+    messages = [
+            {'role': 'system', 'content': 'you are a helpful assistant'},
+            {"role": "user", "content": f'''아래는 강의를 순서대로 구간별 요약한 내용이야. 이를 하나로 통합해서 강의 전체를 자세하게 핵심요약해서 정리해줘{SUMMARY_INSTRUCTIONS}
+            {combined}
                 강의주제:
                 요약:
                 '''}
-        ]
-
-        summary_text = get_ai_response(messages, temperature=0.5)
-
-        # 글로벌 요약에 저장
-        global_summary[task_id] = summary_text
+    ]
+    return get_ai_response(messages, temperature=0.5)
 
-        # 결과 업데이트
-        result_dir = os.path.join(RESULTS_FOLDER, task_id)
-        os.makedirs(result_dir, exist_ok=True)
-        result_path = os.path.join(result_dir, f"{task_id}_summary.json")
-        
-        summary_data = {
-            "status": "summarized",
-            "message": "요약 완료",
-            "summary_text": summary_text
-        }
+def generate_summary(task_id, transcribed_text):
+    """강의 내용 요약 생성 (모델 컨텍스트를 넘는 긴 강의는 map-reduce 방식으로 자동 전환)"""
+    try:
+        update_progress(task_id, "summarizing", 91, "강의 내용 요약 중...")
 
-        with open(result_path, 'w', encoding='utf-8') as f:
-            json.dump(summary_data, f, ensure_ascii=False, indent=2)
+        if _fits_single_prompt(transcribed_text):
+            # 요약 생성
+            messages = [
+                    {'role': 'system', 'content': 'you are a helpful assistant'},
+                    {"role": "user", "content": f'''아래의 강의 내용을 자세하게 핵심요약해서 정리해줘{SUMMARY_INSTRUCTIONS}
+                {transcribed_text}
+                    강의주제:
+                    요약:
+                    '''}
+            ]
+
+            summary_text = get_ai_response(messages, temperature=0.5)
+        else:
+            summary_text = _summarize_hierarchical(task_id, transcribed_text)
+
+        # 결과 저장 (퀴즈/학습 계획 요청이 다른 프로세스로 가도 조회 가능)
+        save_summary(task_id, summary_text)
+        # 최종 요약이 저장되었으므로 재시도용 구간 요약은 더 필요하지 않음
+        shutil.rmtree(_section_dir(task_id), ignore_errors=True)
 
         update_progress(task_id, "summary_completed", 92, "요약 생성 완료")
         logger.info(f"요약 생성 완료: {task_id}")
@@ -180,9 +359,10 @@ def generate_study_plan(task_id, summary_text, remaining_days=5):
         update_progress(task_id, "failed", 98, f"학습 계획 생성 실패: {str(e)}")
         raise
 
-def stream_summary(task_id, text):
-    """요약 결과를 스트리밍 방식으로 반환"""
-    update_progress(task_id, "streaming_summary", 92, "요약 스트리밍 중...")
+async def stream_summary(task_id, text):
+    """요약 결과를 스트리밍 방식으로 반환 (비동기 제너레이터)"""
+    # 진행 상황 기록은 SQLite에 쓰므로 이벤트 루프를 막지 않도록 별도 스레드에서 실행
+    await asyncio.to_thread(update_progress, task_id, "streaming_summary", 92, "요약 스트리밍 중...")
 
     messages = [
             {'role': 'system', 'content': 'you are a helpful assistant'},
@@ -195,24 +375,24 @@ def stream_summary(task_id, text):
     full_summary = ""
 
     # 스트리밍 생성
-    for content in get_streaming_ai_response(messages, temperature=0.5):
+    async for content in aget_streaming_ai_response(messages, temperature=0.5):
             full_summary += content
             yield content
 
-    # 전역 변수에 저장
-    global_summary[task_id] = full_summary
+    # 결과 저장 (이후 퀴즈/학습 계획 요청이 다른 프로세스로 가도 조회 가능)
+    if full_summary:
+        await asyncio.to_thread(save_summary, task_id, full_summary)
 
-def stream_quiz(task_id):
-    """퀴즈 결과를 스트리밍 방식으로 반환"""
-    update_progress(task_id, "streaming_quiz", 97, "퀴즈 스트리밍 중...")
+async def stream_quiz(task_id):
+    """퀴즈 결과를 스트리밍 방식으로 반환 (비동기 제너레이터)"""
+    await asyncio.to_thread(update_progress, task_id, "streaming_quiz", 97, "퀴즈 스트리밍 중...")
 
     # 요약 확인
-    if task_id not in global_summary:
+    summary_text = await asyncio.to_thread(load_summary, task_id)
+    if not summary_text:
         yield "요약 결과를 찾을 수 없습니다. 먼저 요약을 생성해주세요."
         return
 
-    summary_text = global_summary[task_id]
-
     messages = [
             {'role': 'system', 'content': 'you are a helpful assistant'},
             {"role": "user", "content": f'''아래의 강의 핵심요약을 토대로 퀴즈 문제와 답 5개만 주관식으로 만들어줘!
@@ -223,20 +403,19 @@ def stream_quiz(task_id):
     ]
 
     # 스트리밍 생성
-    for content in get_streaming_ai_response(messages, temperature=0.5):
+    async for content in aget_streaming_ai_response(messages, temperature=0.5):
         yield content
 
-def stream_study_plan(task_id, remaining_days=5):
-    """학습 계획 결과를 스트리밍 방식으로 반환"""
-    update_progress(task_id, "plan_generating", 98, f"{remaining_days}일치 학습 계획 생성 중...")
+async def stream_study_plan(task_id, remaining_days=5):
+    """학습 계획 결과를 스트리밍 방식으로 반환 (비동기 제너레이터)"""
+    await asyncio.to_thread(update_progress, task_id, "plan_generating", 98, f"{remaining_days}일치 학습 계획 생성 중...")
 
     # 요약 확인
-    if task_id not in global_summary:
+    summary_text = await asyncio.to_thread(load_summary, task_id)
+    if not summary_text:
         yield "요약 결과를 찾을 수 없습니다. 먼저 요약을 생성해주세요."
         return
 
-    summary_text = global_summary[task_id]
-
     messages = [
             {'role': 'system', 'content': 'you are a helpful assistant'},
             {"role": "user", "content": f'''아래의 강의 핵심요약을 토대로 해당 내용을 효과적으로 학습하기 위해 남은 {remaining_days}일 동안의 단계별 학습 계획을 만들어줘. 
@@ -249,5 +428,5 @@ def stream_study_plan(task_id, remaining_days=5):
     ]
 
     # 스트리밍 생성
-    for content in get_streaming_ai_response(messages, temperature=0.5):
+    async for content in aget_streaming_ai_response(messages, temperature=0.5):
         yield content
\ No newline at end of file
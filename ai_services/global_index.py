@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import threading
+import faiss
+import numpy as np
+from config import (
+    logger, INDEX_FOLDER, EMBEDDING_DIM, GLOBAL_INDEX_HNSW_M, GLOBAL_INDEX_EF_CONSTRUCTION,
+    GLOBAL_INDEX_EF_SEARCH, GLOBAL_INDEX_SAVE_INTERVAL, GLOBAL_INDEX_COMPACT_RATIO
+)
+from utils.db_utils import get_connection
+from ai_services.index_store import load_lecture_index, lecture_vectors
+
+# 전체 강의 검색용 인덱스 경로
+GLOBAL_INDEX_DIR = os.path.join(INDEX_FOLDER, "_global")
+GLOBAL_INDEX_PATH = os.path.join(GLOBAL_INDEX_DIR, "index.faiss")
+GLOBAL_DB_PATH = os.path.join(GLOBAL_INDEX_DIR, "chunks.db")
+
+# HNSW는 삭제를 지원하지 않으므로 재인덱싱으로 사라진 청크는 active=0으로 표시
+# (비활성 비율이 GLOBAL_INDEX_COMPACT_RATIO를 넘으면 활성 청크만으로 인덱스를 다시 만들고 행 삭제)
+# node_index는 강의 인덱스의 청크 ID (증분 재인덱싱에서 유지된 청크는 같은 행을 계속 사용)
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    node_index INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    active INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_task ON chunks(task_id, active);
+"""
+
+_global_index = None
+_global_lock = threading.Lock()
+_dirty = False
+_last_saved = 0.0
+_indexed_ids = set()  # 인덱스에 들어 있는 청크 ID
+_synced_id = 0  # 메타데이터 DB에서 확인한 마지막 청크 ID
+
+# 검색 대상 청크가 이 개수 이하이면 HNSW 대신 해당 벡터만 정확 검색
+_EXACT_SEARCH_MAX_CHUNKS = 2048
+
+def _connect():
+    conn = get_connection(GLOBAL_DB_PATH)
+    conn.executescript(_SCHEMA)
+    return conn
+
+def _new_index():
+    """HNSW 그래프 인덱스 생성 (학습 불필요, 점진적 추가 가능) - task_id 필터를 위해 ID 매핑"""
+    hnsw = faiss.IndexHNSWFlat(EMBEDDING_DIM, GLOBAL_INDEX_HNSW_M)
+    hnsw.hnsw.efConstruction = GLOBAL_INDEX_EF_CONSTRUCTION
+    hnsw.hnsw.efSearch = GLOBAL_INDEX_EF_SEARCH
+    return faiss.IndexIDMap2(hnsw)
+
+def _set_ef_search(index):
+    faiss.downcast_index(index.index).hnsw.efSearch = GLOBAL_INDEX_EF_SEARCH
+
+def _recover_missing(index, after_id=0):
+    """
+    메타데이터에는 있지만 인덱스에 없는 청크(파일에 저장되기 전에 종료되었거나
+    다른 프로세스가 추가한 청크)를 강의별 인덱스에서 벡터를 복원하여 다시 추가
+    after_id 이후 청크만 확인하고 (확인한 마지막 청크 ID, 추가 여부) 반환
+    """
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT id, task_id, node_index FROM chunks WHERE active = 1 AND id > ? ORDER BY id", (after_id,)
+        ).fetchall()
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM chunks").fetchone()[0]
+    finally:
+        conn.close()
+
+    missing = {}
+    for row in rows:
+        if row["id"] not in _indexed_ids:
+            missing.setdefault(row["task_id"], []).append((row["id"], row["node_index"]))
+
+    for task_id, entries in missing.items():
+        lecture = load_lecture_index(task_id)
+        if not lecture:
+            logger.warning(f"전체 검색 인덱스 복구 불가 (강의 인덱스 없음): {task_id}")
+            continue
+        # node_index는 강의 인덱스의 청크 ID
+        lecture_ids, vectors = lecture_vectors(lecture["faiss_index"])
+        positions = {chunk_id: position for position, chunk_id in enumerate(lecture_ids.tolist())}
+        entries = [(row_id, node_index) for row_id, node_index in entries if node_index in positions]
+        if not entries:
+            continue
+        ids = np.asarray([row_id for row_id, _ in entries], dtype=np.int64)
+        index.add_with_ids(vectors[[positions[node_index] for _, node_index in entries]], ids)
+        _indexed_ids.update(ids.tolist())
+        logger.info(f"전체 검색 인덱스 복구: {task_id} ({len(entries)}개 청크)")
+
+    return last_id, bool(missing)
+
+def _get_index():
+    """전체 검색 인덱스 지연 로드 (_global_lock 보유 상태에서 호출)"""
+    global _global_index, _dirty, _indexed_ids, _synced_id
+    if _global_index is None:
+        if os.path.exists(GLOBAL_INDEX_PATH):
+            _global_index = faiss.read_index(GLOBAL_INDEX_PATH)
+            _set_ef_search(_global_index)
+        else:
+            _global_index = _new_index()
+        _indexed_ids = set(faiss.vector_to_array(_global_index.id_map).tolist()) if _global_index.ntotal else set()
+        _synced_id, recovered = _recover_missing(_global_index)
+        if recovered:
+            _dirty = True
+        logger.info(f"전체 검색 인덱스 로드 완료 ({_global_index.ntotal}개 벡터)")
+    return _global_index
+
+def _sync_locked(index):
+    """다른 프로세스(독립 워커)가 추가한 청크를 반영 (_global_lock 보유 상태에서 호출)"""
+    global _dirty, _synced_id
+    _synced_id, recovered = _recover_missing(index, _synced_id)
+    if recovered:
+        _dirty = True
+
+def _save_locked(force=False):
+    """변경된 인덱스를 저장 (저장 간격 이내면 생략, force=True면 즉시 저장)"""
+    global _dirty, _last_saved
+    if _global_index is None or not _dirty:
+        return
+    if not force and time.time() - _last_saved < GLOBAL_INDEX_SAVE_INTERVAL:
+        return
+    os.makedirs(GLOBAL_INDEX_DIR, exist_ok=True)
+    faiss.write_index(_global_index, GLOBAL_INDEX_PATH + ".tmp")
+    os.replace(GLOBAL_INDEX_PATH + ".tmp", GLOBAL_INDEX_PATH)
+    _dirty = False
+    _last_saved = time.time()
+    logger.info(f"전체 검색 인덱스 저장 완료 ({_global_index.ntotal}개 벡터)")
+
+def _compact_if_needed_locked():
+    """
+    비활성 청크 비율이 기준을 넘으면 활성 청크만으로 HNSW 인덱스를 다시 만들어 교체 (_global_lock 보유 상태에서 호출)
+    그래프에서 제거할 수 없는 비활성 벡터가 계속 쌓여 검색 품질/메모리가 나빠지지 않도록 함
+    """
+    global _global_index, _indexed_ids, _dirty
+    total = _global_index.ntotal
+    conn = _connect()
+    try:
+        active_count = conn.execute("SELECT COUNT(*) FROM chunks WHERE active = 1").fetchone()[0]
+        if total == 0 or (total - active_count) / total <= GLOBAL_INDEX_COMPACT_RATIO:
+            return
+
+        active_ids = np.fromiter(
+            (row[0] for row in conn.execute("SELECT id FROM chunks WHERE active = 1")), dtype=np.int64
+        )
+        ids, vectors = lecture_vectors(_global_index)
+        keep = np.isin(ids, active_ids)
+        index = _new_index()
+        if keep.any():
+            index.add_with_ids(vectors[keep], ids[keep])
+        with conn:
+            conn.execute("DELETE FROM chunks WHERE active = 0")
+    finally:
+        conn.close()
+
+    _global_index = index
+    _indexed_ids = set(ids[keep].tolist())
+    _dirty = True
+    _save_locked(force=True)
+    logger.info(f"전체 검색 인덱스 재구성 완료 (비활성 벡터 {total - index.ntotal}개 제거, {index.ntotal}개 유지)")
+
+def update_lecture_in_global_index(task_id, chunk_ids, embeddings, nodes):
+    """
+    강의 인덱싱이 끝날 때마다 전체 검색 인덱스에 변경분만 반영 (chunk_ids: 강의 인덱스의 청크 ID, embeddings와 같은 순서)
+    새 청크만 추가하고, 사라진 청크는 비활성화하며, 유지된 청크는 텍스트/메타데이터만 갱신
+    """
+    global _dirty
+    node_by_id = {node["id"]: node for node in nodes}
+
+    with _global_lock:
+        index = _get_index()
+        conn = _connect()
+        try:
+            with conn:
+                # node_index 열은 강의 인덱스의 청크 ID (이전 형식에서는 위치와 같음)
+                existing = {
+                    row["node_index"]: row["id"]
+                    for row in conn.execute("SELECT id, node_index FROM chunks WHERE task_id = ? AND active = 1", (task_id,))
+                }
+                removed = [row_id for chunk_id, row_id in existing.items() if chunk_id not in node_by_id]
+                conn.executemany("UPDATE chunks SET active = 0 WHERE id = ?", [(row_id,) for row_id in removed])
+                conn.executemany(
+                    "UPDATE chunks SET text = ?, metadata = ? WHERE id = ?",
+                    [
+                        (node_by_id[chunk_id]["text"], json.dumps(node_by_id[chunk_id]["metadata"], ensure_ascii=False), row_id)
+                        for chunk_id, row_id in existing.items() if chunk_id in node_by_id
+                    ]
+                )
+
+                ids = []
+                positions = []
+                for position, chunk_id in enumerate(int(chunk_id) for chunk_id in chunk_ids):
+                    if chunk_id in existing or chunk_id not in node_by_id:
+                        continue
+                    node = node_by_id[chunk_id]
+                    cursor = conn.execute(
+                        "INSERT INTO chunks (task_id, node_index, text, metadata) VALUES (?, ?, ?, ?)",
+                        (task_id, chunk_id, node["text"], json.dumps(node["metadata"], ensure_ascii=False))
+                    )
+                    ids.append(cursor.lastrowid)
+                    positions.append(position)
+        finally:
+            conn.close()
+
+        if ids:
+            vectors = np.asarray(embeddings, dtype=np.float32)[positions]
+            index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+            _indexed_ids.update(ids)
+            _dirty = True
+        if removed:
+            _compact_if_needed_locked()
+        _save_locked()
+
+    logger.info(f"전체 검색 인덱스 갱신 완료: {task_id} (추가 {len(ids)}개, 비활성화 {len(removed)}개)")
+
+def _selected_chunk_ids(conn, task_ids):
+    """지정한 강의들의 활성 청크 중 인덱스에 들어 있는 청크 ID 배열"""
+    task_ids = list(dict.fromkeys(task_ids))
+    selected = []
+    # SQLite 변수 개수 제한을 넘지 않도록 나누어 조회
+    for start in range(0, len(task_ids), 500):
+        batch = task_ids[start:start + 500]
+        placeholders = ",".join("?" * len(batch))
+        selected.extend(
+            row["id"] for row in conn.execute(
+                f"SELECT id FROM chunks WHERE active = 1 AND task_id IN ({placeholders})", batch
+            ) if row["id"] in _indexed_ids
+        )
+    return np.asarray(selected, dtype=np.int64)
+
+def _search_selected(index, query, selected, top_k):
+    """선택한 청크 ID 안에서만 검색 - [(청크 ID, 거리), ...]"""
+    if selected.size <= _EXACT_SEARCH_MAX_CHUNKS:
+        # 대상이 적으면 해당 벡터만 꺼내 정확 검색
+        vectors = np.vstack([index.reconstruct(int(chunk_id)) for chunk_id in selected])
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        order = np.argsort(distances)[:top_k]
+        return [(int(selected[i]), float(distances[i])) for i in order]
+
+    # HNSW 탐색 중에 선택한 ID만 결과에 포함 (전체를 검색한 뒤 거르지 않음)
+    selector = faiss.IDSelectorBatch(selected.size, faiss.swig_ptr(selected))
+    params = faiss.SearchParametersHNSW(sel=selector, efSearch=max(GLOBAL_INDEX_EF_SEARCH, top_k))
+    distances, ids = index.search(query, top_k, params=params)
+    return [(int(i), float(d)) for i, d in zip(ids[0], distances[0]) if i >= 0]
+
+def _load_rows(conn, chunk_ids):
+    """청크 ID → 활성 청크 메타데이터 행"""
+    rows = {}
+    # SQLite 변수 개수 제한을 넘지 않도록 나누어 조회
+    for start in range(0, len(chunk_ids), 500):
+        batch = chunk_ids[start:start + 500]
+        placeholders = ",".join("?" * len(batch))
+        for row in conn.execute(
+            f"SELECT id, task_id, text, metadata FROM chunks WHERE active = 1 AND id IN ({placeholders})",
+            batch
+        ):
+            rows[row["id"]] = row
+    return rows
+
+def _format_hits(hits, rows):
+    return [
+        {
+            "task_id": rows[chunk_id]["task_id"],
+            "text": rows[chunk_id]["text"],
+            "metadata": json.loads(rows[chunk_id]["metadata"]),
+            "distance": distance
+        }
+        for chunk_id, distance in hits if chunk_id in rows
+    ]
+
+def search_global_index(query_embedding, top_k=10, task_ids=None):
+    """
+    전체 강의 대상 근사 최근접 검색 (task_ids가 주어지면 해당 강의로 한정)
+    강의를 지정하면 해당 강의의 활성 청크 ID만 선택해 검색하고,
+    전체 검색에서 비활성 청크로 결과가 부족하면 후보 수를 늘려 다시 검색한다.
+    """
+    with _global_lock:
+        index = _get_index()
+        _sync_locked(index)
+        total = index.ntotal
+        if total == 0:
+            return []
+
+        query = np.asarray([query_embedding], dtype=np.float32)
+        conn = _connect()
+        try:
+            if task_ids:
+                selected = _selected_chunk_ids(conn, task_ids)
+                if selected.size == 0:
+                    return []
+                hits = _search_selected(index, query, selected, top_k)
+                return _format_hits(hits, _load_rows(conn, [chunk_id for chunk_id, _ in hits]))[:top_k]
+
+            # 비활성 청크는 재구성 전까지 그래프에 남아 있으므로 결과에서 제외
+            candidates = min(total, top_k * 2)
+            while True:
+                distances, ids = index.search(query, candidates)
+                hits = [(int(i), float(d)) for i, d in zip(ids[0], distances[0]) if i >= 0]
+                results = _format_hits(hits, _load_rows(conn, [chunk_id for chunk_id, _ in hits]))
+
+                if len(results) >= top_k or candidates >= total:
+                    return results[:top_k]
+                candidates = min(total, candidates * 4)
+        finally:
+            conn.close()
+
+def flush_global_index():
+    """저장되지 않은 변경 사항을 즉시 디스크에 기록 (종료 시 호출)"""
+    with _global_lock:
+        _save_locked(force=True)
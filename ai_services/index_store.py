@@ -0,0 +1,117 @@
+import os
+import json
+import hashlib
+import faiss
+import numpy as np
+from config import logger, INDEX_FOLDER, EMBEDDING_DIM
+
+# 인덱스 디렉토리 내 파일명
+INDEX_FILE = "index.faiss"
+NODES_FILE = "nodes.json"
+MANIFEST_FILE = "manifest.json"  # 청크 ID → 텍스트 해시, 다음 청크 ID (증분 재인덱싱용)
+
+def get_index_dir(task_id):
+    """강의별 인덱스 저장 디렉토리 경로"""
+    return os.path.join(INDEX_FOLDER, task_id)
+
+def chunk_hash(text):
+    """청크 텍스트 해시 (내용이 같으면 임베딩 재사용)"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def new_lecture_faiss_index():
+    """청크 ID로 추가/삭제할 수 있는 강의 인덱스 생성"""
+    return faiss.IndexIDMap2(faiss.IndexFlatL2(EMBEDDING_DIM))
+
+def to_id_mapped(faiss_index):
+    """이전 형식(위치 = 청크 ID)의 강의 인덱스를 ID 매핑 인덱스로 변환"""
+    if isinstance(faiss_index, faiss.IndexIDMap2):
+        return faiss_index
+    id_mapped = new_lecture_faiss_index()
+    if faiss_index.ntotal:
+        id_mapped.add_with_ids(
+            faiss_index.reconstruct_n(0, faiss_index.ntotal),
+            np.arange(faiss_index.ntotal, dtype=np.int64)
+        )
+    return id_mapped
+
+def lecture_vectors(faiss_index):
+    """강의 인덱스의 (청크 ID 배열, 벡터 배열) - 이전 형식은 위치를 ID로 사용"""
+    total = faiss_index.ntotal
+    if total == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+    if isinstance(faiss_index, faiss.IndexIDMap2):
+        return faiss.vector_to_array(faiss_index.id_map), faiss_index.index.reconstruct_n(0, total)
+    return np.arange(total, dtype=np.int64), faiss_index.reconstruct_n(0, total)
+
+def lecture_index_exists(task_id):
+    """디스크에 저장된 강의 인덱스가 있는지 확인"""
+    index_dir = get_index_dir(task_id)
+    return (os.path.exists(os.path.join(index_dir, INDEX_FILE))
+            and os.path.exists(os.path.join(index_dir, NODES_FILE)))
+
+def lecture_index_mtime(task_id):
+    """저장된 강의 인덱스의 수정 시각 (없으면 None) - 다른 프로세스가 다시 인덱싱했는지 확인용"""
+    try:
+        return os.path.getmtime(os.path.join(get_index_dir(task_id), NODES_FILE))
+    except OSError:
+        return None
+
+def save_lecture_index(task_id, faiss_index, nodes, manifest):
+    """
+    FAISS 인덱스, 노드 저장소(청크 ID + 텍스트 + 메타데이터), 청크 해시 목록을 디스크에 저장
+    임시 파일에 쓴 뒤 교체하여 읽는 쪽에서 반쯤 쓰인 파일을 보지 않도록 함
+    """
+    index_dir = get_index_dir(task_id)
+    os.makedirs(index_dir, exist_ok=True)
+
+    index_path = os.path.join(index_dir, INDEX_FILE)
+    nodes_path = os.path.join(index_dir, NODES_FILE)
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+
+    faiss.write_index(faiss_index, index_path + ".tmp")
+    with open(nodes_path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(nodes, f, ensure_ascii=False)
+    with open(manifest_path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+    os.replace(index_path + ".tmp", index_path)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    os.replace(nodes_path + ".tmp", nodes_path)
+    logger.info(f"강의 인덱스 저장 완료: {index_dir} ({faiss_index.ntotal}개 벡터)")
+
+def load_lecture_index(task_id, writable=False):
+    """
+    디스크에서 강의 인덱스 로드 (검색용은 memory-mapped 읽기 전용, writable=True면 수정 가능하게 메모리로 로드)
+    반환값: {"faiss_index", "nodes", "node_map"(청크 ID → 노드), "manifest", "mtime"} 또는 None
+    """
+    if not lecture_index_exists(task_id):
+        return None
+
+    index_dir = get_index_dir(task_id)
+    io_flags = 0 if writable else faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    faiss_index = faiss.read_index(os.path.join(index_dir, INDEX_FILE), io_flags)
+
+    with open(os.path.join(index_dir, NODES_FILE), 'r', encoding='utf-8') as f:
+        nodes = json.load(f)
+
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    else:
+        # 이전 형식: 노드 위치가 청크 ID
+        for i, node in enumerate(nodes):
+            node.setdefault("id", i)
+        manifest = {
+            "next_id": len(nodes),
+            "chunks": {str(node["id"]): chunk_hash(node["text"]) for node in nodes}
+        }
+
+    logger.info(f"강의 인덱스 로드 완료: {task_id} ({faiss_index.ntotal}개 벡터)")
+    return {
+        "faiss_index": faiss_index,
+        "nodes": nodes,
+        "node_map": {node["id"]: node for node in nodes},
+        "manifest": manifest,
+        "mtime": lecture_index_mtime(task_id)
+    }
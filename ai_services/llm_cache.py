@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from config import logger, CACHE_FOLDER, LLM_CACHE_MAX_MB
+from utils.db_utils import get_connection
+
+# LLM 응답 캐시 (모델 + 메시지 + 생성 옵션 해시 → 응답 텍스트)
+LLM_CACHE_PATH = os.path.join(CACHE_FOLDER, "llm_responses.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used_at);
+"""
+
+# 누적 통계
+llm_cache_stats = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0
+}
+stats_lock = threading.Lock()
+_evict_lock = threading.Lock()
+
+def _connect():
+    conn = get_connection(LLM_CACHE_PATH)
+    conn.executescript(_SCHEMA)
+    return conn
+
+def make_cache_key(model, messages, temperature, max_tokens):
+    """요청 내용으로 캐시 키 생성 (같은 요청이면 같은 키)"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def get_cached_response(key):
+    """캐시된 응답 조회 (없으면 None), 조회된 항목은 최근 사용 시각 갱신"""
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                with conn:
+                    conn.execute("UPDATE responses SET last_used_at = ? WHERE key = ?", (time.time(), key))
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"LLM 응답 캐시 조회 실패: {str(e)}")
+        return None
+
+    with stats_lock:
+        llm_cache_stats["hits" if row is not None else "misses"] += 1
+    return row["response"] if row is not None else None
+
+def store_response(key, model, response):
+    """응답을 캐시에 저장 (전체 크기가 한도를 넘으면 오래 사용되지 않은 항목부터 제거)"""
+    if not response:
+        return
+
+    now = time.time()
+    size = len(response.encode('utf-8'))
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, response, size, now, now)
+                )
+            _evict(conn)
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"LLM 응답 캐시 저장 실패: {str(e)}")
+
+def _evict(conn):
+    """캐시 크기가 한도를 넘으면 한도의 90%가 될 때까지 LRU 순으로 제거"""
+    max_bytes = LLM_CACHE_MAX_MB * 1024 * 1024
+    with _evict_lock:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= max_bytes:
+            return
+
+        target = total - int(max_bytes * 0.9)
+        evicted_keys = []
+        freed = 0
+        for row in conn.execute("SELECT key, size FROM responses ORDER BY last_used_at"):
+            evicted_keys.append(row["key"])
+            freed += row["size"]
+            if freed >= target:
+                break
+
+        with conn:
+            conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in evicted_keys])
+
+    with stats_lock:
+        llm_cache_stats["evictions"] += len(evicted_keys)
+    logger.info(f"LLM 응답 캐시 정리: {len(evicted_keys)}개 항목, {freed / 1024 / 1024:.1f}MB 제거")
+
+def get_llm_cache_stats():
+    """LLM 응답 캐시 적중/미스 통계 반환"""
+    with stats_lock:
+        stats = dict(llm_cache_stats)
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / total if total else 0.0
+    return stats
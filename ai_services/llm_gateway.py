@@ -0,0 +1,405 @@
+import re
+import time
+import asyncio
+import heapq
+import random
+import itertools
+import threading
+import httpx
+from groq import AsyncGroq, APIConnectionError, APIStatusError
+from config import (
+    logger, GROQ_API_KEY, GROQ_MODEL, GROQ_RPM, GROQ_TPM, GROQ_MAX_CONCURRENCY,
+    GROQ_MAX_RETRIES, GROQ_TIMEOUT, GROQ_LIMITS_SHARED, GROQ_LIMITS_DB_PATH, LLM_MAX_OUTPUT_TOKENS
+)
+from utils.async_loop import run_coroutine, iterate_async
+from utils.rate_limit_db import SharedRateLimiter
+
+# 호출 우선순위 (숫자가 작을수록 먼저 처리)
+PRIORITY_INTERACTIVE = 0  # /query, 스트리밍 등 사용자가 기다리는 요청
+PRIORITY_BATCH = 10  # 강의 처리 파이프라인 (요약, 퀴즈, 학습 계획, 스크립트 개선)
+
+_PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+_HANGUL_RE = re.compile(r'[가-힣]')
+_DURATION_RE = re.compile(r'(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m(?!s))?(?:(\d+(?:\.\d+)?)s)?(?:(\d+(?:\.\d+)?)ms)?$')
+
+
+def estimate_tokens(text):
+    """토크나이저 없이 토큰 수 추정 (한글은 글자당 약 1토큰, 그 외는 4글자당 약 1토큰으로 보수적으로 계산)"""
+    hangul = len(_HANGUL_RE.findall(text))
+    return hangul + (len(text) - hangul + 3) // 4
+
+def estimate_request_tokens(messages, max_tokens):
+    """요청이 사용할 최대 토큰 수 (입력 추정치 + 최대 출력)"""
+    return sum(estimate_tokens(message.get("content") or "") + 4 for message in messages) + max_tokens
+
+def _parse_duration(value):
+    """'1.5', '7.66s', '2m59.56s', '120ms' 형식의 시간을 초로 변환"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    match = _DURATION_RE.match(value.strip())
+    if not match or not any(match.groups()):
+        return None
+    hours, minutes, seconds, millis = (float(group) if group else 0.0 for group in match.groups())
+    return hours * 3600 + minutes * 60 + seconds + millis / 1000
+
+def _retry_after(error):
+    """rate limit 응답 헤더에서 다시 시도할 때까지 기다릴 시간(초) 추출"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header in ("retry-after", "x-ratelimit-reset-tokens", "x-ratelimit-reset-requests"):
+        seconds = _parse_duration(headers.get(header))
+        if seconds is not None:
+            return seconds
+    return None
+
+def _is_retryable(error):
+    if isinstance(error, APIConnectionError):  # 타임아웃 포함
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class TokenBucket:
+    """분당 한도를 초 단위로 채우는 토큰 버킷"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """amount만큼 사용할 수 있을 때까지 남은 시간(초)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount, now):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def available(self, now):
+        """현재 사용 가능한 양 (상태를 바꾸지 않음, 다른 스레드의 조회용)"""
+        return min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+
+    def refund(self, amount):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class LocalRateLimiter:
+    """
+    현재 프로세스 안에서만 적용하는 호출 한도 (GROQ_LIMITS_SHARED=false)
+    SharedRateLimiter와 같은 인터페이스 - 이벤트 루프 스레드에서만 호출
+    """
+
+    shared = False
+
+    def __init__(self, rpm, tpm, max_concurrency):
+        self.max_concurrency = max_concurrency
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._in_flight = 0
+        self._blocked_until = 0.0
+
+    def try_acquire(self, cost):
+        """한도 여유가 있으면 (슬롯, 0), 없으면 (None, 기다릴 시간(초) - 슬롯 반환을 기다려야 하면 None)"""
+        if self._in_flight >= self.max_concurrency:
+            return None, None
+        now = time.monotonic()
+        delay = max(
+            self._blocked_until - now,
+            self._requests.wait_time(1, now),
+            self._tokens.wait_time(cost, now)
+        )
+        if delay > 0:
+            return None, delay
+        self._requests.consume(1, now)
+        self._tokens.consume(cost, now)
+        self._in_flight += 1
+        return True, 0.0
+
+    def release(self, slot, reserved, used):
+        self._in_flight -= 1
+        if used < reserved:
+            self._tokens.refund(reserved - used)
+
+    def block(self, seconds):
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def snapshot(self):
+        now = time.monotonic()
+        return {
+            "in_flight": self._in_flight,
+            "available_requests": int(self._requests.available(now)),
+            "available_tokens": int(self._tokens.available(now)),
+            "blocked_seconds": max(0.0, self._blocked_until - now)
+        }
+
+    def reset(self):
+        """이벤트 루프가 다시 시작될 때 이전 루프의 실행 중 요청 수 초기화"""
+        self._in_flight = 0
+
+
+class LLMGateway:
+    """
+    모든 Groq 호출이 거치는 공유 게이트웨이 (워커 이벤트 루프에서 비동기로 실행)
+
+    - 요청 수(RPM)/토큰 수(TPM) 토큰 버킷으로 한도에 닿기 전에 대기열에서 기다림
+    - 동시 요청 수 제한, 우선순위가 높은(숫자가 작은) 요청부터 처리
+    - 429/5xx/연결 오류는 retry-after 헤더를 반영한 지수 백오프로 재시도
+      (429를 받으면 모든 호출을 해당 시간 동안 멈춤)
+    - limiter가 SharedRateLimiter면 한도/429 대기를 모든 프로세스가 공유
+      (DB 접근은 이벤트 루프를 막지 않도록 별도 스레드에서 실행)
+    - 커넥션 풀을 공유하는 단일 AsyncGroq 클라이언트 사용 (응답을 기다리는 동안 스레드를 점유하지 않음)
+    """
+
+    def __init__(self, api_key, model, limiter, max_concurrency, max_retries, timeout):
+        self.api_key = api_key
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        # 클라이언트와 Condition은 이벤트 루프에 묶이므로 루프 안에서 생성 (루프가 다시 시작되면 새로 생성)
+        self._loop = None
+        self._client = None
+        self._condition = None
+
+        self._limiter = limiter
+        self._waiting = []  # (우선순위, 순번) 힙
+        self._sequence = itertools.count()
+
+        self._stats = {}
+        self._stats_lock = threading.Lock()  # 다른 스레드의 통계 조회용
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            http_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency * 2, max_keepalive_connections=self.max_concurrency)
+            )
+            # 재시도는 게이트웨이에서 처리하므로 SDK 자체 재시도는 끔
+            self._client = AsyncGroq(api_key=self.api_key, http_client=http_client, max_retries=0)
+            self._condition = asyncio.Condition()
+            self._limiter.reset()
+            self._waiting = []
+            self._loop = loop
+        return self._client
+
+    # --- 호출 인터페이스 ---
+
+    async def complete(self, messages, temperature=0.5, max_tokens=LLM_MAX_OUTPUT_TOKENS, priority=PRIORITY_BATCH):
+        """채팅 응답 생성 (한도 대기 및 재시도 포함)"""
+        client = self._bind_loop()
+        cost = estimate_request_tokens(messages, max_tokens)
+
+        for attempt in range(self.max_retries + 1):
+            slot = await self._acquire(priority, cost)
+            used = cost
+            try:
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+                usage = getattr(response, "usage", None)
+                if usage is not None and getattr(usage, "total_tokens", None):
+                    used = usage.total_tokens
+                return response.choices[0].message.content
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    self._record(priority, "errors")
+                    raise
+                error = e
+            finally:
+                await self._release(slot, cost, used)
+            # 슬롯을 반환한 뒤 대기
+            await self._backoff(priority, error, attempt)
+
+    async def stream(self, messages, temperature=0.5, max_tokens=LLM_MAX_OUTPUT_TOKENS, priority=PRIORITY_INTERACTIVE):
+        """스트리밍 응답 생성 (첫 조각을 받기 전의 오류만 재시도, 스트림이 끝날 때까지 동시 실행 슬롯 점유)"""
+        client = self._bind_loop()
+        cost = estimate_request_tokens(messages, max_tokens)
+
+        for attempt in range(self.max_retries + 1):
+            slot = await self._acquire(priority, cost)
+            started = False
+            try:
+                stream = await client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content is not None:
+                        started = True
+                        yield chunk.choices[0].delta.content
+                return
+            except Exception as e:
+                if started or attempt >= self.max_retries or not _is_retryable(e):
+                    self._record(priority, "errors")
+                    raise
+                error = e
+            finally:
+                await self._release(slot, cost, cost)
+            await self._backoff(priority, error, attempt)
+
+    # --- 한도 관리 ---
+
+    async def _limiter_call(self, func, *args):
+        """공유 한도는 SQLite를 사용하므로 이벤트 루프를 막지 않도록 별도 스레드에서 실행"""
+        if self._limiter.shared:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def _acquire(self, priority, cost):
+        """차례가 오고 한도 여유가 생길 때까지 대기 (잡은 슬롯 반환)"""
+        ticket = (priority, next(self._sequence))
+        enqueued = time.monotonic()
+
+        async with self._condition:
+            heapq.heappush(self._waiting, ticket)
+            # 우선순위가 더 높은 요청이 들어왔음을 대기 중인 요청에 알림
+            self._condition.notify_all()
+            try:
+                while True:
+                    if self._waiting[0] != ticket:
+                        await self._condition.wait()
+                        continue
+
+                    slot, delay = await self._limiter_call(self._limiter.try_acquire, cost)
+                    if slot is not None:
+                        heapq.heappop(self._waiting)
+                        break
+                    if delay is None:
+                        # 이 프로세스의 슬롯 반환을 기다림
+                        await self._condition.wait()
+                        continue
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+                raise
+            # 다음 순서의 요청이 바로 확인하도록 알림
+            self._condition.notify_all()
+
+        self._record_wait(priority, time.monotonic() - enqueued)
+        return slot
+
+    async def _release(self, slot, reserved, used):
+        """동시 실행 슬롯 반환, 실제 사용 토큰이 예약보다 적으면 차이를 돌려줌"""
+        await self._limiter_call(self._limiter.release, slot, reserved, used)
+        async with self._condition:
+            self._condition.notify_all()
+
+    async def _backoff(self, priority, error, attempt):
+        """재시도 전 대기 (429는 게이트웨이 전체를 retry-after 동안 멈춤)"""
+        retry_after = _retry_after(error)
+        # 서버가 알려준 대기 시간이 있으면 우선, 없으면 지수 백오프 (동시 재시도가 몰리지 않도록 지터 추가)
+        delay = (retry_after if retry_after is not None else min(60.0, 2 ** attempt)) + random.uniform(0, 0.5)
+        status_code = getattr(error, "status_code", None)
+
+        if status_code == 429:
+            self._record(priority, "rate_limited")
+            await self._limiter_call(self._limiter.block, delay)
+            logger.warning(f"Groq rate limit, {delay:.1f}초 후 재시도 ({attempt + 1}/{self.max_retries})")
+        else:
+            logger.warning(f"Groq 호출 실패, {delay:.1f}초 후 재시도 ({attempt + 1}/{self.max_retries}): {str(error)}")
+            await asyncio.sleep(delay)
+        self._record(priority, "retries")
+
+    # --- 지표 ---
+
+    def _priority_stats(self, priority):
+        name = _PRIORITY_NAMES.get(priority, str(priority))
+        if name not in self._stats:
+            self._stats[name] = {
+                "requests": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+                "retries": 0, "rate_limited": 0, "errors": 0
+            }
+        return self._stats[name]
+
+    def _record_wait(self, priority, waited):
+        with self._stats_lock:
+            stats = self._priority_stats(priority)
+            stats["requests"] += 1
+            stats["wait_seconds"] += waited
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+
+    def _record(self, priority, key):
+        with self._stats_lock:
+            self._priority_stats(priority)[key] += 1
+
+    def get_stats(self):
+        """우선순위별 대기 시간/재시도 통계와 현재 한도 상태"""
+        with self._stats_lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+        for values in stats.values():
+            values["avg_wait_seconds"] = values["wait_seconds"] / values["requests"] if values["requests"] else 0.0
+        return dict(
+            self._limiter.snapshot(),
+            priorities=stats,
+            queued=len(self._waiting),
+            shared_limits=self._limiter.shared
+        )
+
+
+# 공유 게이트웨이
+try:
+    if GROQ_LIMITS_SHARED:
+        # 슬롯은 요청 타임아웃이 지나면 만료 (반환하지 못하고 종료된 프로세스 대비)
+        _limiter = SharedRateLimiter(GROQ_LIMITS_DB_PATH, GROQ_RPM, GROQ_TPM, GROQ_MAX_CONCURRENCY, GROQ_TIMEOUT + 60)
+    else:
+        _limiter = LocalRateLimiter(GROQ_RPM, GROQ_TPM, GROQ_MAX_CONCURRENCY)
+    llm_gateway = LLMGateway(
+        GROQ_API_KEY, GROQ_MODEL, _limiter,
+        GROQ_MAX_CONCURRENCY, GROQ_MAX_RETRIES, GROQ_TIMEOUT
+    )
+    scope = "모든 프로세스 공유" if GROQ_LIMITS_SHARED else "프로세스별"
+    logger.info(f"LLM 게이트웨이 초기화 완료 (RPM {GROQ_RPM}, TPM {GROQ_TPM}, 동시 요청 {GROQ_MAX_CONCURRENCY}, {scope})")
+except Exception as e:
+    logger.error(f"LLM 게이트웨이 초기화 실패: {str(e)}")
+    llm_gateway = None
+
+def _get_gateway():
+    if not llm_gateway:
+        raise ValueError("Groq 클라이언트가 초기화되지 않았습니다.")
+    return llm_gateway
+
+async def achat_completion(messages, temperature=0.5, max_tokens=LLM_MAX_OUTPUT_TOKENS, priority=PRIORITY_BATCH):
+    """공유 게이트웨이를 통한 채팅 응답 생성 (워커 이벤트 루프에서 await)"""
+    return await _get_gateway().complete(messages, temperature, max_tokens, priority)
+
+def astream_chat_completion(messages, temperature=0.5, max_tokens=LLM_MAX_OUTPUT_TOKENS, priority=PRIORITY_INTERACTIVE):
+    """공유 게이트웨이를 통한 스트리밍 응답 생성 (비동기 제너레이터)"""
+    return _get_gateway().stream(messages, temperature, max_tokens, priority)
+
+def chat_completion(messages, temperature=0.5, max_tokens=LLM_MAX_OUTPUT_TOKENS, priority=PRIORITY_BATCH):
+    """동기 코드용 채팅 응답 생성 (워커 이벤트 루프에서 실행하고 결과를 기다림)"""
+    return run_coroutine(achat_completion(messages, temperature, max_tokens, priority))
+
+def stream_chat_completion(messages, temperature=0.5, max_tokens=LLM_MAX_OUTPUT_TOKENS, priority=PRIORITY_INTERACTIVE):
+    """동기 코드용 스트리밍 응답 생성"""
+    return iterate_async(astream_chat_completion(messages, temperature, max_tokens, priority))
+
+def get_llm_gateway_stats():
+    """게이트웨이 대기열/한도 통계 반환"""
+    return llm_gateway.get_stats() if llm_gateway else {}
@@ -1,52 +1,100 @@
 import os
 import json
-import whisper
-from config import logger, WHISPER_MODEL, RESULTS_FOLDER, DATA_FOLDER
+from concurrent.futures import wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from config import (
+    logger, WHISPER_MODEL, RESULTS_FOLDER, DATA_FOLDER,
+    TRANSCRIBE_WORKERS, TRANSCRIBE_TORCH_THREADS, TRANSCRIBE_CHUNK_RETRIES
+)
 from utils.queue_worker import update_progress
-from processors.audio import cleanup_audio_chunks
+from utils.pcm import read_pcm_segments
+from utils.checkpoint import save_checkpoint, load_checkpoint
+from processors.vad import map_chunk_time
+from ai_services.whisper_pool import (
+    transcribe_chunk, get_transcription_pool, reset_transcription_pool
+)
+from utils.model_loader import register_model, configure_torch_threads
 
-# 로컬 Whisper 모델 로드
-try:
-    whisper_model = whisper.load_model(WHISPER_MODEL)
-    logger.info(f"로컬 Whisper 모델 로드 완료: {WHISPER_MODEL}")
-except Exception as e:
-    logger.error(f"Whisper 모델 로드 실패: {str(e)}")
-    whisper_model = None
+def _load_whisper_model():
+    # whisper/torch import가 무거우므로 처음 사용할 때 import
+    configure_torch_threads()
+    import whisper
+    return whisper.load_model(WHISPER_MODEL)
+
+# 로컬 Whisper 모델 (처음 사용할 때 로드)
+whisper_model = register_model("whisper", _load_whisper_model)
 
 def transcribe_audio(task_id, audio_info):
     """
     오디오를 로컬 Whisper 모델로 변환하여 텍스트 반환
     audio_info는 prepare_audio_for_transcription에서 반환된 결과
     """
-    if not whisper_model:
-        raise ValueError("Whisper 모델이 로드되지 않았습니다.")
-    
     try:
         if audio_info['is_chunked']:
+            # 워커가 2개 이상이고 청크가 여러 개면 프로세스 풀로 병렬 처리
+            if TRANSCRIBE_WORKERS > 1 and audio_info['num_chunks'] > 1:
+                return _transcribe_chunked_audio_parallel(task_id, audio_info)
             return _transcribe_chunked_audio(task_id, audio_info)
         else:
-            return _transcribe_single_audio(task_id, audio_info['audio_path'])
+            return _transcribe_single_audio(task_id, audio_info['pcm_path'], audio_info['segments'])
     except Exception as e:
         logger.error(f"로컬 Whisper 처리 실패: {str(e)}")
         update_progress(task_id, "failed", 0, f"로컬 Whisper 처리 실패: {str(e)}")
         raise
 
-def _transcribe_single_audio(task_id, audio_path):
-    """단일 오디오 파일 변환"""
+def _map_segments(chunk_segments, whisper_segments):
+    """Whisper 세그먼트의 청크 내부 시간을 시간 맵으로 원본 오디오 시간으로 변환"""
+    return [
+        {
+            "start": round(map_chunk_time(chunk_segments, start), 2),
+            "end": round(map_chunk_time(chunk_segments, end), 2),
+            "text": text
+        }
+        for start, end, text in whisper_segments
+    ]
+
+def _chunk_stage(i):
+    return f"transcribe_chunk_{i:04d}"
+
+def _load_chunk(task_id, i, segments):
+    """청크 변환 체크포인트 조회 - (텍스트, 타임스탬프 구간) 또는 None (청크 구성이 바뀌었으면 None)"""
+    found, value = load_checkpoint(task_id, _chunk_stage(i))
+    if not found or value["segments"] != [list(segment) for segment in segments]:
+        return None
+    return value["text"], value["timed_segments"]
+
+def _save_chunk(task_id, i, segments, text, timed_segments):
+    save_checkpoint(task_id, _chunk_stage(i), {
+        "segments": [list(segment) for segment in segments],
+        "text": text,
+        "timed_segments": timed_segments
+    })
+
+def _transcribe_single_audio(task_id, pcm_path, segments):
+    """단일 PCM 오디오 변환 (segments: 음성 샘플 구간 목록)"""
     update_progress(task_id, "ai_processing", 80, "로컬 Whisper 처리 중...")
     
     try:
-        # 로컬 Whisper로 변환
-        result = whisper_model.transcribe(
-            audio_path,
+        # 음성 구간이 없으면 변환 생략
+        if not segments:
+            logger.info(f"음성 구간이 검출되지 않음: {task_id}")
+            _save_transcription_result(task_id, "", [])
+            return ""
+
+        # 로컬 Whisper로 변환 (PCM 버퍼를 직접 전달)
+        result = whisper_model.get().transcribe(
+            read_pcm_segments(pcm_path, segments),
             language="ko",
             verbose=False
             )
         
         transcribed_text = result["text"]
+        timed_segments = _map_segments(
+            segments, [(seg["start"], seg["end"], seg["text"]) for seg in result.get("segments", [])]
+        )
         
         # 결과 저장 및 반환
-        _save_transcription_result(task_id, transcribed_text)
+        _save_transcription_result(task_id, transcribed_text, timed_segments)
         
         return transcribed_text
     except Exception as e:
@@ -54,57 +102,140 @@ def _transcribe_single_audio(task_id, audio_path):
         raise
 
 def _transcribe_chunked_audio(task_id, audio_info):
-    """분할된 오디오 파일 변환"""
+    """분할된 PCM 구간을 순차 변환"""
     try:
-        chunk_paths = audio_info['chunk_paths']
+        pcm_path = audio_info['pcm_path']
+        chunks = audio_info['chunks']
         num_chunks = audio_info['num_chunks']
-        chunk_dir = audio_info['chunk_dir']
         
         # 전체 텍스트 결과 저장용
         full_text = []
+        timed_segments = []
         
         # 각 청크 처리
-        for i, chunk_file in enumerate(chunk_paths):
+        for i, segments in enumerate(chunks):
+            # 이전 시도에서 변환한 청크는 체크포인트 사용
+            restored = _load_chunk(task_id, i, segments)
+            if restored is not None:
+                full_text.append(restored[0])
+                timed_segments.extend(restored[1])
+                continue
+
             # 진행률 업데이트
             progress = 77 + (i / num_chunks) * 20
             update_progress(task_id, "ai_processing", progress,
                            f"청크 {i + 1}/{num_chunks} 처리 중...")
             
-            # 로컬 Whisper로 청크 처리
-            result = whisper_model.transcribe(
-                chunk_file,
+            # 로컬 Whisper로 청크 처리 (memmap에서 해당 구간만 읽음)
+            result = whisper_model.get().transcribe(
+                read_pcm_segments(pcm_path, segments),
                 language="ko",
                 verbose=False
                 )
+            chunk_segments = _map_segments(
+                segments, [(seg["start"], seg["end"], seg["text"]) for seg in result.get("segments", [])]
+            )
+            _save_chunk(task_id, i, segments, result["text"], chunk_segments)
             
             # 결과 추가
             full_text.append(result["text"])
-            
-            # 처리된 청크 삭제 (선택적)
-            os.remove(chunk_file)
-        
-        # 임시 디렉토리 정리
-        cleanup_audio_chunks(chunk_dir)
+            timed_segments.extend(chunk_segments)
         
         # 전체 텍스트 합치기
         transcribed_text = " ".join(full_text)
         
         # 결과 저장 및 반환
-        _save_transcription_result(task_id, transcribed_text)
+        _save_transcription_result(task_id, transcribed_text, timed_segments)
         
         return transcribed_text
     
     except Exception as e:
-        # 오류 발생 시에도 임시 파일 정리 시도
-        try:
-            cleanup_audio_chunks(audio_info['chunk_dir'])
-        except:
-            pass
-        
         logger.error(f"청크 오디오 변환 실패: {str(e)}")
         raise
 
-def _save_transcription_result(task_id, transcribed_text):
+def _transcribe_chunked_audio_parallel(task_id, audio_info):
+    """분할된 PCM 구간을 프로세스 풀에서 병렬 변환 (순서대로 재조립)"""
+    pcm_path = audio_info['pcm_path']
+    chunks = audio_info['chunks']
+    num_chunks = audio_info['num_chunks']
+
+    results = [None] * num_chunks
+    attempts = [0] * num_chunks
+    pending = {}
+
+    def submit(i):
+        # 워커에는 파일 경로와 샘플 구간만 전달 (오디오 데이터는 워커가 memmap으로 읽음)
+        source = (pcm_path, chunks[i])
+        pool = get_transcription_pool(TRANSCRIBE_WORKERS, WHISPER_MODEL, TRANSCRIBE_TORCH_THREADS)
+        try:
+            future = pool.submit(transcribe_chunk, i, source)
+        except BrokenProcessPool:
+            # 풀이 손상된 경우 새 풀로 한 번 더 시도
+            reset_transcription_pool(pool)
+            pool = get_transcription_pool(TRANSCRIBE_WORKERS, WHISPER_MODEL, TRANSCRIBE_TORCH_THREADS)
+            future = pool.submit(transcribe_chunk, i, source)
+        pending[future] = (i, pool)
+
+    try:
+        update_progress(task_id, "ai_processing", 77,
+                       f"청크 {num_chunks}개 병렬 처리 시작 (워커 {TRANSCRIBE_WORKERS}개)")
+
+        # 이전 시도에서 변환한 청크는 체크포인트 사용, 나머지만 제출
+        completed = 0
+        for i in range(num_chunks):
+            restored = _load_chunk(task_id, i, chunks[i])
+            if restored is not None:
+                results[i] = restored
+                completed += 1
+            else:
+                submit(i)
+        if completed:
+            logger.info(f"청크 체크포인트 재사용: {task_id} ({completed}/{num_chunks})")
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, pool = pending.pop(future)
+                try:
+                    _, text, whisper_segments = future.result()
+                except Exception as e:
+                    # 실패한 청크만 다시 제출
+                    attempts[i] += 1
+                    if attempts[i] > TRANSCRIBE_CHUNK_RETRIES:
+                        raise Exception(f"청크 {i + 1} 변환 실패 ({attempts[i]}회 시도): {str(e)}")
+                    logger.warning(f"청크 {i + 1}/{num_chunks} 변환 실패, 재시도 {attempts[i]}/{TRANSCRIBE_CHUNK_RETRIES}: {str(e)}")
+                    if isinstance(e, BrokenProcessPool):
+                        reset_transcription_pool(pool)
+                    submit(i)
+                    continue
+
+                results[i] = (text, _map_segments(chunks[i], whisper_segments))
+                _save_chunk(task_id, i, chunks[i], *results[i])
+                completed += 1
+
+                # 진행률 업데이트 (청크 단위)
+                progress = 77 + (completed / num_chunks) * 20
+                update_progress(task_id, "ai_processing", progress,
+                               f"청크 {completed}/{num_chunks} 처리 완료")
+
+        # 순서대로 텍스트 합치기
+        transcribed_text = " ".join(text for text, _ in results)
+        timed_segments = [seg for _, segments in results for seg in segments]
+
+        # 결과 저장 및 반환
+        _save_transcription_result(task_id, transcribed_text, timed_segments)
+
+        return transcribed_text
+
+    except Exception as e:
+        # 남은 청크 작업 취소
+        for future in pending:
+            future.cancel()
+
+        logger.error(f"병렬 청크 오디오 변환 실패: {str(e)}")
+        raise
+
+def _save_transcription_result(task_id, transcribed_text, segments=None):
     """변환 결과를 파일로 저장"""
     try:
         # 결과 데이터 생성
@@ -113,6 +244,10 @@ def _save_transcription_result(task_id, transcribed_text):
             "message": "스크립트 변환 완료!",
             "transcribed_text": transcribed_text
         }
+
+        # 원본 오디오 기준 타임스탬프 (VAD로 제거된 무음 구간 반영)
+        if segments is not None:
+            result_data["segments"] = segments
         
         # 결과 폴더 생성
         result_dir = os.path.join(RESULTS_FOLDER, task_id)
@@ -1,42 +1,28 @@
 import os
-import faiss
-from groq import Groq
-from collections import deque
+import threading
+import numpy as np
 from config import (
-    logger, GROQ_API_KEY, GROQ_MODEL, EMBEDDING_MODEL, DATA_FOLDER
+    logger, DATA_FOLDER,
+    GLOBAL_INDEX_ENABLED, ANSWER_CACHE_ENABLED
 )
-from llama_index.core import StorageContext, VectorStoreIndex, SimpleDirectoryReader, Document
-from llama_index.vector_stores.faiss import FaissVectorStore
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.core import Settings
+from ai_services.embeddings import embed_texts, embed_query
+from ai_services.index_store import (
+    save_lecture_index, load_lecture_index, lecture_index_mtime, chunk_hash,
+    new_lecture_faiss_index, to_id_mapped, lecture_vectors
+)
+from ai_services.global_index import update_lecture_in_global_index, search_global_index
+from ai_services.answer_cache import lookup_answer, store_answer, invalidate_answers
+from ai_services.conversation_store import get_conversation, add_message, clear_conversation
+from ai_services.llm_gateway import PRIORITY_INTERACTIVE, chat_completion
 import re
 
-# Groq 클라이언트 설정
-try:
-    groq_client = Groq(api_key=GROQ_API_KEY)
-    logger.info("Groq client initialized for vector DB Q&A")
-except Exception as e:
-    logger.error(f"Groq client 초기화 실패: {str(e)}")
-    groq_client = None
-
-# HuggingFace 임베딩 모델 설정
-try:
-    embedding_model = HuggingFaceEmbedding(model_name=EMBEDDING_MODEL)
-    Settings.embed_model = embedding_model
-    logger.info(f"HuggingFace 임베딩 모델 로드 완료: {EMBEDDING_MODEL}")
-except Exception as e:
-    logger.error(f"HuggingFace 임베딩 모델 로드 실패: {str(e)}")
-    embedding_model = None
-
-# 강의 인덱스 저장소
-lecture_indices = {}  # task_id를 키로 사용하여 각 강의별 인덱스 저장
+# 강의 인덱스 저장소 (디스크에 저장된 인덱스를 질문 시 지연 로드)
+lecture_indices = {}  # task_id를 키로 사용하여 각 강의별 {"faiss_index", "nodes", "node_map", "manifest"} 저장
+index_lock = threading.Lock()
 
 # 벡터 스토어 초기화
 vector_stores = {}  # task_id를 키로 사용하여 각 강의별 벡터 스토어 저장
 
-# 대화 기록 (최근 6개 대화 저장)
-conversation_history = {}  # task_id를 키로 사용하여 각 강의별 대화 기록 저장
-
 # 어조 선택 딕셔너리 추가
 tones = {
     "a": "까칠하고 깔보는듯한",
@@ -45,28 +31,101 @@ tones = {
 }
 
 def get_qa_response(messages, temperature=0.7):
-    """질의응답을 위한 Groq API 응답 생성"""
-    if not groq_client:
-        raise ValueError("Groq 클라이언트가 초기화되지 않았습니다.")
-    
+    """질의응답을 위한 Groq API 응답 생성 (사용자가 기다리는 요청이므로 우선 처리)"""
     try:
-        response = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=2000
-        )
-        return response.choices[0].message.content
+        return chat_completion(messages, temperature=temperature, max_tokens=2000, priority=PRIORITY_INTERACTIVE)
     except Exception as e:
         logger.error(f"Groq 질의응답 생성 실패: {str(e)}")
         raise
 
+def split_lecture_text(task_id, text_content):
+    """강의 텍스트를 페이지/단락 단위 노드({"text", "metadata"}) 목록으로 분할"""
+    nodes = []
+
+    # 페이지 구분자 패턴
+    page_pattern = r'---\s*(페이지|슬라이드)\s*\d+\s*---'
+
+    # 페이지/슬라이드 단위로 분할
+    parts = re.split(page_pattern, text_content)
+    current_page_info = ""
+
+    for i, part in enumerate(parts):
+        # 페이지/슬라이드 정보 처리
+        if i % 2 == 1:  # 홀수 인덱스는 '페이지' 또는 '슬라이드' 텍스트
+            current_page_info = part
+            continue
+            
+        if not part.strip():
+            continue
+        
+        # 페이지 내용을 단락으로 분할
+        paragraphs = re.split(r'\n{2,}', part)
+        
+        for para in paragraphs:
+            para = para.strip()
+            if len(para) < 50:  # 너무 짧은 단락은 건너뛰기
+                continue
+            
+            nodes.append({
+                "text": para,
+                "metadata": {
+                    "page_info": f"{current_page_info} {(i//2)+1}" if current_page_info else f"페이지 {(i//2)+1}",
+                    "task_id": task_id
+                }
+            })
+
+    # 청크가 너무 적으면 단순 분할 적용
+    if len(nodes) < 3:
+        nodes = []
+        
+        # 단순 분할 (500자 단위)
+        chunks = [text_content[i:i+500] for i in range(0, len(text_content), 500)]
+        
+        for i, chunk in enumerate(chunks):
+            if len(chunk.strip()) < 100:  # 너무 짧은 청크는 건너뛰기
+                continue
+            
+            nodes.append({
+                "text": chunk.strip(),
+                "metadata": {"chunk_id": i, "task_id": task_id}
+            })
+
+    return nodes
+
+def plan_chunk_changes(manifest, nodes):
+    """
+    이전 인덱스의 청크 해시와 새 청크를 비교하여 청크 ID 배정 (manifest를 새 청크 기준으로 갱신)
+    내용이 같은 청크는 이전 ID(벡터)를 재사용하고, 새로 생기거나 바뀐 청크에만 새 ID 부여
+    반환값: (임베딩이 필요한 노드 위치 목록, 삭제할 청크 ID 목록)
+    """
+    reusable = {}
+    for chunk_id, text_hash in manifest["chunks"].items():
+        reusable.setdefault(text_hash, []).append(int(chunk_id))
+    for ids in reusable.values():
+        ids.sort()
+
+    to_embed = []
+    chunks = {}
+    for position, node in enumerate(nodes):
+        text_hash = chunk_hash(node["text"])
+        candidates = reusable.get(text_hash)
+        if candidates:
+            node["id"] = candidates.pop(0)
+        else:
+            node["id"] = manifest["next_id"]
+            manifest["next_id"] += 1
+            to_embed.append(position)
+        chunks[str(node["id"])] = text_hash
+
+    manifest["chunks"] = chunks
+    removed = [chunk_id for ids in reusable.values() for chunk_id in ids]
+    return to_embed, removed
+
 def index_lecture_text(task_id):
-    """강의 텍스트를 벡터 DB에 인덱싱 - HuggingFace 임베딩 사용"""
-    if not embedding_model:
-        logger.error("임베딩 모델이 로드되지 않았습니다.")
-        return False
-    
+    """
+    강의 텍스트를 벡터 DB에 인덱싱 - HuggingFace 임베딩 사용, 디스크에 영구 저장
+    이미 인덱스가 있으면 청크 해시를 비교하여 바뀐 청크만 임베딩하고 사라진 청크는 삭제 (증분 재인덱싱)
+    """
     try:
         # 해당 task_id의 텍스트 파일 로드
         text_path = os.path.join(DATA_FOLDER, f"{task_id}.txt")
@@ -79,87 +138,146 @@ def index_lecture_text(task_id):
             text_content = f.read()
         
         # 문서를 의미 있는 청크로 분할
-        documents = []
-        
-        # 페이지 구분자 패턴
-        page_pattern = r'---\s*(페이지|슬라이드)\s*\d+\s*---'
-        
-        # 페이지/슬라이드 단위로 분할
-        parts = re.split(page_pattern, text_content)
-        current_page_info = ""
-        
-        for i, part in enumerate(parts):
-            # 페이지/슬라이드 정보 처리
-            if i % 2 == 1:  # 홀수 인덱스는 '페이지' 또는 '슬라이드' 텍스트
-                current_page_info = part
-                continue
-                
-            if not part.strip():
-                continue
-            
-            # 페이지 내용을 단락으로 분할
-            paragraphs = re.split(r'\n{2,}', part)
-            
-            for para in paragraphs:
-                para = para.strip()
-                if len(para) < 50:  # 너무 짧은 단락은 건너뛰기
-                    continue
-                
-                # 단락을 문서로 변환
-                doc = Document(
-                    text=para,
-                    metadata={
-                        "page_info": f"{current_page_info} {(i//2)+1}" if current_page_info else f"페이지 {(i//2)+1}",
-                        "task_id": task_id
-                    }
-                )
-                documents.append(doc)
-        
-        # 청크가 너무 적으면 단순 분할 적용
-        if len(documents) < 3:
-            documents = []
-            
-            # 단순 분할 (500자 단위)
-            chunks = [text_content[i:i+500] for i in range(0, len(text_content), 500)]
-            
-            for i, chunk in enumerate(chunks):
-                if len(chunk.strip()) < 100:  # 너무 짧은 청크는 건너뛰기
-                    continue
-                
-                doc = Document(
-                    text=chunk.strip(),
-                    metadata={"chunk_id": i, "task_id": task_id}
-                )
-                documents.append(doc)
-        
-        logger.info(f"텍스트를 {len(documents)}개 청크로 분할")
-        
-        # FAISS 벡터 스토어 생성 (HuggingFace 임베딩 사용)
-        # HuggingFace 모델의 임베딩 차원 확인 (보통 384차원)
-        embed_dim = 384  # all-MiniLM-L6-v2의 차원
-        faiss_index = faiss.IndexFlatL2(embed_dim)
-        vector_store = FaissVectorStore(faiss_index=faiss_index)
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
-        
-        # 인덱스 생성
-        index = VectorStoreIndex.from_documents(
-            documents,
-            storage_context=storage_context
+        nodes = split_lecture_text(task_id, text_content)
+        logger.info(f"텍스트를 {len(nodes)}개 청크로 분할")
+
+        # 기존 인덱스가 있으면 수정 가능한 형태로 로드 (이전 형식은 ID 매핑 인덱스로 변환)
+        existing = load_lecture_index(task_id, writable=True)
+        if existing:
+            faiss_index = to_id_mapped(existing["faiss_index"])
+            manifest = existing["manifest"]
+        else:
+            faiss_index = new_lecture_faiss_index()
+            manifest = {"next_id": 0, "chunks": {}}
+
+        to_embed, removed = plan_chunk_changes(manifest, nodes)
+        if existing and not to_embed and not removed and nodes == existing["nodes"]:
+            logger.info(f"강의 텍스트 변경 없음, 재인덱싱 생략: {task_id}")
+            return True
+
+        # 사라진 청크 삭제, 새로 생기거나 바뀐 청크만 임베딩 (배치 처리 + 해시 기반 임베딩 캐시)
+        if removed:
+            faiss_index.remove_ids(np.asarray(removed, dtype=np.int64))
+        if to_embed:
+            embeddings = embed_texts([nodes[i]["text"] for i in to_embed])
+            faiss_index.add_with_ids(embeddings, np.asarray([nodes[i]["id"] for i in to_embed], dtype=np.int64))
+
+        _register_lecture_index(task_id, faiss_index, nodes, manifest)
+
+        logger.info(
+            f"강의 텍스트 인덱싱 완료 (HuggingFace 임베딩): {task_id} "
+            f"(임베딩 {len(to_embed)}개, 삭제 {len(removed)}개, 재사용 {len(nodes) - len(to_embed)}개)"
         )
-        
-        # 전역 변수에 저장
-        lecture_indices[task_id] = index
-        vector_stores[task_id] = vector_store
-        
-        # 대화 기록 초기화
-        conversation_history[task_id] = deque(maxlen=6)
-        
-        logger.info(f"강의 텍스트 인덱싱 완료 (HuggingFace 임베딩): {task_id}")
         return True
     except Exception as e:
         logger.error(f"강의 텍스트 인덱싱 실패: {str(e)}")
         return False
 
+def _register_lecture_index(task_id, faiss_index, nodes, manifest):
+    """강의 인덱스를 디스크/전체 검색 인덱스/메모리에 등록"""
+    # 디스크에 저장 (재시작 후에도 재임베딩 없이 사용)
+    save_lecture_index(task_id, faiss_index, nodes, manifest)
+    
+    # 전체 강의 검색 인덱스에 변경분 반영 (실패해도 강의별 인덱싱은 유지)
+    if GLOBAL_INDEX_ENABLED:
+        try:
+            chunk_ids, vectors = lecture_vectors(faiss_index)
+            update_lecture_in_global_index(task_id, chunk_ids, vectors, nodes)
+        except Exception as e:
+            logger.warning(f"전체 검색 인덱스 갱신 실패: {str(e)}")
+    
+    # 전역 변수에 저장
+    with index_lock:
+        lecture_indices[task_id] = {
+            "faiss_index": faiss_index,
+            "nodes": nodes,
+            "node_map": {node["id"]: node for node in nodes},
+            "manifest": manifest,
+            "mtime": lecture_index_mtime(task_id)
+        }
+        vector_stores[task_id] = faiss_index
+    
+    # 대화 기록 및 답변 캐시 초기화 (강의 내용이 바뀌었을 수 있음)
+    clear_conversation(task_id)
+    invalidate_answers(task_id)
+
+def clone_lecture_index(source_task_id, task_id):
+    """
+    같은 내용으로 처리된 강의의 인덱스를 새 task_id로 복제 (재임베딩 없이 저장된 벡터 재사용)
+    원본 인덱스가 없으면 새로 인덱싱
+    """
+    source = load_lecture_index(source_task_id)
+    if not source:
+        return index_lecture_text(task_id)
+
+    try:
+        # 청크 ID와 벡터를 그대로 복사 (이후 재인덱싱도 같은 청크 해시 목록으로 증분 처리)
+        chunk_ids, vectors = lecture_vectors(source["faiss_index"])
+        faiss_index = new_lecture_faiss_index()
+        if len(chunk_ids):
+            faiss_index.add_with_ids(vectors, chunk_ids)
+
+        nodes = [
+            {"id": node["id"], "text": node["text"], "metadata": dict(node["metadata"], task_id=task_id)}
+            for node in source["nodes"]
+        ]
+        manifest = {"next_id": source["manifest"]["next_id"], "chunks": dict(source["manifest"]["chunks"])}
+        _register_lecture_index(task_id, faiss_index, nodes, manifest)
+
+        logger.info(f"강의 인덱스 복제 완료: {source_task_id} → {task_id}")
+        return True
+    except Exception as e:
+        logger.error(f"강의 인덱스 복제 실패: {str(e)}")
+        return False
+
+def get_lecture_index(task_id):
+    """
+    강의 인덱스 반환 (메모리 → 디스크 지연 로드 → 새로 인덱싱 순서로 확인)
+    다른 프로세스(독립 워커)가 다시 인덱싱해 디스크의 인덱스가 더 새로우면 다시 로드
+    """
+    with index_lock:
+        cached = lecture_indices.get(task_id)
+        disk_mtime = lecture_index_mtime(task_id)
+        if cached is not None and (disk_mtime is None or (cached.get("mtime") or 0) >= disk_mtime):
+            return cached
+
+        # 디스크에 저장된 인덱스 로드 (memory-mapped)
+        index = load_lecture_index(task_id)
+        if index:
+            lecture_indices[task_id] = index
+            vector_stores[task_id] = index["faiss_index"]
+            if cached is not None:
+                # 강의 내용이 바뀌었으므로 이전 답변 캐시 제거
+                invalidate_answers(task_id)
+            return index
+
+    # 저장된 인덱스가 없으면 동일한 청킹 방식으로 새로 인덱싱
+    if index_lecture_text(task_id):
+        return lecture_indices.get(task_id)
+    return None
+
+def retrieve_nodes(index, question, top_k=5, query_embedding=None):
+    """질문과 가장 유사한 노드 상위 top_k개 검색 (질문 임베딩이 있으면 재사용)"""
+    faiss_index = index["faiss_index"]
+    node_map = index["node_map"]
+    if faiss_index.ntotal == 0:
+        return []
+
+    if query_embedding is None:
+        query_embedding = embed_query(question)
+    query_embedding = query_embedding.reshape(1, -1)
+    _, ids = faiss_index.search(query_embedding, min(top_k, faiss_index.ntotal))
+    # 검색 결과는 청크 ID (이전 형식 인덱스는 위치 = 청크 ID)
+    return [node_map[int(i)] for i in ids[0] if i >= 0 and int(i) in node_map]
+
+def search_lectures(query, task_ids=None, top_k=10):
+    """전체 강의(또는 지정한 강의 목록) 대상 의미 검색"""
+    if not GLOBAL_INDEX_ENABLED:
+        raise ValueError("전체 검색 인덱스가 비활성화되어 있습니다.")
+
+    query_embedding = embed_query(query)
+    return search_global_index(query_embedding, top_k=top_k, task_ids=task_ids)
+
 def generate_answer(task_id, question, tone="b"):
     """벡터 DB에서 질문에 대한 답변 생성 (Groq 사용)"""
     try:
@@ -167,46 +285,38 @@ def generate_answer(task_id, question, tone="b"):
         if not os.path.exists(os.path.join(DATA_FOLDER, f"{task_id}.txt")):
             return "해당 강의 데이터를 찾을 수 없습니다."
             
-        # 대화 기록이 없으면 초기화
-        if task_id not in conversation_history:
-            conversation_history[task_id] = deque(maxlen=6)
-        
         # 어조 정보 가져오기
         tone_description = tones.get(tone, tones["b"])  # 기본값은 정중한 어조
         
         # 대화 기록 포함한 프롬프트 생성
-        context = "\n".join([f"{role}: {content}" for role, content in conversation_history[task_id]])
+        context = "\n".join([f"{role}: {content}" for role, content in get_conversation(task_id)])
         
         # 대화 기록에 사용자 질문 추가
         add_to_conversation_history(task_id, "사용자", question)
-            
-        # 인덱스 확인 및 로드
-        if task_id not in lecture_indices:
-            # 문서 로드
-            documents = SimpleDirectoryReader(
-                input_files=[os.path.join(DATA_FOLDER, f"{task_id}.txt")]
-            ).load_data()
-            
-            # 벡터 인덱스 생성
-            index = VectorStoreIndex.from_documents(documents)
-            lecture_indices[task_id] = index
-        else:
-            index = lecture_indices[task_id]
         
-        # 개선된 검색: 레트리버 직접 사용
-        retriever = index.as_retriever(
-            similarity_top_k=5  # 상위 5개 결과 검색
-        )
+        # 인덱스 확인 및 로드
+        # (답변 캐시보다 먼저 확인 - 다른 프로세스가 다시 인덱싱했으면 여기서 이전 답변 캐시가 제거됨)
+        index = get_lecture_index(task_id)
+        if not index:
+            return "강의 인덱스를 생성할 수 없습니다."
         
-        # 질문에 대한 관련 문서 검색
-        nodes = retriever.retrieve(question)
+        # 의미 기반 답변 캐시 확인 (같은 강의/어조의 유사한 이전 질문)
+        question_embedding = embed_query(question)
+        if ANSWER_CACHE_ENABLED:
+            cached_answer = lookup_answer(task_id, tone, question_embedding)
+            if cached_answer is not None:
+                add_to_conversation_history(task_id, "AI", cached_answer)
+                return cached_answer
+            
+        # 질문에 대한 관련 문서 검색 (상위 5개 결과)
+        nodes = retrieve_nodes(index, question, top_k=5, query_embedding=question_embedding)
         
         # 검색 결과 포맷팅
         retrieved_info = []
         for i, node in enumerate(nodes):
             # 메타데이터 활용
-            page_info = node.metadata.get("page_info", "")
-            chunk_id = node.metadata.get("chunk_id", "")
+            page_info = node["metadata"].get("page_info", "")
+            chunk_id = node["metadata"].get("chunk_id", "")
             
             context_header = f"[정보 {i+1}]"
             if page_info:
@@ -214,7 +324,7 @@ def generate_answer(task_id, question, tone="b"):
             elif chunk_id:
                 context_header += f" (청크 {chunk_id})"
                 
-            retrieved_info.append(f"{context_header}\n{node.text}")
+            retrieved_info.append(f"{context_header}\n{node['text']}")
         
         retrieved_context = "\n\n".join(retrieved_info)
         
@@ -242,6 +352,10 @@ def generate_answer(task_id, question, tone="b"):
         
         answer = get_qa_response(messages, temperature=0.7)
         
+        # 답변 캐시에 저장
+        if ANSWER_CACHE_ENABLED:
+            store_answer(task_id, tone, question, question_embedding, answer)
+        
         # 대화 기록에 AI 응답 추가
         add_to_conversation_history(task_id, "AI", answer)
         
@@ -253,15 +367,11 @@ def generate_answer(task_id, question, tone="b"):
 
 def generate_streaming_answer(task_id, question, tone="b"):
     """벡터 DB 기반으로 스트리밍 답변 생성"""
-    # 대화 기록이 없으면 초기화
-    if task_id not in conversation_history:
-        conversation_history[task_id] = deque(maxlen=6)
-    
     # 어조 정보 가져오기
     tone_description = tones.get(tone, tones["b"])  # 기본값은 정중한 어조
     
     # 대화 기록 포함한 프롬프트 생성
-    context = "\n".join([f"{role}: {content}" for role, content in conversation_history[task_id]])
+    context = "\n".join([f"{role}: {content}" for role, content in get_conversation(task_id)])
     full_prompt = f"이전 대화:\n{context}\n\n사용자 질문: {question}\n\n{tone_description} 어조로 한국어로 답변해주세요."
     
     # 대화 기록에 사용자 질문 추가
@@ -280,7 +390,5 @@ def generate_streaming_answer(task_id, question, tone="b"):
     add_to_conversation_history(task_id, "AI", answer)
 
 def add_to_conversation_history(task_id, role, content):
-    """대화 기록에 메시지 추가"""
-    if task_id not in conversation_history:
-        conversation_history[task_id] = deque(maxlen=6)
-    conversation_history[task_id].append((role, content))
\ No newline at end of file
+    """대화 기록에 메시지 추가 (공유 대화 기록 저장소)"""
+    add_message(task_id, role, content)
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Whisper 병렬 변환용 프로세스 풀
+
+각 워커 프로세스는 초기화 시 자체 Whisper 모델을 한 번만 로드하고
+torch 스레드 수를 제한한다. 이 모듈은 utils.pcm 외에 프로젝트 모듈(config,
+작업 큐 등)을 import하지 않고 설정값은 모두 인자로 전달받는다.
+
+spawn 방식의 워커 프로세스는 시작 시 부모의 메인 모듈을 __mp_main__으로 다시 실행한다.
+따라서 실행 진입점(app.py, worker.py)은 __name__ 확인으로 작업 처리 워커 시작 등의
+부수 효과를 막아야 한다. worker.py는 처리 모듈을 함수 안에서 import하므로 워커 프로세스가
+가져오는 것은 config뿐이고, python app.py로 실행하면 Flask 앱 모듈 import는 함께 일어난다.
+"""
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from utils.pcm import read_pcm_segments
+
+# 워커 프로세스 내부에서 사용하는 모델
+_worker_model = None
+
+# 부모 프로세스에서 공유하는 풀
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker(model_name, torch_threads):
+    """워커 프로세스 초기화 - torch 스레드 제한 후 모델 로드"""
+    global _worker_model
+
+    # torch import 전에 OpenMP/MKL 스레드 수 제한
+    os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+    os.environ["MKL_NUM_THREADS"] = str(torch_threads)
+
+    import torch
+    import whisper
+
+    torch.set_num_threads(torch_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+    _worker_model = whisper.load_model(model_name)
+
+
+def transcribe_chunk(index, chunk_source, language="ko"):
+    """
+    워커 프로세스에서 청크 하나를 변환하여 (인덱스, 텍스트, 세그먼트) 반환
+    chunk_source는 오디오 파일 경로 또는 (PCM 파일 경로, 샘플 구간 목록)
+    세그먼트 시간은 청크 내부 기준(초)
+    """
+    if isinstance(chunk_source, tuple):
+        pcm_path, segments = chunk_source
+        chunk_source = read_pcm_segments(pcm_path, segments)
+
+    result = _worker_model.transcribe(
+        chunk_source,
+        language=language,
+        verbose=False
+    )
+    segments = [(seg["start"], seg["end"], seg["text"]) for seg in result.get("segments", [])]
+    return index, result["text"], segments
+
+
+def get_transcription_pool(max_workers, model_name, torch_threads):
+    """공유 프로세스 풀 반환 (없으면 생성)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # torch/스레드 상태가 fork로 복제되지 않도록 spawn 사용
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_name, torch_threads)
+            )
+        return _pool
+
+
+def reset_transcription_pool(broken_pool):
+    """손상된 풀(BrokenProcessPool)을 폐기하여 다음 호출 시 새로 생성되도록 함"""
+    global _pool
+    with _pool_lock:
+        if _pool is broken_pool:
+            _pool = None
+    broken_pool.shutdown(wait=False)
+
+
+def shutdown_transcription_pool():
+    """프로세스 풀 종료"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False)
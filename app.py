@@ -1,3 +1,7 @@
+# 모듈 import 시간 측정 (다른 모듈보다 먼저 설치)
+from utils import import_timing
+import_timing.install()
+
 from flask import Flask, request, jsonify, send_file, render_template, Response, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
@@ -5,31 +9,52 @@ import os
 import uuid
 import time
 import json
+import threading
 import atexit
 
 # 설정 및 유틸리티 모듈 가져오기
 from config import (
     logger, UPLOAD_FOLDER, PROCESSED_FOLDER, RESULTS_FOLDER, DATA_FOLDER,
-    MAX_CONTENT_LENGTH, MAX_WORKERS, ALLOWED_EXTENSIONS
+    MAX_CONTENT_LENGTH, MAX_WORKERS, ALLOWED_EXTENSIONS, UPLOAD_CHUNK_SIZE,
+    PROGRESS_STREAM_HEARTBEAT, PROGRESS_STREAM_MAX_PENDING, PROGRESS_STREAM_MAX_SECONDS, PROGRESS_STREAM_MAX_CONNECTIONS,
+    PROGRESS_SYNC_INTERVAL, MODEL_WARMUP_ON_START, STARTUP_IMPORT_WARN_SECONDS, RUN_WORKERS_IN_APP
 )
 from utils.queue_worker import (
-    task_queue, update_progress, get_progress, get_all_progress,
-    worker_function, start_workers, stop_workers
+    task_queue, progress_store, update_progress, get_progress, get_all_progress,
+    worker_function, start_workers, stop_workers, executor
+)
+from utils.file_utils import (
+    allowed_file, save_uploaded_file_with_hash, sanitize_filename, cleanup_files
+)
+from utils.dedup import find_completed_task, register_upload
+from utils.checkpoint import load_manifest, completed_stages
+from utils.chunked_upload import (
+    UploadOffsetError, create_upload_session, get_upload_session,
+    append_upload_chunk, finalize_upload_session
 )
-from utils.file_utils import allowed_file, save_uploaded_file, sanitize_filename
+from utils.async_loop import iterate_async
+from utils.model_loader import warm_up_models, get_model_status
+from utils.stage_scheduler import get_stage_stats, shutdown_stage_scheduler
 from utils.api_utils import format_response, create_error_response, create_success_response
 
 # 처리 함수 가져오기
 from main_processor import process_lecture
+from processors.audio import ensure_processed_mp3
 
 # AI 서비스 모듈 가져오기
 from ai_services.generation import (
     stream_summary, stream_quiz, stream_study_plan,
-    generate_summary, generate_quiz, generate_study_plan, global_summary
+    generate_summary, generate_quiz, generate_study_plan, load_summary
 )
 from ai_services.vector_db import (
-    index_lecture_text, generate_streaming_answer, generate_answer
+    index_lecture_text, generate_streaming_answer, generate_answer, search_lectures
 )
+from ai_services.global_index import flush_global_index
+from ai_services.embeddings import get_embedding_stats
+from ai_services.answer_cache import get_answer_cache_stats
+from ai_services.llm_cache import get_llm_cache_stats
+from ai_services.llm_gateway import get_llm_gateway_stats
+from ai_services.whisper_pool import shutdown_transcription_pool
 
 # Flask 앱 초기화
 app = Flask(__name__)
@@ -43,16 +68,49 @@ app.config['DATA_FOLDER'] = DATA_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 app.config['ALLOWED_EXTENSIONS'] = ALLOWED_EXTENSIONS
 
-# 작업 처리 워커 시작 - 메인 프로세서 설정
-worker = worker_function(process_lecture)
-worker_threads = start_workers(worker, MAX_WORKERS)
+# 시작 시간 기록 (모델은 처음 사용할 때 로드하므로 /health는 바로 응답)
+startup_seconds = import_timing.mark_startup_complete()
+startup_report = import_timing.get_startup_report(limit=5)
+logger.info(f"앱 초기화 완료: {startup_seconds}초 (모듈 import {startup_report['import_seconds']}초)")
+if startup_report["import_seconds"] > STARTUP_IMPORT_WARN_SECONDS:
+    slowest = ", ".join(f"{item['module']} {item['self_seconds']}초" for item in startup_report["slowest_modules"])
+    logger.warning(f"모듈 import가 {STARTUP_IMPORT_WARN_SECONDS}초를 넘었습니다: {slowest}")
+
+# 앱 프로세스에서 실행한 작업 처리 워커 스레드
+worker_threads = []
+
+
+def start_background_tasks():
+    """작업 처리 워커 시작, 모델 미리 로드, 종료 시 정리 함수 등록"""
+    # 작업 처리 워커 시작 - 메인 프로세서 설정
+    # (RUN_WORKERS_IN_APP=false면 API만 담당하고 작업은 독립 워커 프로세스(worker.py)가 처리)
+    if RUN_WORKERS_IN_APP:
+        worker = worker_function(process_lecture)
+        worker_threads.extend(start_workers(worker, MAX_WORKERS))
+    else:
+        logger.info("API 전용 모드: 작업은 독립 워커 프로세스에서 처리")
+
+    # 모델 미리 로드 (백그라운드, 완료 전 요청은 처음 사용할 때 로드)
+    # API 전용 모드에서는 질의응답/검색에 쓰는 임베딩 모델만 필요
+    if MODEL_WARMUP_ON_START:
+        executor.submit(warm_up_models, None if RUN_WORKERS_IN_APP else ["embedding"])
+
+    atexit.register(cleanup)
 
 
 # 종료 시 정리 함수
-@atexit.register
 def cleanup():
     """애플리케이션 종료 시 정리"""
-    stop_workers(MAX_WORKERS)
+    stop_workers(len(worker_threads))
+    shutdown_stage_scheduler()
+    shutdown_transcription_pool()
+    flush_global_index()
+
+
+# spawn으로 시작한 Whisper 변환 프로세스는 부모의 메인 모듈(python app.py로 실행하면 이 파일)을
+# __mp_main__으로 다시 실행하므로, 그때는 작업 처리 워커/모델 로드/종료 정리를 시작하지 않음
+if __name__ != "__mp_main__":
+    start_background_tasks()
 
 
 # 메인 페이지
@@ -61,6 +119,22 @@ def index():
     return render_template('test.html')
 
 
+def enqueue_uploaded_file(task_id, file_path, content_hash, callback_url, lecture_id, remaining_days):
+    """업로드가 끝난 파일을 처리 대기열에 추가 (같은 내용을 이미 처리했으면 결과 재사용)"""
+    update_progress(task_id, "uploaded", 10, "파일 업로드 완료")
+
+    # 같은 내용의 파일을 이미 처리했으면 워커가 결과를 복제하고 바로 콜백 전송
+    # (재사용도 작업 큐를 거치므로 처리 중 프로세스가 종료되어도 다시 시도됨)
+    source_task_id = find_completed_task(content_hash)
+    if source_task_id:
+        logger.info(f"중복 업로드 감지: {task_id} (기존 작업 {source_task_id})")
+        task_queue.put((task_id, file_path, None, callback_url, lecture_id, remaining_days, source_task_id))
+    else:
+        register_upload(task_id, content_hash)
+        # 작업 큐에 추가 (remaining_days 추가)
+        task_queue.put((task_id, file_path, None, callback_url, lecture_id, remaining_days))
+
+
 # 백엔드 수신용 api
 @app.route('/process', methods=['POST'])
 def process_request():
@@ -87,7 +161,7 @@ def process_request():
             task_id = str(uuid.uuid4())
             filename = sanitize_filename(secure_filename(file.filename))
             upload_dir = os.path.join(app.config['UPLOAD_FOLDER'], task_id)
-            file_path = save_uploaded_file(file, upload_dir, filename)
+            file_path, content_hash = save_uploaded_file_with_hash(file, upload_dir, filename)
 
             # lecture_id가 없으면 기본값으로 1 사용 (숫자 형식)
             lecture_id = request.form.get('lecture_id', '1')
@@ -109,10 +183,7 @@ def process_request():
 
             callback_url = request.form.get('callback_url', 'http://localhost:8080/api/ai/callback/complete')
 
-            update_progress(task_id, "uploaded", 10, "파일 업로드 완료")
-
-            # 작업 큐에 추가 (remaining_days 추가)
-            task_queue.put((task_id, file_path, None, callback_url, str(lecture_id), remaining_days))
+            enqueue_uploaded_file(task_id, file_path, content_hash, callback_url, str(lecture_id), remaining_days)
 
             # Spring Boot가 기대하는 응답 형식
             return jsonify({
@@ -188,6 +259,142 @@ def process_request():
         }), 400
 
 
+# 분할 업로드 시작 엔드포인트
+@app.route('/upload/init', methods=['POST'])
+def upload_init():
+    """
+    분할(재개 가능) 업로드 세션 생성
+    요청(JSON): filename, total_size(선택), lecture_id, remaining_days, callback_url
+    응답: task_id, offset(0), chunk_size(권장 청크 크기)
+    """
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename', '')
+
+    if not filename or not allowed_file(filename):
+        return jsonify(create_error_response(
+            f"지원되지 않는 파일 형식입니다. 허용된 형식: {', '.join(ALLOWED_EXTENSIONS)}"
+        )), 400
+
+    total_size = data.get('total_size')
+    try:
+        total_size = int(total_size) if total_size is not None else None
+    except (TypeError, ValueError):
+        return jsonify(create_error_response("total_size가 올바르지 않습니다")), 400
+    if total_size is not None and (total_size <= 0 or total_size > MAX_CONTENT_LENGTH):
+        return jsonify(create_error_response("허용되지 않는 파일 크기입니다")), 400
+
+    try:
+        remaining_days = int(data.get('remaining_days', 5))
+    except (TypeError, ValueError):
+        remaining_days = 5
+
+    try:
+        task_id = str(uuid.uuid4())
+        create_upload_session(
+            task_id,
+            sanitize_filename(secure_filename(filename)),
+            total_size=total_size,
+            lecture_id=str(data.get('lecture_id', '1')),
+            remaining_days=remaining_days,
+            callback_url=data.get('callback_url', 'http://localhost:8080/api/ai/callback/complete')
+        )
+        update_progress(task_id, "uploading", 0, "파일 업로드 중...")
+
+        return jsonify(create_success_response(
+            message="업로드 세션 생성됨",
+            data={"task_id": task_id, "offset": 0, "chunk_size": UPLOAD_CHUNK_SIZE}
+        )), 200
+    except Exception as e:
+        logger.error(f"업로드 세션 생성 실패: {str(e)}")
+        return jsonify(create_error_response(str(e))), 500
+
+
+# 분할 업로드 상태 조회 엔드포인트 (재개 시 이어서 보낼 오프셋 확인)
+@app.route('/upload/<task_id>', methods=['GET'])
+def upload_status(task_id):
+    """업로드 세션 상태 및 현재까지 받은 크기 조회"""
+    session = get_upload_session(task_id)
+    if not session:
+        return jsonify(create_error_response("업로드 세션을 찾을 수 없습니다")), 404
+
+    return jsonify(create_success_response(data={
+        "task_id": task_id,
+        "status": session["status"],
+        "offset": session["offset"],
+        "total_size": session["total_size"]
+    })), 200
+
+
+# 분할 업로드 청크 전송 엔드포인트
+@app.route('/upload/<task_id>', methods=['PUT', 'PATCH'])
+def upload_append(task_id):
+    """
+    청크 이어 쓰기 - 본문은 파일 바이트 그대로(application/octet-stream), offset은 쿼리 파라미터
+    offset이 서버가 받은 크기와 다르면 409와 함께 현재 offset 반환
+    """
+    try:
+        offset = int(request.args.get('offset', ''))
+    except ValueError:
+        return jsonify(create_error_response("offset이 필요합니다")), 400
+
+    try:
+        new_offset = append_upload_chunk(task_id, offset, request.stream)
+    except UploadOffsetError as e:
+        body, _ = format_response(status=False, message=str(e), data={"offset": e.current_offset})
+        return jsonify(body), 409
+    except ValueError as e:
+        return jsonify(create_error_response(str(e))), 400
+    except Exception as e:
+        logger.error(f"업로드 청크 저장 실패: {str(e)}")
+        return jsonify(create_error_response(str(e))), 500
+
+    session = get_upload_session(task_id)
+    if session and session["total_size"]:
+        update_progress(task_id, "uploading", round(10 * new_offset / session["total_size"], 1),
+                        f"파일 업로드 중... ({new_offset}/{session['total_size']} bytes)")
+
+    return jsonify(create_success_response(data={"task_id": task_id, "offset": new_offset})), 200
+
+
+# 분할 업로드 완료 엔드포인트
+@app.route('/upload/<task_id>/finalize', methods=['POST'])
+def upload_finalize(task_id):
+    """업로드 완료 후 처리 대기열에 추가 (sha256을 보내면 내용 검증)"""
+    data = request.get_json(silent=True) or {}
+
+    try:
+        file_path, content_hash, session = finalize_upload_session(task_id)
+    except UploadOffsetError as e:
+        body, _ = format_response(status=False, message=str(e), data={"offset": e.current_offset})
+        return jsonify(body), 409
+    except ValueError as e:
+        return jsonify(create_error_response(str(e))), 400
+
+    expected_hash = data.get('sha256')
+    if expected_hash and expected_hash.lower() != content_hash:
+        logger.error(f"업로드 파일 해시 불일치: {task_id}")
+        cleanup_files(os.path.dirname(file_path))
+        update_progress(task_id, "failed", 0, "업로드 파일이 손상되었습니다")
+        return jsonify(create_error_response("업로드 파일 해시가 일치하지 않습니다")), 400
+
+    try:
+        enqueue_uploaded_file(task_id, file_path, content_hash, session["callback_url"],
+                              session["lecture_id"], session["remaining_days"])
+
+        # /process 파일 업로드와 같은 응답 형식
+        return jsonify({
+            "success": True,
+            "message": "파일 업로드 완료",
+            "file_url": file_path,
+            "task_id": task_id,
+            "lecture_id": session["lecture_id"],
+            "sha256": content_hash
+        }), 200
+    except Exception as e:
+        logger.error(f"업로드 완료 처리 실패: {str(e)}")
+        return jsonify(create_error_response(str(e))), 500
+
+
 # 작업 진행 상황 조회 엔드포인트
 @app.route('/progress/<task_id>', methods=['GET'])
 def get_task_progress(task_id):
@@ -207,6 +414,81 @@ def get_all_task_progress():
     return jsonify(get_all_progress()), 200
 
 
+# 작업 진행 상황 스트림 엔드포인트 (Server-Sent Events)
+# 연결 하나가 웹 워커 스레드 하나를 점유하므로 프로세스당 동시 연결 수 제한
+_stream_slots = threading.BoundedSemaphore(PROGRESS_STREAM_MAX_CONNECTIONS)
+
+@app.route('/progress/stream', methods=['GET'])
+def stream_task_progress():
+    """
+    진행 상황 변경을 SSE로 전달 (폴링 대체)
+    - task_ids: 쉼표로 구분된 작업 ID 목록 (생략 시 모든 작업)
+    - 지정한 작업이 모두 종료(completed/failed/cancelled)되면 end 이벤트 후 스트림 종료
+    - 연결 하나가 웹 워커 스레드를 계속 점유하지 않도록 PROGRESS_STREAM_MAX_SECONDS가 지나면 스트림을 끊음
+      (EventSource는 자동으로 재연결하며, Last-Event-ID(마지막 진행 상황 시각) 이전에 받은 상태는 다시 보내지 않음)
+    - 동시 연결이 PROGRESS_STREAM_MAX_CONNECTIONS를 넘으면 503 (Retry-After 후 다시 연결하거나 /progress로 폴링)
+    """
+    if not _stream_slots.acquire(blocking=False):
+        response = jsonify(create_error_response("진행 상황 스트림 연결 수 초과, 잠시 후 다시 시도하세요"))
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+
+    task_ids = [task_id.strip() for task_id in request.args.get('task_ids', '').split(',') if task_id.strip()]
+    try:
+        # 다른 프로세스의 업데이트는 동기화 간격만큼 늦게 도착할 수 있으므로 여유를 두고 비교
+        resend_after = float(request.headers.get('Last-Event-ID', '')) - PROGRESS_SYNC_INTERVAL - 1
+    except ValueError:
+        resend_after = None
+    try:
+        subscription = progress_store.subscribe(task_ids or None, max_pending=PROGRESS_STREAM_MAX_PENDING)
+    except Exception:
+        _stream_slots.release()
+        raise
+
+    def generate():
+        finished = set()
+        deadline = time.monotonic() + PROGRESS_STREAM_MAX_SECONDS
+        try:
+            # 연결 직후 재연결 간격 안내
+            yield "retry: 3000\n\n"
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # 최대 유지 시간 초과 - 클라이언트가 Last-Event-ID로 재연결
+                    return
+
+                updates = subscription.get(timeout=min(PROGRESS_STREAM_HEARTBEAT, remaining))
+                if not updates:
+                    # 프록시/클라이언트 연결 유지를 위한 하트비트 (주석 프레임)
+                    yield ": heartbeat\n\n"
+                    continue
+
+                for task_id, progress in updates:
+                    if progress.get("status") in ("completed", "failed", "cancelled"):
+                        finished.add(task_id)
+                    timestamp = progress.get("timestamp", 0)
+                    if resend_after is not None and timestamp <= resend_after:
+                        continue  # 재연결 전에 이미 받은 상태
+                    data = json.dumps(dict(progress, task_id=task_id), ensure_ascii=False)
+                    yield f"event: progress\nid: {timestamp:.6f}\ndata: {data}\n\n"
+
+                if task_ids and finished.issuperset(task_ids):
+                    yield "event: end\ndata: {}\n\n"
+                    return
+        finally:
+            subscription.close()
+
+    response = Response(
+        stream_with_context(generate()),
+        content_type='text/event-stream; charset=utf-8',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # 스트림을 시작하기 전에 연결이 끊겨도 반환되도록 응답 종료 시점에 반환
+    response.call_on_close(_stream_slots.release)
+    return response
+
+
 # AI 변환 결과 조회 엔드포인트
 @app.route('/ai/transcribe', methods=['POST'])
 def transcribe_audio():
@@ -245,14 +527,13 @@ def download_processed_audio(task_id):
         if not os.path.exists(processed_dir):
             return jsonify(create_error_response("처리된 파일을 찾을 수 없습니다")), 404
 
-        # 디렉토리 내 mp3 파일 찾기
-        audio_files = [f for f in os.listdir(processed_dir) if f.endswith('.mp3')]
-
-        if not audio_files:
+        # 완료된 작업은 MP3만 남아 있음, 처리 중인 작업은 PCM에서 한 번만 인코딩 (임시 파일 → 이름 변경)
+        audio_path = ensure_processed_mp3(task_id)
+        if audio_path is None:
             return jsonify(create_error_response("처리된 오디오 파일을 찾을 수 없습니다")), 404
 
         return send_file(
-            os.path.join(processed_dir, audio_files[0]),
+            audio_path,
             mimetype='audio/mpeg',
             as_attachment=True,
             download_name=f"processed_{task_id}.mp3"
@@ -300,10 +581,37 @@ def cancel_task(task_id):
     if not progress:
         return jsonify(create_error_response("작업을 찾을 수 없습니다")), 404
 
+    # 아직 시작되지 않은 작업은 대기열에서 제거
+    task_queue.cancel(task_id)
     update_progress(task_id, "cancelled", 0, "사용자에 의해 취소됨")
     return jsonify(create_success_response("작업 취소 요청됨")), 200
 
 
+# 실패한 작업 재개 엔드포인트
+@app.route('/resume/<task_id>', methods=['POST'])
+def resume_task(task_id):
+    """실패한 작업을 마지막으로 완료된 단계 다음부터 다시 처리 (저장된 단계 결과 재사용)"""
+    manifest = load_manifest(task_id)
+    if not manifest or not manifest.get("job"):
+        return jsonify(create_error_response("재개할 체크포인트가 없습니다")), 404
+
+    # dead-letter 작업은 시도 횟수를 초기화하여 되살리고, 없으면 기록된 인자로 다시 추가
+    # (진행 중인 작업 확인과 추가는 큐에서 하나의 트랜잭션으로 처리)
+    if not task_queue.resume(tuple(manifest["job"])):
+        return jsonify(create_error_response("이미 대기 중이거나 처리 중인 작업입니다")), 409
+
+    completed = completed_stages(task_id)
+    update_progress(task_id, "queued", 0, f"재개 대기 중 (완료된 단계 {len(completed)}개 재사용)")
+    return jsonify(create_success_response("작업 재개 요청됨", data={"task_id": task_id, "completed_stages": completed})), 200
+
+
+# 재시도 한도를 초과한 작업 목록 조회 엔드포인트
+@app.route('/queue/dead-letters', methods=['GET'])
+def get_dead_letters():
+    """dead-letter 처리된 작업 목록 조회"""
+    return jsonify(create_success_response(data={"tasks": task_queue.dead_letters()})), 200
+
+
 # 서버 상태 확인 엔드포인트
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -315,10 +623,42 @@ def health_check():
         "status": "healthy",
         "time": time.time(),
         "queue_size": queue_size,
-        "active_tasks": len(get_all_progress())
+        "active_tasks": len(progress_store),
+        "workers_in_app": len(worker_threads),
+        "progress_subscribers": progress_store.subscriber_count(),
+        "embedding": get_embedding_stats(),
+        "answer_cache": get_answer_cache_stats(),
+        "llm_cache": get_llm_cache_stats(),
+        "llm_gateway": get_llm_gateway_stats(),
+        "stages": get_stage_stats(),
+        "models": get_model_status(),
+        "startup": import_timing.get_startup_report()
     }), 200
 
 
+# 모델 미리 로드 엔드포인트 (배포 직후 첫 요청 지연 방지)
+@app.route('/warmup', methods=['POST'])
+def warmup_models():
+    """모델 미리 로드 - wait가 true면 로드가 끝난 뒤 응답"""
+    data = request.get_json(silent=True) or {}
+    models = data.get('models')
+    wait = data.get('wait', False)
+
+    try:
+        if wait:
+            status = warm_up_models(models)
+            failed = [name for name, model in status.items() if model["error"]]
+            if failed:
+                body, _ = format_response(status=False, message=f"모델 로드 실패: {', '.join(failed)}", data={"models": status})
+                return jsonify(body), 500
+            return jsonify(create_success_response("모델 로드 완료", {"models": status})), 200
+
+        executor.submit(warm_up_models, models)
+        return jsonify(create_success_response("모델 로드 시작", {"models": get_model_status()})), 202
+    except ValueError as e:
+        return jsonify(create_error_response(str(e))), 400
+
+
 # 요약 생성 엔드포인트
 @app.route('/summary', methods=['POST', 'GET'])
 def summary_api():
@@ -344,7 +684,7 @@ def summary_api():
                     text = f.read()
 
                 return Response(
-                    stream_with_context(stream_summary(lecture_id, text)),
+                    stream_with_context(iterate_async(stream_summary(lecture_id, text))),
                     content_type='text/plain; charset=utf-8'
                 )
             except Exception as e:
@@ -379,29 +719,21 @@ def quizzes_api():
         lecture_id = request.json['lecture_id']
         streaming = request.json.get('streaming', True)
 
-        # 요약 데이터 확인
-        if lecture_id not in global_summary or not global_summary[lecture_id]:
-            # 요약이 없을 경우, 파일에서 요약 찾기 시도
-            summary_path = os.path.join(app.config['RESULTS_FOLDER'], lecture_id, f"{lecture_id}_summary.json")
-            if os.path.exists(summary_path):
-                with open(summary_path, 'r', encoding='utf-8') as f:
-                    summary_data = json.load(f)
-                    global_summary[lecture_id] = summary_data.get('summary_text', '')
-
-            # 그래도 없으면 에러 반환
-            if lecture_id not in global_summary or not global_summary[lecture_id]:
-                return jsonify(create_error_response('요약 결과가 없습니다. 먼저 /summary 엔드포인트를 호출하세요.')), 400
+        # 요약 데이터 확인 (결과 폴더의 요약 파일 - 요약을 생성한 프로세스와 달라도 조회 가능)
+        summary_text = load_summary(lecture_id)
+        if not summary_text:
+            return jsonify(create_error_response('요약 결과가 없습니다. 먼저 /summary 엔드포인트를 호출하세요.')), 400
 
         if streaming:
             # 스트리밍 방식 응답
             return Response(
-                stream_with_context(stream_quiz(lecture_id)),
+                stream_with_context(iterate_async(stream_quiz(lecture_id))),
                 content_type='text/plain; charset=utf-8'
             )
         else:
             # 비동기 퀴즈 생성 요청
             try:
-                quiz_text = generate_quiz(lecture_id, global_summary[lecture_id])
+                quiz_text = generate_quiz(lecture_id, summary_text)
                 return jsonify(create_success_response(data={"quiz": quiz_text}))
             except Exception as e:
                 logger.error(f"퀴즈 생성 실패: {str(e)}")
@@ -438,29 +770,21 @@ def study_plan_api():
             # 변환 실패 시 기본값 5 사용
             remaining_days = 5
 
-        # 요약 데이터 확인
-        if lecture_id not in global_summary or not global_summary[lecture_id]:
-            # 요약이 없을 경우, 파일에서 요약 찾기 시도
-            summary_path = os.path.join(app.config['RESULTS_FOLDER'], lecture_id, f"{lecture_id}_summary.json")
-            if os.path.exists(summary_path):
-                with open(summary_path, 'r', encoding='utf-8') as f:
-                    summary_data = json.load(f)
-                    global_summary[lecture_id] = summary_data.get('summary_text', '')
-
-            # 그래도 없으면 에러 반환
-            if lecture_id not in global_summary or not global_summary[lecture_id]:
-                return jsonify(create_error_response('요약 결과가 없습니다. 먼저 /summary 엔드포인트를 호출하세요.')), 400
+        # 요약 데이터 확인 (결과 폴더의 요약 파일 - 요약을 생성한 프로세스와 달라도 조회 가능)
+        summary_text = load_summary(lecture_id)
+        if not summary_text:
+            return jsonify(create_error_response('요약 결과가 없습니다. 먼저 /summary 엔드포인트를 호출하세요.')), 400
 
         if streaming:
             # 스트리밍 방식 응답 - remaining_days 전달
             return Response(
-                stream_with_context(stream_study_plan(lecture_id, remaining_days)),
+                stream_with_context(iterate_async(stream_study_plan(lecture_id, remaining_days))),
                 content_type='text/plain; charset=utf-8'
             )
         else:
             # 비동기 학습 계획 생성 요청 - remaining_days 전달
             try:
-                plan_text = generate_study_plan(lecture_id, global_summary[lecture_id], remaining_days)
+                plan_text = generate_study_plan(lecture_id, summary_text, remaining_days)
                 return jsonify(create_success_response(data={"plan": plan_text, "days": remaining_days}))
             except Exception as e:
                 logger.error(f"학습 계획 생성 실패: {str(e)}")
@@ -526,6 +850,35 @@ def query():
         return jsonify(create_error_response(str(e))), 500
 
 
+# 전체 강의 검색 API
+@app.route('/search', methods=['POST'])
+def search():
+    """전체 강의 또는 지정한 강의 목록(task_ids)에서 관련 내용 검색"""
+    try:
+        data = request.json
+        query_text = data.get('query')
+        task_ids = data.get('task_ids')  # 선택: 강의(과목) 단위 필터
+        top_k = data.get('top_k', 10)
+
+        if not query_text:
+            return jsonify(create_error_response("query가 필요합니다")), 400
+
+        if task_ids is not None and not isinstance(task_ids, list):
+            return jsonify(create_error_response("task_ids는 목록이어야 합니다")), 400
+
+        try:
+            top_k = max(1, min(100, int(top_k)))
+        except (ValueError, TypeError):
+            top_k = 10
+
+        results = search_lectures(query_text, task_ids=task_ids, top_k=top_k)
+        return jsonify(create_success_response(data={"results": results}))
+
+    except Exception as e:
+        logger.error(f"전체 검색 실패: {str(e)}")
+        return jsonify(create_error_response(str(e))), 500
+
+
 # 강의 목록 조회
 @app.route('/lectures', methods=['GET'])
 def get_lectures():
@@ -14,17 +14,34 @@ UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
 PROCESSED_FOLDER = os.path.join(BASE_DIR, 'processed')
 RESULTS_FOLDER = os.path.join(BASE_DIR, 'results')
 DATA_FOLDER = os.path.join(BASE_DIR, 'data')
+INDEX_FOLDER = os.path.join(BASE_DIR, 'indexes')  # 강의별 FAISS 인덱스 저장소
+CACHE_FOLDER = os.path.join(BASE_DIR, 'cache')  # 임베딩 등 캐시 저장소
+STATE_FOLDER = os.path.join(BASE_DIR, 'state')  # 작업 큐 등 SQLite 상태 저장소
 
 # 폴더 생성
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(PROCESSED_FOLDER, exist_ok=True)
 os.makedirs(RESULTS_FOLDER, exist_ok=True)
 os.makedirs(DATA_FOLDER, exist_ok=True)
+os.makedirs(INDEX_FOLDER, exist_ok=True)
+os.makedirs(CACHE_FOLDER, exist_ok=True)
+os.makedirs(STATE_FOLDER, exist_ok=True)
 
 # Groq API 설정 (필수)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "gemma2-9b-it")
 
+# Groq 호출 한도 (모든 호출이 공유 게이트웨이를 거침)
+GROQ_RPM = int(os.getenv("GROQ_RPM", 30))  # 분당 요청 수
+GROQ_TPM = int(os.getenv("GROQ_TPM", 15000))  # 분당 토큰 수
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", 4))  # 동시 요청 수
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", 5))  # 429/5xx/연결 오류 재시도 횟수
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", 120))  # 요청 타임아웃(초)
+# 호출 한도를 SQLite로 모든 프로세스(웹 워커, 파이프라인 워커, 독립 워커)가 공유
+# (false면 프로세스마다 한도를 따로 적용하므로 실제 한도는 프로세스 수만큼 늘어남)
+GROQ_LIMITS_SHARED = os.getenv("GROQ_LIMITS_SHARED", "true").lower() == "true"
+GROQ_LIMITS_DB_PATH = os.getenv("GROQ_LIMITS_DB_PATH", os.path.join(STATE_FOLDER, 'groq_limits.db'))
+
 # API 키 검증
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY가 설정되지 않았습니다. .env 파일을 확인하세요.")
@@ -37,13 +54,122 @@ if BACKEND_URL.endswith('/'):
 # 파일 업로드 관련 설정
 ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'webm', 'mp3', 'wav', 'flac', 'm4a', 'pdf', 'pptx', 'docx', 'doc'}
 MAX_CONTENT_LENGTH = 5 * 1024 * 1024 * 1024  # 5GB 제한
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024))  # 분할 업로드 권장 청크 크기
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", 24 * 3600))  # 갱신 없는 분할 업로드 세션 보관 시간(초)
 
 # 워커 관련 설정
-MAX_WORKERS = 6
+# false면 API 서버는 요청 접수/조회만 담당하고 작업은 독립 워커(worker.py)가 처리
+RUN_WORKERS_IN_APP = os.getenv("RUN_WORKERS_IN_APP", "true").lower() == "true"
+WORKER_SHUTDOWN_TIMEOUT = int(os.getenv("WORKER_SHUTDOWN_TIMEOUT", 600))  # 독립 워커 종료 시 처리 중인 작업 대기 시간(초)
+# 작업 조율 스레드 수 (무거운 단계는 아래 단계 스케줄러 풀에서 실행되므로 대부분 대기 상태)
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", 12))
+
+# gunicorn 다중 프로세스 실행 설정 (gunicorn.conf.py)
+WEB_BIND = os.getenv("WEB_BIND", "0.0.0.0:5000")
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", 2))  # 요청을 처리하는 웹 워커 프로세스 수
+WEB_THREADS = int(os.getenv("WEB_THREADS", 8))  # 웹 워커당 스레드 수 (스트리밍 응답이 프로세스를 점유하지 않도록)
+WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", 300))  # 요청 처리 제한 시간(초)
+# 마스터가 fork하는 파이프라인 워커 프로세스 수 (0이면 별도로 실행한 worker.py만 작업 처리)
+PIPELINE_PROCESSES = int(os.getenv("PIPELINE_PROCESSES", 1))
+
+# 단계 스케줄러 설정 - 다운로드/LLM 단계는 넓은 I/O 풀, ffmpeg/VAD/Whisper/임베딩은 코어 수 기준의 좁은 CPU 풀
+IO_POOL_WORKERS = int(os.getenv("IO_POOL_WORKERS", 32))
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", max(1, (os.cpu_count() or 1) // 2)))
+# 단계별 동시 실행 한도 ("단계=개수" 쉼표 구분, 지정하지 않은 단계는 풀 크기까지)
+STAGE_CONCURRENCY = {
+    stage.strip(): int(limit)
+    for stage, _, limit in (item.partition("=") for item in os.getenv("STAGE_CONCURRENCY", "transcribe=1,index=2").split(","))
+    if stage.strip() and limit.strip()
+}
+# 프로세스 내 Whisper/임베딩 모델의 torch 스레드 수 (CPU 풀 작업끼리 코어를 나눠 쓰도록)
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", max(1, (os.cpu_count() or 1) // CPU_POOL_WORKERS)))
+
+# 영속 작업 큐 설정 (SQLite WAL - 재시작/배포 시에도 작업 유지)
+QUEUE_DB_PATH = os.getenv("QUEUE_DB_PATH", os.path.join(STATE_FOLDER, 'tasks.db'))
+QUEUE_VISIBILITY_TIMEOUT = int(os.getenv("QUEUE_VISIBILITY_TIMEOUT", 600))  # lease 시간(초), 처리 중에는 자동 연장
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", 3))  # 초과 시 dead-letter
+QUEUE_RETRY_DELAY = int(os.getenv("QUEUE_RETRY_DELAY", 30))  # 재시도 지연(초) x 시도 횟수
+
+# 진행 상황 저장소 설정
+PROGRESS_TTL = int(os.getenv("PROGRESS_TTL", 3600))  # 완료/실패 작업 보관 시간(초)
+PROGRESS_COALESCE_INTERVAL = float(os.getenv("PROGRESS_COALESCE_INTERVAL", 0.5))  # 같은 상태 업데이트 병합 간격(초)
+PROGRESS_STREAM_HEARTBEAT = int(os.getenv("PROGRESS_STREAM_HEARTBEAT", 15))  # SSE 하트비트 간격(초)
+PROGRESS_STREAM_MAX_PENDING = int(os.getenv("PROGRESS_STREAM_MAX_PENDING", 100))  # 구독자별 버퍼 크기(작업 수)
+# SSE 연결 하나의 최대 유지 시간(초) - 웹 워커 스레드를 오래 점유하지 않도록 짧게 끊고 클라이언트가 Last-Event-ID로 재연결
+PROGRESS_STREAM_MAX_SECONDS = int(os.getenv("PROGRESS_STREAM_MAX_SECONDS", 30))
+# 웹 워커 프로세스당 동시 SSE 연결 수 (초과하면 503, 나머지 스레드는 일반 요청용으로 남김)
+PROGRESS_STREAM_MAX_CONNECTIONS = int(os.getenv("PROGRESS_STREAM_MAX_CONNECTIONS", max(1, WEB_THREADS // 2)))
+# 진행 상황을 SQLite에 기록하여 API 서버와 독립 워커 프로세스가 공유 (같은 호스트 또는 공유 볼륨)
+PROGRESS_SHARED = os.getenv("PROGRESS_SHARED", "true").lower() == "true"
+PROGRESS_DB_PATH = os.getenv("PROGRESS_DB_PATH", os.path.join(STATE_FOLDER, 'progress.db'))
+PROGRESS_SYNC_INTERVAL = float(os.getenv("PROGRESS_SYNC_INTERVAL", 0.5))  # 다른 프로세스의 업데이트 확인 간격(초)
+
+# 단계 체크포인트 설정 (단계별 결과를 저장하여 실패한 작업을 마지막 완료 단계 다음부터 재개)
+CHECKPOINT_ENABLED = os.getenv("CHECKPOINT_ENABLED", "true").lower() == "true"
+CHECKPOINT_FOLDER = os.getenv("CHECKPOINT_FOLDER", os.path.join(STATE_FOLDER, 'checkpoints'))
+CHECKPOINT_TTL = int(os.getenv("CHECKPOINT_TTL", 7 * 24 * 3600))  # 실패한 작업의 체크포인트/업로드 파일 보관 시간(초)
+
+# 질의응답 대화 기록 설정 (SQLite - 여러 프로세스가 같은 기록을 공유)
+CONVERSATION_DB_PATH = os.getenv("CONVERSATION_DB_PATH", os.path.join(STATE_FOLDER, 'conversations.db'))
+CONVERSATION_HISTORY_SIZE = int(os.getenv("CONVERSATION_HISTORY_SIZE", 6))  # 강의별로 유지할 최근 메시지 수
+
+# 요약 설정 (긴 강의는 구간별 요약 후 통합하는 map-reduce 방식)
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", 8192))  # 모델 컨텍스트 길이
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", 4000))  # 응답 최대 토큰
+SUMMARY_SECTION_TOKENS = int(os.getenv("SUMMARY_SECTION_TOKENS", 3000))  # 구간당 입력 토큰 예산
+SUMMARY_SECTION_OUTPUT_TOKENS = int(os.getenv("SUMMARY_SECTION_OUTPUT_TOKENS", 1000))  # 구간 요약 최대 토큰
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", 3))  # 동시에 요약할 구간 수
+
+# LLM 응답 캐시 설정 (같은 모델/메시지/옵션 요청은 저장된 응답 재사용)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", 256))  # 캐시 최대 크기(MB), 초과 시 LRU 제거
+LLM_CACHE_REPLAY_CHUNK = 32  # 캐시된 응답을 스트림으로 재생할 때 조각 크기(글자)
+
+# YouTube 처리 설정
+YTDLP_AUDIO_FORMAT = os.getenv("YTDLP_AUDIO_FORMAT", "bestaudio[ext=m4a]/bestaudio/best[height<=360]/best")  # 오디오 우선, 대체 형식 순서
+YOUTUBE_CAPTIONS_ENABLED = os.getenv("YOUTUBE_CAPTIONS_ENABLED", "true").lower() == "true"  # 자막이 있으면 STT 생략
+YOUTUBE_CAPTION_LANGS = [lang.strip() for lang in os.getenv("YOUTUBE_CAPTION_LANGS", "ko").split(",") if lang.strip()]
+YOUTUBE_CAPTION_MIN_CHARS = int(os.getenv("YOUTUBE_CAPTION_MIN_CHARS", 200))  # 이보다 짧은 자막은 사용하지 않음
 
 # 로컬 모델 설정
 WHISPER_MODEL = "base"  # base, small, medium, large 중 선택
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"  # HuggingFace 임베딩 모델
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2의 임베딩 차원
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))  # 한 번에 임베딩할 청크 수
+# 모델은 처음 사용할 때 로드 (true면 서버 시작 직후 백그라운드에서 미리 로드)
+MODEL_WARMUP_ON_START = os.getenv("MODEL_WARMUP_ON_START", "true").lower() == "true"
+STARTUP_IMPORT_WARN_SECONDS = float(os.getenv("STARTUP_IMPORT_WARN_SECONDS", 5))  # 모듈 import 시간이 이보다 길면 경고
+
+# 전체 강의 검색 인덱스 설정 (HNSW 근사 최근접 검색)
+GLOBAL_INDEX_ENABLED = os.getenv("GLOBAL_INDEX_ENABLED", "true").lower() == "true"
+GLOBAL_INDEX_HNSW_M = int(os.getenv("GLOBAL_INDEX_HNSW_M", 32))  # 노드당 연결 수
+GLOBAL_INDEX_EF_CONSTRUCTION = int(os.getenv("GLOBAL_INDEX_EF_CONSTRUCTION", 80))
+GLOBAL_INDEX_EF_SEARCH = int(os.getenv("GLOBAL_INDEX_EF_SEARCH", 64))  # 검색 정확도/속도 조절
+GLOBAL_INDEX_SAVE_INTERVAL = int(os.getenv("GLOBAL_INDEX_SAVE_INTERVAL", 60))  # 인덱스 파일 저장 최소 간격(초)
+GLOBAL_INDEX_COMPACT_RATIO = float(os.getenv("GLOBAL_INDEX_COMPACT_RATIO", 0.3))  # 비활성 청크 비율이 넘으면 인덱스 재구성
+
+# 질의응답 의미 기반 캐시 설정 (유사한 질문은 저장된 답변 재사용)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.92))  # 코사인 유사도 기준
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 24 * 3600))  # 답변 유효 시간(초)
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 200))  # 강의별 최대 항목 수
+ANSWER_CACHE_MAX_LECTURES = int(os.getenv("ANSWER_CACHE_MAX_LECTURES", 500))  # 캐시할 최대 강의 수
+
+# Whisper 병렬 변환 설정 (청크를 프로세스 풀에 분산)
+TRANSCRIBE_TORCH_THREADS = int(os.getenv("TRANSCRIBE_TORCH_THREADS", 1))  # 프로세스당 torch 스레드 수
+# 변환 단계는 CPU 풀 작업 하나(TORCH_NUM_THREADS개 코어 몫)로 실행되므로 그 몫 안에서만 병렬 처리 (기본 최대 2개)
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", min(2, max(1, TORCH_NUM_THREADS // TRANSCRIBE_TORCH_THREADS))))  # 1이면 순차 처리
+TRANSCRIBE_CHUNK_RETRIES = int(os.getenv("TRANSCRIBE_CHUNK_RETRIES", 2))  # 실패한 청크 재시도 횟수
+TRANSCRIBE_MIN_CHUNK_SECONDS = int(os.getenv("TRANSCRIBE_MIN_CHUNK_SECONDS", 60))  # 병렬 처리 시 최소 청크 길이
+TRANSCRIBE_CHUNK_SECONDS = int(os.getenv("TRANSCRIBE_CHUNK_SECONDS", 600))  # 이 길이를 넘는 오디오는 분할 처리
+
+# VAD(음성 구간 검출) 설정 - 무음 구간을 제거하고 휴지 지점에서 청크 분할
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+VAD_FRAME_MS = 30  # 에너지 계산 프레임 길이
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", 10))  # 잡음 수준 대비 음성 판단 기준(dB)
+VAD_MIN_SILENCE_SECONDS = float(os.getenv("VAD_MIN_SILENCE_SECONDS", 1.0))  # 이보다 짧은 휴지는 음성에 포함
+VAD_MIN_SPEECH_SECONDS = 0.3  # 이보다 짧은 음성 구간은 잡음으로 간주
+VAD_PADDING_SECONDS = 0.2  # 음성 구간 앞뒤 여유
 
 # 로깅 설정
 def setup_logging():
@@ -68,4 +194,5 @@ logger.info(f"Backend URL: {BACKEND_URL}")
 logger.info(f"Default Callback URL: {DEFAULT_CALLBACK_URL}")
 logger.info(f"Groq Model: {GROQ_MODEL}")
 logger.info(f"Whisper Model: {WHISPER_MODEL}")
-logger.info(f"Embedding Model: {EMBEDDING_MODEL}")
\ No newline at end of file
+logger.info(f"Embedding Model: {EMBEDDING_MODEL}")
+logger.info(f"Transcribe Workers: {TRANSCRIBE_WORKERS} (torch threads: {TRANSCRIBE_TORCH_THREADS})")
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""
+gunicorn 다중 프로세스 실행 설정
+
+    gunicorn -c gunicorn.conf.py app:app
+
+- 마스터가 앱을 미리 import(preload_app)하고 Whisper/임베딩 모델을 로드한 뒤 fork하므로
+  웹 워커와 파이프라인 워커 프로세스가 모델 메모리를 copy-on-write로 공유
+- 웹 워커(WEB_WORKERS개)는 요청 접수/조회만 담당 (작업 처리 스레드를 실행하지 않음)
+- 작업 처리는 마스터가 fork한 파이프라인 워커 프로세스(PIPELINE_PROCESSES개, worker.py와 동일)가 담당
+  (0이면 별도 컨테이너/프로세스에서 실행한 worker.py가 처리)
+- 요약은 결과 폴더의 파일, 대화 기록/진행 상황/작업 큐는 SQLite에 저장하므로
+  요청이 어느 웹 워커로 가도 같은 결과를 조회
+"""
+import os
+import gc
+import time
+import signal
+
+# 웹 워커 안에서는 작업 처리 스레드를 실행하지 않음 (config import 전에 설정)
+os.environ["RUN_WORKERS_IN_APP"] = "false"
+# 모델 로드는 fork 전에 마스터에서 직접 수행 (app.py의 백그라운드 로드 스레드가 fork 시점에 남지 않도록)
+_warm_up_models = os.getenv("MODEL_WARMUP_ON_START", "true").lower() == "true"
+os.environ["MODEL_WARMUP_ON_START"] = "false"
+
+from config import (
+    WEB_BIND, WEB_WORKERS, WEB_THREADS, WEB_TIMEOUT,
+    PIPELINE_PROCESSES, MAX_WORKERS, WORKER_SHUTDOWN_TIMEOUT
+)
+
+bind = WEB_BIND
+workers = WEB_WORKERS
+worker_class = "gthread"
+threads = WEB_THREADS
+timeout = WEB_TIMEOUT
+preload_app = True
+
+# 파이프라인 워커 관리 프로세스 pid
+_pipeline_pid = None
+
+
+def when_ready(server):
+    """마스터: 앱 로드 후 웹 워커 fork 전 - 모델 로드 후 파이프라인 워커 시작"""
+    global _pipeline_pid
+    if _warm_up_models:
+        from utils.model_loader import warm_up_models
+        status = warm_up_models()
+        server.log.info(f"마스터 모델 로드 완료: {status}")
+
+    # fork 이후 gc가 공유 객체의 참조 정보를 갱신하며 메모리 페이지를 복사하지 않도록 고정
+    gc.freeze()
+
+    if PIPELINE_PROCESSES > 0:
+        pid = os.fork()
+        if pid == 0:
+            _run_pipeline(server)
+        _pipeline_pid = pid
+        server.log.info(f"파이프라인 워커 시작: 프로세스 {PIPELINE_PROCESSES}개 (관리 프로세스 pid {pid})")
+
+
+def _run_pipeline(server):
+    """fork된 자식: 마스터의 신호 처리기/리스닝 소켓을 정리하고 파이프라인 워커 관리"""
+    for sig in (signal.SIGHUP, signal.SIGQUIT, signal.SIGTTIN, signal.SIGTTOU,
+                signal.SIGUSR1, signal.SIGUSR2, signal.SIGWINCH, signal.SIGCHLD):
+        signal.signal(sig, signal.SIG_DFL)
+    for listener in server.LISTENERS:
+        listener.close()
+
+    code = 1
+    try:
+        from worker import run_supervisor
+        code = run_supervisor(PIPELINE_PROCESSES, MAX_WORKERS, warm_up=False)
+    except Exception as e:
+        server.log.error(f"파이프라인 워커 실행 실패: {str(e)}")
+    finally:
+        # 마스터의 atexit 정리 함수/gunicorn 종료 처리가 실행되지 않도록 바로 종료
+        os._exit(code)
+
+
+def on_exit(server):
+    """마스터 종료: 파이프라인 워커에 종료 신호를 보내고 처리 중인 작업이 끝날 때까지 대기"""
+    if _pipeline_pid is None:
+        return
+    try:
+        os.kill(_pipeline_pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+
+    deadline = time.monotonic() + WORKER_SHUTDOWN_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            pid, _ = os.waitpid(_pipeline_pid, os.WNOHANG)
+        except ChildProcessError:
+            return  # 마스터의 SIGCHLD 처리에서 이미 회수됨
+        if pid:
+            return
+        time.sleep(0.5)
+    server.log.warning(f"파이프라인 워커가 {WORKER_SHUTDOWN_TIMEOUT}초 안에 종료되지 않았습니다.")
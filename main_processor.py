@@ -2,46 +2,116 @@ import os
 import json
 import shutil
 import uuid
-from config import logger, RESULTS_FOLDER, UPLOAD_FOLDER, DATA_FOLDER  # DATA_FOLDER 추가
-from utils.queue_worker import update_progress
-from utils.file_utils import cleanup_files
+from config import logger, RESULTS_FOLDER, UPLOAD_FOLDER, DATA_FOLDER, YOUTUBE_CAPTIONS_ENABLED, CHECKPOINT_ENABLED  # DATA_FOLDER 추가
+from utils.queue_worker import update_progress, is_last_attempt
+from utils.file_utils import cleanup_files, link_or_copy
 from utils.api_utils import send_callback
-from processors.video import download_from_url, enhance_video_transcript
-from processors.audio import extract_audio, prepare_audio_for_transcription
+from utils.stage_graph import StageGraph
+from utils.stage_scheduler import run_stage
+from utils.dedup import mark_task_completed
+from utils.checkpoint import start_checkpoint, save_checkpoint, load_checkpoint, clear_checkpoints
+from processors.video import download_from_url, fetch_youtube_captions, enhance_video_transcript
+from processors.audio import extract_audio, prepare_audio_for_transcription, ensure_processed_mp3, processed_audio_paths
 from processors.document import process_document  # 문서 처리 모듈 import 추가
 from ai_services.transcription import transcribe_audio
-from ai_services.generation import generate_summary, generate_quiz, generate_study_plan
-from ai_services.vector_db import index_lecture_text
+from ai_services.generation import generate_summary, generate_quiz, generate_study_plan, save_summary
+from ai_services.vector_db import index_lecture_text, clone_lecture_index
+from ai_services.index_store import get_index_dir, NODES_FILE
+
+def run_checkpointed_stage(task_id, stage, func, *args, files=None):
+    """
+    단계 체크포인트가 있으면 저장된 결과를 반환하고, 없으면 단계를 실행한 뒤 결과 저장
+    files: 결과로부터 재사용 시 남아 있어야 하는 파일 경로 목록을 구하는 함수
+    """
+    found, value = load_checkpoint(task_id, stage)
+    if found:
+        logger.info(f"체크포인트 재사용: {task_id} {stage}")
+        return value
+
+    value = run_stage(stage, func, *args)
+    save_checkpoint(task_id, stage, value, files(value) if files else ())
+    return value
+
+def _process_document_checked(file_path, task_id, result_dir):
+    """문서 텍스트 추출 (실패 결과는 체크포인트로 저장하지 않도록 예외로 변환)"""
+    doc_result = process_document(file_path, task_id, result_dir, DATA_FOLDER)
+    if not doc_result["success"]:
+        update_progress(task_id, "failed", 0, doc_result["message"])
+        raise Exception(doc_result["message"])
+    return doc_result
+
+def run_lecture_stages(task_id, transcribed_text, remaining_days=5):
+    """텍스트 변환 이후 단계(요약, 퀴즈, 학습 계획, 인덱싱)를 의존성에 따라 동시 실행"""
+    graph = StageGraph(task_id, start_progress=70, end_progress=99)
+    # LLM 단계는 I/O 풀, 임베딩(인덱싱)은 CPU 풀에서 실행
+    graph.add("summary", lambda r: run_checkpointed_stage(task_id, "summary", generate_summary, task_id, transcribed_text),
+              weight=2, label="요약 생성")
+    # 인덱싱은 실패해도 False를 반환하므로 저장된 인덱스 파일이 있을 때만 재사용
+    graph.add("index", lambda r: run_checkpointed_stage(task_id, "index", index_lecture_text, task_id,
+                                                        files=lambda _: [os.path.join(get_index_dir(task_id), NODES_FILE)]),
+              label="벡터 DB 인덱싱")
+    graph.add("quiz", lambda r: run_checkpointed_stage(task_id, "quiz", generate_quiz, task_id, r["summary"]),
+              deps=("summary",), label="퀴즈 생성")
+    graph.add("study_plan", lambda r: run_checkpointed_stage(task_id, "study_plan", generate_study_plan, task_id, r["summary"], remaining_days),
+              deps=("summary",), label="학습 계획 생성")
+    return graph.run()
+
+def process_lecture(task_id, file_path=None, url=None, callback_url=None, lecture_id=None, remaining_days=5,
+                    reuse_from=None):
+    """
+    강의 처리 메인 함수
+    워커 스레드는 단계 순서만 조율하고, 각 단계는 단계 스케줄러의 I/O/CPU 풀에서 실행
+    단계마다 결과를 체크포인트로 저장하므로 재시도/재개 시 마지막으로 완료된 단계 다음부터 처리
+    reuse_from: 같은 내용의 파일을 처리한 이전 작업 ID (결과 복제에 실패하면 일반 처리)
+    """
+    if reuse_from:
+        final_result = reuse_existing_result(task_id, reuse_from, callback_url, lecture_id, remaining_days)
+        if final_result is not None:
+            return final_result
 
-def process_lecture(task_id, file_path=None, url=None, callback_url=None, lecture_id=None, remaining_days=5):
-    """강의 처리 메인 함수"""
     try:
         # 결과 디렉토리 생성 (한 번만 생성)
         result_dir = os.path.join(RESULTS_FOLDER, task_id)
         os.makedirs(result_dir, exist_ok=True)
+
+        # 작업 인자 기록 (이전 시도의 체크포인트가 있으면 완료된 단계는 건너뜀)
+        completed = start_checkpoint(task_id, (task_id, file_path, url, callback_url, lecture_id, remaining_days))
+        if completed:
+            logger.info(f"체크포인트에서 재개: {task_id} (완료된 단계: {', '.join(completed)})")
+            update_progress(task_id, "processing", 20, f"이전 처리 결과에서 재개 (완료된 단계 {len(completed)}개)")
         
         # 1. 다운로드 또는 파일 확인
+        caption_text = None
         if url:
-            file_path = download_from_url(task_id, url)
-            update_progress(task_id, "processing", 30, "URL에서 파일 다운로드 완료")
+            # 한국어 자막이 있으면 다운로드와 STT 변환 생략
+            if YOUTUBE_CAPTIONS_ENABLED:
+                caption_text = run_checkpointed_stage(task_id, "captions", fetch_youtube_captions, task_id, url)
+
+            if caption_text:
+                update_progress(task_id, "processing", 30, "자막 확인 완료, 오디오 다운로드 생략")
+            else:
+                file_path = run_checkpointed_stage(task_id, "download", download_from_url, task_id, url,
+                                                   files=lambda path: [path])
+                update_progress(task_id, "processing", 30, "URL에서 파일 다운로드 완료")
         else:
             update_progress(task_id, "processing", 30, "파일 업로드 완료, 처리 시작")
 
         # 파일 확장자 확인 (파일 유형에 따른 처리 분기 추가)
         file_ext = os.path.splitext(file_path)[1].lower().lstrip('.') if file_path else None
         
+        # 자막을 사용하는 경우 (음성 인식 생략)
+        if caption_text:
+            transcribed_text = caption_text
+            update_progress(task_id, "processing", 60, "자막으로 텍스트 확보 완료, AI 분석 시작")
+
         # PDF 또는 PPT 파일인 경우 (문서 처리 경로)
-        if file_ext in ['pdf', 'ppt', 'pptx']:
+        elif file_ext in ['pdf', 'ppt', 'pptx']:
             logger.info(f"문서 파일 감지됨: {file_path}")
             update_progress(task_id, "processing", 40, "문서에서 텍스트 추출 중...")
             
             # 문서 처리 모듈을 사용하여 텍스트 추출
             # 이미 생성된 result_dir 전달
-            doc_result = process_document(file_path, task_id, result_dir, DATA_FOLDER)
-            
-            if not doc_result["success"]:
-                update_progress(task_id, "failed", 0, doc_result["message"])
-                raise Exception(doc_result["message"])
+            doc_result = run_checkpointed_stage(task_id, "document", _process_document_checked, file_path, task_id, result_dir)
             
             # 추출된 텍스트를 사용하여 다음 단계 진행
             transcribed_text = doc_result["text_content"]
@@ -51,51 +121,41 @@ def process_lecture(task_id, file_path=None, url=None, callback_url=None, lectur
             # 오디오/비디오 파일 처리 (기존 코드)
             update_progress(task_id, "processing", 40, "오디오 추출 중...")
             # 2. 오디오 추출
-            audio_path = extract_audio(task_id, file_path)
+            audio_path = run_checkpointed_stage(task_id, "extract_audio", extract_audio, task_id, file_path,
+                                                files=lambda path: [path])
             
             # 3. 오디오 준비 (대용량 파일 분할 등)
             update_progress(task_id, "processing", 50, "오디오 준비 중...")
-            audio_info = prepare_audio_for_transcription(task_id, audio_path)
+            audio_info = run_checkpointed_stage(task_id, "prepare_audio", prepare_audio_for_transcription, task_id, audio_path,
+                                                files=lambda info: [info["pcm_path"]])
             
-            # 4. whisper STT 변환
+            # 4. whisper STT 변환 (청크별 결과도 체크포인트로 저장되어 실패한 청크부터 다시 변환)
             update_progress(task_id, "processing", 60, "텍스트 변환 중...")
-            raw_transcribed_text = transcribe_audio(task_id, audio_info)
+            raw_transcribed_text = run_checkpointed_stage(task_id, "transcribe", transcribe_audio, task_id, audio_info)
 
             # 스크립트 품질 개선 (새로운 단계)
             update_progress(task_id, "processing", 65, "스크립트 품질 개선 중...")
-            transcribed_text = enhance_video_transcript(raw_transcribed_text)
+            transcribed_text = run_checkpointed_stage(task_id, "enhance", enhance_video_transcript, task_id, raw_transcribed_text)
             #logger.info(f"스크립트 품질 개선 완료: {len(raw_transcribed_text)} → {len(transcribed_text)} 문자")
 
         # 텍스트 변환 이후의 공통 AI 처리 부분
-        
-        # 5. 요약 생성
-        update_progress(task_id, "processing", 70, "요약 생성 중...")
-        summary_text = generate_summary(task_id, transcribed_text)
-        
-        # 텍스트 저장 (검색용)
+
+        # 텍스트 저장 (검색용, 인덱싱 단계에서 사용)
         # 문서 처리 경로에서는 이미 저장되었을 수 있으므로 확인
         text_path = os.path.join(DATA_FOLDER, f"{task_id}.txt")
         if not os.path.exists(text_path):
             with open(text_path, 'w', encoding='utf-8') as f:
                 f.write(transcribed_text)
-            
-        # 요약 저장
-        summary_path = os.path.join(result_dir, f"{task_id}_summary.json")
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            json.dump({"summary_text": summary_text}, f, ensure_ascii=False, indent=4)
-        
-        # 6. 퀴즈 생성
-        update_progress(task_id, "processing", 80, "퀴즈 생성 중...")
-        quiz_text = generate_quiz(task_id, summary_text)
-        
-        # 7. 학습 계획 생성
-        update_progress(task_id, "processing", 90, "학습 계획 생성 중...")
-        study_plan = generate_study_plan(task_id, summary_text, remaining_days)
-        
-        # 8. 벡터 DB 인덱싱
-        update_progress(task_id, "processing", 95, "벡터 DB 인덱싱 중...")
-        index_lecture_text(task_id)
-        
+
+        # 5~8. 단계 의존성 그래프로 동시 실행
+        # 인덱싱은 원문만, 퀴즈/학습 계획은 요약만 필요하므로
+        # 요약 ∥ 인덱싱 → (요약 완료 후) 퀴즈 ∥ 학습 계획
+        update_progress(task_id, "processing", 70, "요약 생성 및 벡터 DB 인덱싱 중...")
+        results = run_lecture_stages(task_id, transcribed_text, remaining_days)
+        summary_text = results["summary"]
+        quiz_text = results["quiz"]
+        study_plan = results["study_plan"]
+
         # 100% 업데이트
         update_progress(task_id, "completed", 100, "모든 처리 완료")
         
@@ -116,6 +176,21 @@ def process_lecture(task_id, file_path=None, url=None, callback_url=None, lectur
         with open(result_path, 'w', encoding='utf-8') as f:
             json.dump(final_result, f, ensure_ascii=False, indent=4)
         
+        # 같은 파일이 다시 업로드되면 이 결과를 재사용
+        try:
+            mark_task_completed(task_id)
+        except Exception as e:
+            logger.warning(f"중복 업로드 결과 등록 실패: {str(e)}")
+
+        # 완료된 작업의 체크포인트 삭제
+        clear_checkpoints(task_id)
+
+        # 변환이 끝난 PCM은 다운로드용 MP3로 압축하고 삭제 (오디오/비디오 작업만 PCM이 있음)
+        try:
+            ensure_processed_mp3(task_id, remove_pcm=True)
+        except Exception as e:
+            logger.warning(f"처리된 오디오 압축 실패 (PCM 유지): {str(e)}")
+        
         # 콜백 URL이 제공된 경우 결과 전송
         if callback_url:
             send_callback(callback_url, final_result)
@@ -129,6 +204,10 @@ def process_lecture(task_id, file_path=None, url=None, callback_url=None, lectur
         logger.error(f"강의 처리 실패: {str(e)}")
         update_progress(task_id, "failed", 0, f"처리 실패: {str(e)}")
         
+        # 재시도가 남아 있으면 업로드 파일을 유지하고 콜백은 최종 실패 시에만 전송
+        if not is_last_attempt():
+            raise
+        
         # 에러 발생 시에도 콜백 전송
         if callback_url:
             error_data = {
@@ -140,9 +219,87 @@ def process_lecture(task_id, file_path=None, url=None, callback_url=None, lectur
             send_callback(callback_url, error_data)
         
         # 임시 파일 정리 시도
-        try:
-            cleanup_files(os.path.join(UPLOAD_FOLDER, task_id))
-        except:
-            pass
+        # (체크포인트를 사용하면 /resume 요청으로 재개할 수 있도록 업로드 파일을 보관, CHECKPOINT_TTL 후 삭제)
+        if not CHECKPOINT_ENABLED:
+            try:
+                cleanup_files(os.path.join(UPLOAD_FOLDER, task_id))
+            except:
+                pass
             
-        raise
\ No newline at end of file
+        raise
+
+
+def reuse_existing_result(task_id, source_task_id, callback_url=None, lecture_id=None, remaining_days=5):
+    """
+    같은 내용의 파일을 처리한 이전 작업의 결과(텍스트, 요약, 퀴즈, 학습 계획, 인덱스)를
+    새 task_id로 복제하고 바로 콜백 전송 (오디오 추출/STT/LLM 호출 생략)
+    학습 계획은 남은 일수가 다르면 복제한 요약으로 다시 생성
+    복제에 실패하면 None 반환 (호출한 쪽에서 일반 처리로 전환)
+    """
+    try:
+        update_progress(task_id, "processing", 50, "동일한 파일의 이전 처리 결과 재사용 중...")
+        source_dir = os.path.join(RESULTS_FOLDER, source_task_id)
+        result_dir = os.path.join(RESULTS_FOLDER, task_id)
+        os.makedirs(result_dir, exist_ok=True)
+
+        with open(os.path.join(source_dir, f"{source_task_id}_complete.json"), 'r', encoding='utf-8') as f:
+            source_result = json.load(f)
+
+        # 결과 파일 복사 (이후 개별 재생성으로 덮어쓸 수 있으므로 링크하지 않고 복사)
+        for name in os.listdir(source_dir):
+            source_path = os.path.join(source_dir, name)
+            if name == f"{source_task_id}_complete.json" or not os.path.isfile(source_path):
+                continue
+            shutil.copy2(source_path, os.path.join(result_dir, name.replace(source_task_id, task_id)))
+
+        # 검색용 텍스트 복사
+        source_text = os.path.join(DATA_FOLDER, f"{source_task_id}.txt")
+        if os.path.exists(source_text):
+            shutil.copy2(source_text, os.path.join(DATA_FOLDER, f"{task_id}.txt"))
+
+        # 처리된 오디오는 수정되지 않으므로 하드 링크 (오디오 다운로드용, 완료된 작업은 MP3만 남아 있음)
+        for source_audio, target_audio in zip(processed_audio_paths(source_task_id), processed_audio_paths(task_id)):
+            if os.path.exists(source_audio):
+                link_or_copy(source_audio, target_audio)
+
+        # 벡터 인덱스 복제 (저장된 벡터 재사용)
+        update_progress(task_id, "processing", 80, "벡터 DB 인덱스 복제 중...")
+        clone_lecture_index(source_task_id, task_id)
+
+        final_result = dict(source_result)
+        final_result.update({
+            "task_id": task_id,
+            "lecture_id": lecture_id,
+            "status": "completed",
+            "message": "처리 완료"
+        })
+        if final_result.get("summary_text"):
+            save_summary(task_id, final_result["summary_text"])
+
+        # 학습 계획은 요청한 남은 일수에 맞게 생성 (이전 작업과 일수가 다르면 다시 생성)
+        plan_path = os.path.join(result_dir, f"{task_id}_study_plan.json")
+        plan_days = None
+        if os.path.exists(plan_path):
+            with open(plan_path, 'r', encoding='utf-8') as f:
+                plan_days = json.load(f).get("days")
+        if plan_days != remaining_days:
+            update_progress(task_id, "processing", 90, f"{remaining_days}일치 학습 계획 다시 생성 중...")
+            final_result["study_plan"] = generate_study_plan(task_id, final_result.get("summary_text", ""), remaining_days)
+
+        result_path = os.path.join(result_dir, f"{task_id}_complete.json")
+        with open(result_path, 'w', encoding='utf-8') as f:
+            json.dump(final_result, f, ensure_ascii=False, indent=4)
+
+        update_progress(task_id, "completed", 100, "동일한 파일의 이전 처리 결과 재사용 완료")
+        logger.info(f"중복 업로드 결과 재사용: {source_task_id} → {task_id}")
+
+        if callback_url:
+            send_callback(callback_url, final_result)
+
+        cleanup_files(os.path.join(UPLOAD_FOLDER, task_id))
+        return final_result
+
+    except Exception as e:
+        logger.warning(f"이전 처리 결과 재사용 실패, 일반 처리로 전환: {str(e)}")
+        update_progress(task_id, "processing", 20, "이전 처리 결과 재사용 실패, 처음부터 처리")
+        return None
@@ -1,12 +1,20 @@
 import os
-import subprocess
-import shutil
-from config import logger, PROCESSED_FOLDER
+import uuid
+import threading
+from config import (
+    logger, PROCESSED_FOLDER, TRANSCRIBE_WORKERS, TRANSCRIBE_MIN_CHUNK_SECONDS,
+    TRANSCRIBE_CHUNK_SECONDS, VAD_ENABLED
+)
 from utils.queue_worker import update_progress
-from utils.file_utils import get_audio_duration, get_file_size_mb, compress_audio, split_audio
+from utils.file_utils import probe_audio, decode_to_pcm, encode_pcm_to_mp3
+from utils.pcm import PCM_SAMPLE_RATE, pcm_duration, pcm_num_samples
+from processors.vad import analyze_speech, plan_vad_chunks
 
 def extract_audio(task_id, video_path):
-    """비디오에서 오디오 추출 (ffmpeg 사용)"""
+    """
+    입력 파일을 한 번 조회한 뒤 16kHz 모노 PCM(s16le) 원시 파일로 바로 디코딩
+    (MP3 재인코딩 없이 Whisper가 그대로 사용할 수 있는 형식)
+    """
     try:
         update_progress(task_id, "processing", 45, "오디오 추출 시작")
 
@@ -14,128 +22,115 @@ def extract_audio(task_id, video_path):
         os.makedirs(output_dir, exist_ok=True)
 
         # 인코딩 문제를 피하기 위해 간단한 파일명 사용
-        audio_path = os.path.join(output_dir, f"{task_id}.mp3")
-
-        # 경로에 한글이 포함되어도 작동하도록 UTF-8 설정
-        if os.name == 'nt':  # Windows
-            # Windows에서 한글 경로 처리를 위한 설정
-            si = subprocess.STARTUPINFO()
-            si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-
-            # ffmpeg 명령 구성 (간소화된 버전)
-            cmd = [
-                'ffmpeg',
-                '-y',  # 기존 파일 덮어쓰기
-                '-i', video_path,
-                '-vn',  # 비디오 스트림 제외
-                '-ar', '16000',  # 샘플링 레이트 16kHz
-                '-ac', '1',  # 모노 채널
-                '-b:a', '64k',  # 비트레이트
-                '-f', 'mp3',
-                audio_path
-            ]
-
-            # 프로세스 실행
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                startupinfo=si
-            )
-        else:  # Linux/Mac
-            # ffmpeg 명령 구성
-            cmd = [
-                'ffmpeg',
-                '-y',  # 기존 파일 덮어쓰기
-                '-i', video_path,
-                '-vn',  # 비디오 스트림 제외
-                '-ar', '16000',  # 샘플링 레이트 16kHz
-                '-ac', '1',  # 모노 채널
-                '-b:a', '64k',  # 비트레이트
-                '-f', 'mp3',
-                audio_path
-            ]
+        pcm_path = os.path.join(output_dir, f"{task_id}.pcm")
 
-            # 프로세스 실행 및 실시간 출력 캡처
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
+        # 입력 파일 정보 확인 (한 번만 조회)
+        media_info = probe_audio(video_path)
+        if not media_info["has_audio"]:
+            raise Exception("오디오 스트림이 없는 파일입니다")
+        logger.info(f"입력 미디어 길이: {media_info['duration']}초 ({task_id})")
 
-        # ffmpeg 출력에서 진행 상황 파싱
-        stdout, stderr = process.communicate()
-
-        # 프로세스 완료 확인
-        if process.returncode != 0:
-            logger.error(f"FFmpeg 오류: {stderr}")
-            raise Exception(f"오디오 추출 실패: 반환 코드 {process.returncode}")
+        # 단일 ffmpeg 호출로 PCM 디코딩
+        decode_to_pcm(video_path, pcm_path)
 
         update_progress(task_id, "processing", 70, "오디오 추출 완료")
-        return audio_path
+        return pcm_path
 
     except Exception as e:
         logger.error(f"오디오 추출 실패: {str(e)}")
         update_progress(task_id, "failed", 0, f"오디오 추출 실패: {str(e)}")
         raise
 
-def prepare_audio_for_transcription(task_id, audio_path):
+# 프로세스 안에서 같은 오디오를 동시에 인코딩하지 않도록 하는 잠금
+_mp3_lock = threading.Lock()
+
+def processed_audio_paths(task_id):
+    """처리된 오디오의 (PCM 경로, 다운로드용 MP3 경로)"""
+    output_dir = os.path.join(PROCESSED_FOLDER, task_id)
+    return os.path.join(output_dir, f"{task_id}.pcm"), os.path.join(output_dir, f"{task_id}.mp3")
+
+def ensure_processed_mp3(task_id, remove_pcm=False):
+    """
+    처리된 PCM을 다운로드용 MP3로 인코딩하고 경로 반환 (이미 있으면 그대로, 둘 다 없으면 None)
+    임시 파일에 인코딩한 뒤 이름을 바꾸므로 동시에 요청해도 완성되지 않은 파일을 내보내지 않음
+    remove_pcm: 인코딩 후 PCM 삭제 (변환이 끝난 작업은 원본 PCM이 더 필요하지 않음)
+    """
+    pcm_path, mp3_path = processed_audio_paths(task_id)
+    with _mp3_lock:
+        if not os.path.exists(mp3_path):
+            if not os.path.exists(pcm_path):
+                return None
+            temp_path = f"{mp3_path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp.mp3"
+            try:
+                encode_pcm_to_mp3(pcm_path, temp_path)
+                os.replace(temp_path, mp3_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        if remove_pcm and os.path.exists(pcm_path):
+            os.remove(pcm_path)
+    return mp3_path
+
+def _decide_chunk_length(duration):
+    """오디오(음성) 길이에 따른 청크 길이(초) 결정"""
+    # 병렬 변환이 가능한 경우 짧은 청크로 나누어 워커에 분산
+    use_parallel = TRANSCRIBE_WORKERS > 1 and duration >= 2 * TRANSCRIBE_MIN_CHUNK_SECONDS
+
+    if duration <= TRANSCRIBE_CHUNK_SECONDS and not use_parallel:
+        return None  # 분할 불필요
+
+    chunk_length = TRANSCRIBE_CHUNK_SECONDS  # 초 단위
+
+    # 병렬 처리 시 워커 수만큼 청크가 나오도록 길이 축소 (최소 길이 유지)
+    if use_parallel:
+        chunk_length = max(TRANSCRIBE_MIN_CHUNK_SECONDS, min(chunk_length, duration / TRANSCRIBE_WORKERS))
+    return chunk_length
+
+def prepare_audio_for_transcription(task_id, pcm_path):
     """
-    오디오 파일을 transcription API에 맞게 준비 
-    (대용량 파일은 분할하고, 그렇지 않은 파일은 압축)
+    PCM 오디오를 Whisper 변환에 맞게 준비
+    (VAD로 무음을 제거하고, 긴 오디오는 휴지 지점에서 샘플 구간 단위로 분할)
+    각 청크는 원본 샘플 구간 목록으로 표현되며 이것이 시간 맵 역할을 한다.
     """
     try:
-        update_progress(task_id, "ai_processing", 75, "Whisper API 처리 준비 중...")
-
-        # 오디오 파일 정보 확인
-        duration = get_audio_duration(audio_path)
-        
-        # 파일 크기 확인 (바이트)
-        file_size_mb = get_file_size_mb(audio_path)
-
-        # 대용량 파일 처리 로직
-        if file_size_mb > 24:  # 24MB 이상이면 분할 처리
-            update_progress(task_id, "ai_processing", 76, f"파일 크기: {file_size_mb:.2f}MB, 분할 처리 시작...")
-
-            # 청크 길이 계산 (대략 10분 단위로 나누기, 크기에 따라 조정)
-            chunk_length = min(600, duration / (file_size_mb / 24))  # 초 단위
-
-            # 임시 폴더 생성
-            chunk_dir = os.path.join(PROCESSED_FOLDER, f"{task_id}_chunks")
-            
-            # 오디오 분할
-            chunk_paths, num_chunks = split_audio(audio_path, chunk_dir, chunk_length, task_id)
-            
-            update_progress(task_id, "ai_processing", 77, f"총 {num_chunks}개 청크로 분할 처리 중...")
+        update_progress(task_id, "ai_processing", 75, "Whisper 처리 준비 중...")
+
+        # PCM 파일 크기로 길이 계산 (추가 조회 불필요)
+        duration = pcm_duration(pcm_path)
+        total_samples = pcm_num_samples(pcm_path)
+
+        if VAD_ENABLED:
+            # 음성 구간 검출 (무음 구간은 Whisper로 보내지 않음)
+            update_progress(task_id, "ai_processing", 76, "무음 구간 분석 중...")
+            energy_db, frame_len, regions, speech_duration = analyze_speech(pcm_path)
+
+            chunk_length = _decide_chunk_length(speech_duration)
+            chunks = plan_vad_chunks(energy_db, frame_len, regions, chunk_length or speech_duration + 1)
+        else:
+            # 고정 길이 구간 분할
+            chunk_length = _decide_chunk_length(duration)
+            chunk_samples = int((chunk_length or duration + 1) * PCM_SAMPLE_RATE)
+            chunks = [
+                [(start, min(start + chunk_samples, total_samples))]
+                for start in range(0, total_samples, chunk_samples)
+            ]
+
+        if len(chunks) > 1:
+            update_progress(task_id, "ai_processing", 77, f"오디오 길이: {duration:.0f}초, 총 {len(chunks)}개 청크로 분할 처리 중...")
             return {
                 "is_chunked": True,
-                "chunk_paths": chunk_paths,
-                "num_chunks": num_chunks,
-                "chunk_dir": chunk_dir
+                "pcm_path": pcm_path,
+                "chunks": chunks,
+                "num_chunks": len(chunks)
             }
         else:
-            # 기존 로직 - 파일이 작은 경우
-            update_progress(task_id, "ai_processing", 80, "오디오 압축 중...")
-
-            # 압축 파일 경로
-            compressed_audio_path = audio_path.replace(".mp3", "_compressed.mp3")
-            compress_audio(audio_path, compressed_audio_path)
-            
             return {
                 "is_chunked": False,
-                "audio_path": compressed_audio_path
+                "pcm_path": pcm_path,
+                "segments": chunks[0] if chunks else []
             }
     
     except Exception as e:
         logger.error(f"오디오 준비 실패: {str(e)}")
         update_progress(task_id, "failed", 0, f"오디오 준비 실패: {str(e)}")
         raise
-
-def cleanup_audio_chunks(chunk_dir):
-    """임시 오디오 청크 파일 정리"""
-    try:
-        shutil.rmtree(chunk_dir, ignore_errors=True)
-        logger.info(f"오디오 청크 정리 완료: {chunk_dir}")
-    except Exception as e:
-        logger.warning(f"오디오 청크 정리 실패: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,151 @@
+import numpy as np
+from config import (
+    logger, VAD_FRAME_MS, VAD_THRESHOLD_DB, VAD_MIN_SILENCE_SECONDS,
+    VAD_MIN_SPEECH_SECONDS, VAD_PADDING_SECONDS
+)
+from utils.pcm import PCM_SAMPLE_RATE, open_pcm
+
+# 에너지 계산 시 한 번에 처리할 프레임 수 (메모리 사용량 제한)
+_FRAMES_PER_BLOCK = 20000
+
+def compute_frame_energy(pcm_path, frame_ms=VAD_FRAME_MS):
+    """PCM 파일의 프레임별 에너지(dB)를 블록 단위로 벡터화 계산"""
+    samples = open_pcm(pcm_path)
+    frame_len = int(PCM_SAMPLE_RATE * frame_ms / 1000)
+    num_frames = len(samples) // frame_len
+    energy_db = np.empty(num_frames, dtype=np.float32)
+
+    for block_start in range(0, num_frames, _FRAMES_PER_BLOCK):
+        block_end = min(block_start + _FRAMES_PER_BLOCK, num_frames)
+        block = samples[block_start * frame_len:block_end * frame_len]
+        frames = block.astype(np.float32).reshape(-1, frame_len)
+        energy_db[block_start:block_end] = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+
+    return energy_db, frame_len
+
+def detect_speech(energy_db, frame_ms=VAD_FRAME_MS):
+    """
+    프레임 에너지로 음성 구간 검출
+    반환값: [(시작 프레임, 끝 프레임), ...] (끝 프레임은 미포함)
+    """
+    if len(energy_db) == 0:
+        return []
+
+    # 하위 10% 에너지를 잡음 수준으로 보고 그보다 일정 dB 이상 큰 프레임을 음성으로 판단
+    # (무음이 거의 없는 녹음에서 음성이 잘리지 않도록 상위 5% 수준 기준으로도 상한 적용)
+    noise_floor, speech_level = np.percentile(energy_db, [10, 95])
+    threshold = min(noise_floor + VAD_THRESHOLD_DB, speech_level - VAD_THRESHOLD_DB)
+    is_speech = energy_db > threshold
+
+    # 음성 구간 경계 찾기
+    edges = np.diff(np.concatenate(([0], is_speech.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(starts) == 0:
+        return []
+
+    frames_per_second = 1000 / frame_ms
+    min_silence = int(VAD_MIN_SILENCE_SECONDS * frames_per_second)
+    min_speech = int(VAD_MIN_SPEECH_SECONDS * frames_per_second)
+    padding = int(VAD_PADDING_SECONDS * frames_per_second)
+
+    # 짧은 휴지(단어 사이 등)는 음성 구간에 포함
+    gaps = starts[1:] - ends[:-1]
+    keep = np.concatenate(([True], gaps >= min_silence))
+    merged_starts = starts[keep]
+    merged_ends = np.concatenate((ends[:-1][gaps >= min_silence], [ends[-1]]))
+
+    # 너무 짧은 구간(기침, 잡음 등) 제거 후 앞뒤 여유 추가
+    lengths = merged_ends - merged_starts
+    valid = lengths >= min_speech
+    merged_starts = np.maximum(merged_starts[valid] - padding, 0)
+    merged_ends = np.minimum(merged_ends[valid] + padding, len(energy_db))
+
+    regions = []
+    for start, end in zip(merged_starts.tolist(), merged_ends.tolist()):
+        # 여유 추가로 겹친 구간 병합
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+        else:
+            regions.append((start, end))
+    return regions
+
+def _split_long_region(start, end, energy_db, max_frames):
+    """최대 길이를 넘는 음성 구간을 에너지가 가장 낮은 지점(휴지)에서 분할"""
+    pieces = []
+    while end - start > max_frames:
+        # 구간 후반부(70~100%)에서 가장 조용한 프레임을 분할 지점으로 사용
+        search_from = start + int(max_frames * 0.7)
+        search_to = start + max_frames
+        if search_to - search_from < 1:
+            cut = search_to
+        else:
+            cut = search_from + int(np.argmin(energy_db[search_from:search_to]))
+        pieces.append((start, cut))
+        start = cut
+    pieces.append((start, end))
+    return pieces
+
+def build_speech_chunks(regions, energy_db, max_chunk_frames):
+    """
+    음성 구간을 최대 길이 이하의 청크로 묶음 (구간 경계 = 자연스러운 휴지에서만 분할)
+    반환값: [[(시작 프레임, 끝 프레임), ...], ...] - 청크별 원본 구간 목록 (시간 맵)
+    """
+    chunks = []
+    current = []
+    current_frames = 0
+
+    for start, end in regions:
+        for piece_start, piece_end in _split_long_region(start, end, energy_db, max_chunk_frames):
+            piece_frames = piece_end - piece_start
+            if current and current_frames + piece_frames > max_chunk_frames:
+                chunks.append(current)
+                current = []
+                current_frames = 0
+            current.append((piece_start, piece_end))
+            current_frames += piece_frames
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+def analyze_speech(pcm_path):
+    """
+    PCM 파일의 음성 구간 분석
+    반환값: (프레임 에너지, 프레임 길이(샘플), 음성 구간 목록, 음성 길이(초))
+    """
+    energy_db, frame_len = compute_frame_energy(pcm_path)
+    regions = detect_speech(energy_db)
+
+    speech_seconds = sum(end - start for start, end in regions) * VAD_FRAME_MS / 1000
+    total_seconds = len(energy_db) * VAD_FRAME_MS / 1000
+    logger.info(f"VAD 완료: 전체 {total_seconds:.0f}초 중 음성 {speech_seconds:.0f}초")
+    return energy_db, frame_len, regions, speech_seconds
+
+def plan_vad_chunks(energy_db, frame_len, regions, max_chunk_seconds):
+    """
+    무음을 제거하고 휴지 지점에서 나눈 청크 계획 생성
+    반환값: [[(시작 샘플, 끝 샘플), ...], ...] - 청크별 원본 샘플 구간 목록 (시간 맵)
+    """
+    max_chunk_frames = max(1, int(max_chunk_seconds * 1000 / VAD_FRAME_MS))
+    frame_chunks = build_speech_chunks(regions, energy_db, max_chunk_frames)
+
+    # 프레임 단위 → 샘플 단위 변환
+    return [
+        [(start * frame_len, end * frame_len) for start, end in segments]
+        for segments in frame_chunks
+    ]
+
+def map_chunk_time(segments, seconds):
+    """
+    청크 내부 시간(초)을 원본 오디오 시간(초)으로 변환
+    segments는 청크를 구성하는 원본 샘플 구간 목록 (시간 맵)
+    """
+    offset = int(seconds * PCM_SAMPLE_RATE)
+    for start, end in segments:
+        length = end - start
+        if offset < length:
+            return (start + offset) / PCM_SAMPLE_RATE
+        offset -= length
+    # 마지막 구간 이후는 마지막 구간 끝으로 보정
+    return segments[-1][1] / PCM_SAMPLE_RATE if segments else seconds
@@ -1,13 +1,13 @@
 import os
-import yt_dlp
-from groq import Groq
-from config import logger, UPLOAD_FOLDER, GROQ_API_KEY, GROQ_MODEL
+import html
+from config import (
+    logger, UPLOAD_FOLDER,
+    YTDLP_AUDIO_FORMAT, YOUTUBE_CAPTION_LANGS, YOUTUBE_CAPTION_MIN_CHARS
+)
 from utils.queue_worker import update_progress
+from ai_services.llm_gateway import PRIORITY_BATCH, chat_completion
 import re
 
-# Groq 클라이언트 설정 (무료)
-groq_client = Groq(api_key=GROQ_API_KEY)
-
 def download_progress_hook(d, task_id):
     """yt-dlp 다운로드 진행상황 훅"""
     if d['status'] == 'downloading':
@@ -24,15 +24,17 @@ def download_progress_hook(d, task_id):
 
 def download_from_url(task_id, url):
     """URL에서 동영상 다운로드 (yt-dlp 사용)"""
+    import yt_dlp  # import가 느리므로 사용할 때 import
+
     try:
-        update_progress(task_id, "downloading", 10, "동영상 다운로드 시작")
+        update_progress(task_id, "downloading", 10, "오디오 다운로드 시작")
 
         output_path = os.path.join(UPLOAD_FOLDER, f"{task_id}")
         os.makedirs(output_path, exist_ok=True)
 
-        # 파일명 관련 옵션 추가
+        # 영상은 사용하지 않으므로 오디오 스트림만 우선 다운로드 (없으면 작은 해상도 영상으로 대체)
         ydl_opts = {
-            'format': 'best',
+            'format': YTDLP_AUDIO_FORMAT,
             'outtmpl': os.path.join(output_path, '%(title)s.%(ext)s'),
             'noplaylist': True,
             'restrictfilenames': True,  # 안전한 파일명 사용
@@ -43,7 +45,8 @@ def download_from_url(task_id, url):
             info = ydl.extract_info(url, download=True)
             downloaded_file = ydl.prepare_filename(info)
 
-        update_progress(task_id, "downloaded", 40, "동영상 다운로드 완료")
+        update_progress(task_id, "downloaded", 40, "오디오 다운로드 완료")
+        logger.info(f"다운로드 완료: {downloaded_file} (형식: {info.get('format_id')}, {info.get('filesize') or info.get('filesize_approx') or '알 수 없는'} bytes)")
         return downloaded_file
 
     except Exception as e:
@@ -51,6 +54,89 @@ def download_from_url(task_id, url):
         update_progress(task_id, "failed", 0, f"다운로드 실패: {str(e)}")
         raise
 
+_VTT_TAG_RE = re.compile(r'<[^>]+>')
+_VTT_CUE_ID_RE = re.compile(r'^\d+$')
+
+def _parse_vtt(vtt_text):
+    """WebVTT 자막에서 텍스트만 추출 (자동 자막의 겹쳐 반복되는 줄 제거)"""
+    lines = []
+    for line in vtt_text.splitlines():
+        line = line.strip()
+        if (not line or '-->' in line or line.startswith(('WEBVTT', 'Kind:', 'Language:', 'NOTE', 'STYLE'))
+                or _VTT_CUE_ID_RE.match(line)):
+            continue
+        line = html.unescape(_VTT_TAG_RE.sub('', line)).strip()
+        if line and (not lines or lines[-1] != line):
+            lines.append(line)
+    return " ".join(lines)
+
+def _select_caption_track(info):
+    """
+    사용할 자막 트랙 선택: 직접 등록된 자막 우선, 없으면 원본 언어 자동 자막
+    (자동 번역된 자막은 품질이 낮으므로 영상 원본 언어가 일치할 때만 사용)
+    반환값: (언어 코드, 트랙 정보, 자동 자막 여부) 또는 None
+    """
+    subtitles = info.get('subtitles') or {}
+    automatic = info.get('automatic_captions') or {}
+    video_language = (info.get('language') or '').split('-')[0]
+
+    for lang in YOUTUBE_CAPTION_LANGS:
+        candidates = [(code, tracks, False) for code, tracks in subtitles.items() if code.split('-')[0] == lang]
+        if not candidates:
+            candidates = [
+                (code, tracks, True) for code, tracks in automatic.items()
+                if code in (f"{lang}-orig", lang) and (video_language == lang or code.endswith('-orig'))
+            ]
+        for code, tracks, is_auto in candidates:
+            vtt_tracks = [track for track in tracks if track.get('ext') == 'vtt' and track.get('url')]
+            if vtt_tracks:
+                return code, vtt_tracks[0], is_auto
+    return None
+
+def fetch_youtube_captions(task_id, url):
+    """
+    영상에 한국어 자막(또는 원본 언어 자동 자막)이 있으면 자막 텍스트 반환 (없으면 None)
+    자막이 있으면 오디오 다운로드와 Whisper 변환을 생략할 수 있다.
+    """
+    import yt_dlp
+
+    try:
+        update_progress(task_id, "downloading", 10, "자막 확인 중...")
+
+        ydl_opts = {
+            'skip_download': True,
+            'noplaylist': True,
+            'quiet': True,
+        }
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            selected = _select_caption_track(info)
+            if not selected:
+                logger.info(f"사용할 자막 없음, 오디오 다운로드 진행: {task_id}")
+                return None
+
+            code, track, is_auto = selected
+            vtt_text = ydl.urlopen(track['url']).read().decode('utf-8', errors='replace')
+
+        caption_text = _parse_vtt(vtt_text)
+        if len(caption_text) < YOUTUBE_CAPTION_MIN_CHARS:
+            logger.info(f"자막이 너무 짧아 사용하지 않음: {task_id} ({len(caption_text)}자)")
+            return None
+
+        # 원본 자막 보관
+        output_path = os.path.join(UPLOAD_FOLDER, f"{task_id}")
+        os.makedirs(output_path, exist_ok=True)
+        with open(os.path.join(output_path, f"captions.{code}.vtt"), 'w', encoding='utf-8') as f:
+            f.write(vtt_text)
+
+        logger.info(f"{'자동 ' if is_auto else ''}자막 사용: {task_id} ({code}, {len(caption_text)}자)")
+        return caption_text
+
+    except Exception as e:
+        # 자막 확인 실패는 치명적이지 않으므로 오디오 다운로드로 진행
+        logger.warning(f"자막 확인 실패, 오디오 다운로드 진행: {str(e)}")
+        return None
+
 def enhance_video_transcript(task_id, transcript):
     """비디오 트랜스크립트 개선 (Groq 무료)"""
     try:
@@ -75,14 +161,7 @@ def enhance_video_transcript(task_id, transcript):
             }
         ]
         
-        response = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=messages,
-            temperature=0.3,
-            max_tokens=2000
-        )
-        
-        enhanced_text = response.choices[0].message.content
+        enhanced_text = chat_completion(messages, temperature=0.3, max_tokens=2000, priority=PRIORITY_BATCH)
         
         update_progress(task_id, "enhanced", 90, "Groq AI 트랜스크립트 개선 완료")
         logger.info(f"Groq AI 트랜스크립트 개선 완료: {task_id}")
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+from config import logger
+
+# 워커 서브시스템이 소유하는 단일 이벤트 루프 (LLM 호출 등 I/O 대기를 스레드 없이 겹쳐 실행)
+_loop = None
+_thread = None
+_guard = threading.Lock()
+
+def _run_loop(loop, ready):
+    asyncio.set_event_loop(loop)
+    loop.call_soon(ready.set)
+    try:
+        loop.run_forever()
+    finally:
+        # 종료 시 남은 작업 취소 후 루프 정리
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+def start_event_loop():
+    """이벤트 루프 스레드 시작 (이미 실행 중이면 기존 루프 반환)"""
+    global _loop, _thread
+    with _guard:
+        if _loop is not None and _thread.is_alive():
+            return _loop
+
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        thread = threading.Thread(target=_run_loop, args=(loop, ready), name="async-loop", daemon=True)
+        thread.start()
+        ready.wait()
+
+        _loop, _thread = loop, thread
+        logger.info("비동기 이벤트 루프 시작")
+        return loop
+
+def stop_event_loop(timeout=5):
+    """이벤트 루프 중지 (실행 중인 코루틴은 취소됨)"""
+    global _loop, _thread
+    with _guard:
+        loop, thread = _loop, _thread
+        _loop = _thread = None
+    if loop is None:
+        return
+
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout)
+    logger.info("비동기 이벤트 루프 종료")
+
+def get_event_loop():
+    """워커 이벤트 루프 반환 (시작 전이면 시작)"""
+    loop = _loop
+    if loop is not None and _thread.is_alive():
+        return loop
+    return start_event_loop()
+
+def submit_coroutine(coro):
+    """코루틴을 워커 이벤트 루프에 예약하고 concurrent.futures.Future 반환"""
+    loop = get_event_loop()
+    if threading.current_thread() is _thread:
+        coro.close()
+        raise RuntimeError("이벤트 루프 스레드에서는 결과를 기다릴 수 없습니다. await를 사용하세요.")
+    return asyncio.run_coroutine_threadsafe(coro, loop)
+
+def run_coroutine(coro, timeout=None):
+    """동기 코드에서 코루틴을 워커 이벤트 루프로 실행하고 결과 반환"""
+    future = submit_coroutine(coro)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        # 타임아웃 등으로 기다리지 않게 되면 루프의 작업도 취소
+        future.cancel()
+        raise
+
+def iterate_async(agen):
+    """
+    비동기 제너레이터를 동기 제너레이터로 변환 (Flask 스트리밍 응답용)
+    소비 쪽이 중간에 멈추면(클라이언트 연결 종료) 비동기 제너레이터를 닫아 자원을 반환
+    """
+    try:
+        while True:
+            try:
+                item = run_coroutine(agen.__anext__())
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        if _loop is not None:
+            run_coroutine(agen.aclose())
@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import shutil
+import threading
+from config import logger, CHECKPOINT_ENABLED, CHECKPOINT_FOLDER, CHECKPOINT_TTL, UPLOAD_FOLDER, PROCESSED_FOLDER
+
+# 작업별 단계 체크포인트
+# CHECKPOINT_FOLDER/<task_id>/manifest.json  - 작업 인자와 완료된 단계 목록
+# CHECKPOINT_FOLDER/<task_id>/<단계>.json     - 단계 결과
+MANIFEST_FILE = "manifest.json"
+
+_manifest_lock = threading.Lock()
+
+def _task_dir(task_id):
+    return os.path.join(CHECKPOINT_FOLDER, task_id)
+
+def _write_json(path, data):
+    """다른 프로세스가 쓰는 도중의 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def load_manifest(task_id):
+    """작업의 체크포인트 목록 조회 (없으면 None)"""
+    try:
+        with open(os.path.join(_task_dir(task_id), MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"체크포인트 목록 읽기 실패: {task_id} - {str(e)}")
+        return None
+
+def _update_manifest(task_id, update):
+    now = time.time()
+    with _manifest_lock:
+        manifest = load_manifest(task_id) or {"task_id": task_id, "job": None, "stages": {}, "created_at": now}
+        update(manifest)
+        manifest["updated_at"] = now
+        _write_json(os.path.join(_task_dir(task_id), MANIFEST_FILE), manifest)
+
+def start_checkpoint(task_id, job):
+    """처리 시작 시 작업 인자 기록 (재개 요청 시 같은 인자로 다시 대기열에 추가), 완료된 단계 목록 반환"""
+    if not CHECKPOINT_ENABLED:
+        return []
+
+    def update(manifest):
+        manifest["job"] = list(job)
+
+    try:
+        _update_manifest(task_id, update)
+    except Exception as e:
+        logger.warning(f"체크포인트 기록 실패: {task_id} - {str(e)}")
+        return []
+    return completed_stages(task_id)
+
+def save_checkpoint(task_id, stage, value, files=()):
+    """
+    단계 결과 저장 (실패해도 처리를 멈추지 않도록 경고만 남김)
+    files: 결과를 재사용하려면 남아 있어야 하는 파일 경로 (삭제되었으면 단계를 다시 실행)
+    """
+    if not CHECKPOINT_ENABLED:
+        return
+
+    def update(manifest):
+        manifest["stages"][stage] = {"completed_at": time.time(), "files": list(files)}
+
+    try:
+        _write_json(os.path.join(_task_dir(task_id), f"{stage}.json"), {"value": value})
+        _update_manifest(task_id, update)
+    except Exception as e:
+        logger.warning(f"체크포인트 저장 실패: {task_id} {stage} - {str(e)}")
+
+def load_checkpoint(task_id, stage):
+    """저장된 단계 결과 조회 - (True, 결과) 또는 (False, None)"""
+    if not CHECKPOINT_ENABLED:
+        return False, None
+
+    manifest = load_manifest(task_id)
+    entry = manifest["stages"].get(stage) if manifest else None
+    if entry is None:
+        return False, None
+
+    missing = [path for path in entry.get("files", []) if not os.path.exists(path)]
+    if missing:
+        logger.info(f"체크포인트 파일 없음, 단계 다시 실행: {task_id} {stage} ({missing[0]})")
+        return False, None
+
+    try:
+        with open(os.path.join(_task_dir(task_id), f"{stage}.json"), 'r', encoding='utf-8') as f:
+            return True, json.load(f)["value"]
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"체크포인트 읽기 실패: {task_id} {stage} - {str(e)}")
+        return False, None
+
+def completed_stages(task_id):
+    """체크포인트가 저장된 단계 이름 목록 (완료 순)"""
+    manifest = load_manifest(task_id)
+    if not manifest:
+        return []
+    return sorted(manifest["stages"], key=lambda stage: manifest["stages"][stage]["completed_at"])
+
+def clear_checkpoints(task_id):
+    """작업의 체크포인트 삭제 (처리 완료 후)"""
+    shutil.rmtree(_task_dir(task_id), ignore_errors=True)
+
+def purge_expired_checkpoints(ttl=CHECKPOINT_TTL):
+    """
+    ttl 동안 갱신되지 않은 체크포인트와 재개용으로 보관한 업로드 파일, 추출한 PCM 삭제
+    반환값: 삭제한 작업 수
+    """
+    if not os.path.isdir(CHECKPOINT_FOLDER):
+        return 0
+
+    cutoff = time.time() - ttl
+    purged = 0
+    for task_id in os.listdir(CHECKPOINT_FOLDER):
+        manifest = load_manifest(task_id)
+        if manifest and "updated_at" in manifest:
+            updated_at = manifest["updated_at"]
+        else:
+            # 목록이 없거나 읽을 수 없으면(기록 중인 작업 등) 폴더 수정 시각으로 판단
+            try:
+                updated_at = os.path.getmtime(_task_dir(task_id))
+            except OSError:
+                continue
+        if updated_at >= cutoff:
+            continue
+        clear_checkpoints(task_id)
+        shutil.rmtree(os.path.join(UPLOAD_FOLDER, task_id), ignore_errors=True)
+        pcm_path = os.path.join(PROCESSED_FOLDER, task_id, f"{task_id}.pcm")
+        if os.path.exists(pcm_path):
+            os.remove(pcm_path)
+        purged += 1
+    return purged
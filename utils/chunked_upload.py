@@ -0,0 +1,247 @@
+import os
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from config import logger, STATE_FOLDER, UPLOAD_FOLDER, UPLOAD_SESSION_TTL
+from utils.db_utils import get_connection
+from utils.file_utils import cleanup_files
+
+try:
+    import fcntl
+except ImportError:
+    # Windows에는 flock이 없음 - gunicorn 없이 app.py 단일 프로세스로 실행되므로 프로세스 내 잠금으로 대체
+    fcntl = None
+
+# 분할 업로드 세션 (재시작 후에도 이어서 업로드할 수 있도록 SQLite에 저장)
+UPLOAD_DB_PATH = os.path.join(STATE_FOLDER, "uploads.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    task_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    total_size INTEGER,
+    lecture_id TEXT,
+    remaining_days INTEGER,
+    callback_url TEXT,
+    status TEXT NOT NULL,
+    received_bytes INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# 세션 상태
+SESSION_UPLOADING = "uploading"
+SESSION_FINALIZED = "finalized"
+
+# 작업별 증분 해시 상태 (task_id → (hasher, 해시한 바이트 수))
+# 재시작이나 다른 프로세스의 이어쓰기 등으로 어긋나면 이미 받은 부분을 한 번 다시 읽어 복원
+_hashers = {}
+
+# fcntl이 없을 때 사용하는 작업별 잠금 (task_id 해시로 나눈 고정 개수 - 세션이 늘어도 잠금 수는 그대로)
+_thread_locks = [threading.Lock() for _ in range(64)]
+
+
+class UploadOffsetError(Exception):
+    """요청한 오프셋이 서버가 받은 크기와 다를 때 (클라이언트는 current_offset부터 이어서 전송)"""
+
+    def __init__(self, current_offset):
+        super().__init__(f"업로드 오프셋 불일치 (현재 {current_offset} bytes)")
+        self.current_offset = current_offset
+
+
+def _connect():
+    conn = get_connection(UPLOAD_DB_PATH)
+    conn.executescript(_SCHEMA)
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(upload_sessions)")}
+    if "received_bytes" not in columns:
+        # 이전 형식의 세션은 받은 크기 기록이 없으므로 처음부터 다시 전송
+        conn.execute("ALTER TABLE upload_sessions ADD COLUMN received_bytes INTEGER NOT NULL DEFAULT 0")
+    return conn
+
+def _part_path(task_id, filename):
+    return os.path.join(UPLOAD_FOLDER, task_id, f"{filename}.part")
+
+def _load_session(task_id):
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT * FROM upload_sessions WHERE task_id = ?", (task_id,)).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+@contextmanager
+def _exclusive(task_id, f):
+    """임시 파일에 배타 잠금 (flock은 파일을 닫을 때 풀림, Windows에서는 프로세스 내 잠금)"""
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+        return
+    with _thread_locks[hash(task_id) % len(_thread_locks)]:
+        yield
+
+@contextmanager
+def _locked_session(task_id):
+    """
+    임시 파일에 배타 잠금(flock)을 걸고 (세션 정보, 파일 객체) 제공
+    여러 gunicorn 워커 프로세스가 같은 세션에 동시에 이어쓰거나 완료 처리하지 않도록 직렬화한다.
+    """
+    session = _load_session(task_id)
+    if session is None or session["status"] != SESSION_UPLOADING:
+        raise ValueError("업로드 세션을 찾을 수 없습니다")
+
+    try:
+        f = open(_part_path(task_id, session["filename"]), 'r+b')
+    except FileNotFoundError:
+        # 다른 프로세스가 먼저 완료 처리(파일 이름 변경)했거나 만료되어 삭제됨
+        raise ValueError("업로드 세션을 찾을 수 없습니다")
+
+    with f, _exclusive(task_id, f):
+        # 잠금을 기다리는 동안 다른 프로세스가 이어쓰거나 완료 처리했을 수 있으므로 다시 조회
+        session = _load_session(task_id)
+        if session is None or session["status"] != SESSION_UPLOADING:
+            raise ValueError("업로드 세션을 찾을 수 없습니다")
+        yield session, f
+
+def create_upload_session(task_id, filename, total_size=None, lecture_id=None, remaining_days=5, callback_url=None):
+    """분할 업로드 세션 생성"""
+    purge_stale_sessions()
+
+    os.makedirs(os.path.join(UPLOAD_FOLDER, task_id), exist_ok=True)
+    open(_part_path(task_id, filename), 'wb').close()
+
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO upload_sessions (task_id, filename, total_size, lecture_id, remaining_days, "
+                "callback_url, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (task_id, filename, total_size, lecture_id, remaining_days, callback_url, SESSION_UPLOADING, now, now)
+            )
+    finally:
+        conn.close()
+
+    _hashers[task_id] = (hashlib.sha256(), 0)
+    logger.info(f"분할 업로드 시작: {task_id} ({filename}, {total_size or '크기 미지정'} bytes)")
+
+def get_upload_session(task_id):
+    """세션 정보와 현재까지 받은 크기(offset) 반환 (없으면 None)"""
+    session = _load_session(task_id)
+    if session is None:
+        return None
+    session["offset"] = session["received_bytes"] if session["status"] == SESSION_UPLOADING else session["total_size"]
+    return session
+
+def _get_hasher(task_id, part_path, offset):
+    """현재 오프셋까지의 증분 해시 상태 (없거나 어긋나면 받은 부분을 다시 읽어 복원)"""
+    hasher, hashed = _hashers.get(task_id, (None, -1))
+    if hasher is not None and hashed == offset:
+        return hasher
+
+    hasher = hashlib.sha256()
+    with open(part_path, 'rb') as f:
+        remaining = offset
+        while remaining > 0:
+            block = f.read(min(1024 * 1024, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    logger.info(f"업로드 해시 상태 복원: {task_id} ({offset} bytes)")
+    return hasher
+
+def append_upload_chunk(task_id, offset, stream, chunk_size=1024 * 1024):
+    """
+    offset 위치에 청크를 이어 쓰고 새 오프셋 반환
+    오프셋이 받은 크기와 다르면 UploadOffsetError (중복/누락 전송 방지)
+    """
+    with _locked_session(task_id) as (session, f):
+        part_path = _part_path(task_id, session["filename"])
+        current = session["received_bytes"]
+        if offset != current:
+            raise UploadOffsetError(current)
+
+        hasher = _get_hasher(task_id, part_path, current)
+        written = 0
+        try:
+            # 기록된 크기 뒤에 남은 부분(중단된 이전 쓰기)은 버리고 이어 씀
+            f.seek(current)
+            f.truncate()
+            while True:
+                block = stream.read(chunk_size)
+                if not block:
+                    break
+                if session["total_size"] and current + written + len(block) > session["total_size"]:
+                    raise ValueError("선언한 파일 크기를 초과했습니다")
+                f.write(block)
+                hasher.update(block)
+                written += len(block)
+        finally:
+            # 연결이 끊겨도 이미 쓴 부분은 유지 (클라이언트는 현재 오프셋을 조회해 이어서 전송)
+            f.flush()
+            _hashers[task_id] = (hasher, current + written)
+            conn = _connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "UPDATE upload_sessions SET received_bytes = ?, updated_at = ? WHERE task_id = ?",
+                        (current + written, time.time(), task_id)
+                    )
+            finally:
+                conn.close()
+
+        return current + written
+
+def finalize_upload_session(task_id):
+    """
+    업로드 완료 처리 - 임시 파일을 원래 파일명으로 바꾸고 (파일 경로, SHA-256, 세션 정보) 반환
+    """
+    with _locked_session(task_id) as (session, f):
+        part_path = _part_path(task_id, session["filename"])
+        received = session["received_bytes"]
+        if session["total_size"] is not None and received != session["total_size"]:
+            raise UploadOffsetError(received)
+
+        # 기록된 크기 뒤에 남은 부분(중단된 쓰기)은 파일에 포함하지 않음
+        f.truncate(received)
+        content_hash = _get_hasher(task_id, part_path, received).hexdigest()
+        file_path = os.path.join(UPLOAD_FOLDER, task_id, session["filename"])
+        if fcntl is None:
+            # Windows는 열려 있는 파일의 이름을 바꿀 수 없음 (프로세스 내 잠금은 계속 유지)
+            f.close()
+        os.replace(part_path, file_path)
+
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE upload_sessions SET status = ?, total_size = ?, updated_at = ? WHERE task_id = ?",
+                    (SESSION_FINALIZED, received, time.time(), task_id)
+                )
+        finally:
+            conn.close()
+
+        _hashers.pop(task_id, None)
+        session["total_size"] = received
+        session["offset"] = received
+        logger.info(f"분할 업로드 완료: {task_id} ({received} bytes)")
+        return file_path, content_hash, session
+
+def purge_stale_sessions():
+    """오래 갱신되지 않은 세션과 임시 파일 정리 (완료된 세션은 기록만 제거)"""
+    cutoff = time.time() - UPLOAD_SESSION_TTL
+    conn = _connect()
+    try:
+        with conn:
+            rows = conn.execute(
+                "SELECT task_id, status FROM upload_sessions WHERE updated_at < ?", (cutoff,)
+            ).fetchall()
+            for row in rows:
+                if row["status"] == SESSION_UPLOADING:
+                    cleanup_files(os.path.join(UPLOAD_FOLDER, row["task_id"]))
+                    _hashers.pop(row["task_id"], None)
+            conn.execute("DELETE FROM upload_sessions WHERE updated_at < ?", (cutoff,))
+    finally:
+        conn.close()
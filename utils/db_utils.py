@@ -0,0 +1,14 @@
+import os
+import sqlite3
+
+def get_connection(db_path):
+    """
+    SQLite 연결 생성 (WAL 모드, 다른 스레드/프로세스와 동시 접근 허용)
+    연결은 호출한 쪽에서 닫아야 한다.
+    """
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
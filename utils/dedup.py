@@ -0,0 +1,76 @@
+import os
+import time
+from config import logger, STATE_FOLDER, RESULTS_FOLDER
+from utils.db_utils import get_connection
+
+# 업로드 파일 내용 해시 → 처리 완료된 작업 매핑
+DEDUP_DB_PATH = os.path.join(STATE_FOLDER, "dedup.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS task_hashes (
+    task_id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS completed_results (
+    content_hash TEXT PRIMARY KEY,
+    task_id TEXT NOT NULL,
+    completed_at REAL NOT NULL
+);
+"""
+
+def _connect():
+    conn = get_connection(DEDUP_DB_PATH)
+    conn.executescript(_SCHEMA)
+    return conn
+
+def _result_exists(task_id):
+    """재사용할 결과 파일이 아직 남아 있는지 확인"""
+    return os.path.exists(os.path.join(RESULTS_FOLDER, task_id, f"{task_id}_complete.json"))
+
+def register_upload(task_id, content_hash):
+    """업로드 파일 해시 기록 (처리 완료 시 mark_task_completed로 재사용 가능 상태가 됨)"""
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO task_hashes (task_id, content_hash, created_at) VALUES (?, ?, ?)",
+                (task_id, content_hash, time.time())
+            )
+    finally:
+        conn.close()
+
+def find_completed_task(content_hash):
+    """같은 내용의 파일을 처리 완료한 작업 ID 조회 (결과가 삭제되었으면 None)"""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT task_id FROM completed_results WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        if not _result_exists(row["task_id"]):
+            with conn:
+                conn.execute("DELETE FROM completed_results WHERE content_hash = ?", (content_hash,))
+            logger.info(f"중복 업로드 결과가 삭제되어 매핑 제거: {row['task_id']}")
+            return None
+        return row["task_id"]
+    finally:
+        conn.close()
+
+def mark_task_completed(task_id):
+    """처리가 끝난 작업의 결과를 같은 해시의 이후 업로드에서 재사용하도록 등록"""
+    conn = _connect()
+    try:
+        with conn:
+            row = conn.execute("SELECT content_hash FROM task_hashes WHERE task_id = ?", (task_id,)).fetchone()
+            if row is None:
+                return
+            conn.execute(
+                "INSERT OR REPLACE INTO completed_results (content_hash, task_id, completed_at) VALUES (?, ?, ?)",
+                (row["content_hash"], task_id, time.time())
+            )
+            conn.execute("DELETE FROM task_hashes WHERE task_id = ?", (task_id,))
+    finally:
+        conn.close()
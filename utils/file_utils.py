@@ -1,9 +1,12 @@
 import os
 import re
+import json
 import shutil
+import hashlib
 from werkzeug.utils import secure_filename
 import subprocess
 from config import logger, ALLOWED_EXTENSIONS
+from utils.pcm import PCM_SAMPLE_RATE
 
 def sanitize_filename(filename):
     """파일명에서 시스템에 문제가 될 수 있는 특수문자 제거"""
@@ -30,6 +33,38 @@ def save_uploaded_file(file, upload_dir, filename=None):
         logger.error(f"파일 저장 실패: {str(e)}")
         raise
 
+def save_uploaded_file_with_hash(file, upload_dir, filename=None, chunk_size=1024 * 1024):
+    """업로드된 파일을 저장하면서 SHA-256 해시를 함께 계산 (파일을 다시 읽지 않음)"""
+    try:
+        os.makedirs(upload_dir, exist_ok=True)
+        
+        if filename is None:
+            filename = sanitize_filename(secure_filename(file.filename))
+        
+        file_path = os.path.join(upload_dir, filename)
+        hasher = hashlib.sha256()
+        with open(file_path, 'wb') as f:
+            while True:
+                chunk = file.stream.read(chunk_size)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                f.write(chunk)
+        return file_path, hasher.hexdigest()
+    except Exception as e:
+        logger.error(f"파일 저장 실패: {str(e)}")
+        raise
+
+def link_or_copy(src, dst):
+    """하드 링크로 복제 (다른 파일시스템이면 복사) - 이후 수정되지 않는 파일에만 사용"""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
 def cleanup_files(directory):
     """지정된 디렉토리의 파일들을 삭제"""
     try:
@@ -39,71 +74,65 @@ def cleanup_files(directory):
     except Exception as e:
         logger.warning(f"파일 정리 중 오류: {str(e)}")
 
-def compress_audio(input_path, output_path, bitrate="32k"):
-    """오디오 파일 압축 (16kHz 모노, 지정된 비트레이트)"""
+def _run_media_command(cmd):
+    """ffmpeg/ffprobe 실행 (Windows에서는 기존과 같이 STARTUPINFO로 콘솔 창을 띄우지 않음)"""
+    kwargs = {}
+    if os.name == 'nt':  # Windows
+        si = subprocess.STARTUPINFO()
+        si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        kwargs["startupinfo"] = si
+    return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs)
+
+def probe_audio(input_path):
+    """입력 파일을 한 번 조회하여 오디오 스트림 존재 여부와 길이(초)를 반환"""
+    probe_cmd = ['ffprobe', '-v', 'error', '-select_streams', 'a',
+                 '-show_entries', 'stream=index:format=duration',
+                 '-of', 'json', input_path]
+    result = _run_media_command(probe_cmd)
+
+    if result.returncode != 0:
+        error_message = result.stderr.decode('utf-8', errors='replace')
+        logger.error(f"미디어 정보 확인 실패: {error_message}")
+        raise Exception(f"미디어 정보 확인 실패: 반환 코드 {result.returncode}")
+
+    info = json.loads(result.stdout.decode('utf-8') or '{}')
+    duration = info.get('format', {}).get('duration')
+    return {
+        "has_audio": bool(info.get('streams')),
+        "duration": float(duration) if duration else None
+    }
+
+def decode_to_pcm(input_path, output_path, sample_rate=PCM_SAMPLE_RATE):
+    """입력 파일을 한 번의 ffmpeg 호출로 16kHz 모노 PCM(s16le) 원시 파일로 디코딩"""
     cmd = [
-        'ffmpeg', '-i', input_path,
-        '-ar', '16000', '-ac', '1', '-b:a', bitrate,
-        '-y', output_path  # 기존 파일 덮어쓰기
+        'ffmpeg', '-y', '-i', input_path,
+        '-vn',  # 비디오 스트림 제외
+        '-ar', str(sample_rate), '-ac', '1',
+        '-f', 's16le', '-acodec', 'pcm_s16le',
+        output_path
     ]
-    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    
+    result = _run_media_command(cmd)
+
     if result.returncode != 0:
         error_message = result.stderr.decode('utf-8', errors='replace')
-        logger.error(f"오디오 압축 실패: {error_message}")
-        raise Exception(f"오디오 압축 실패: 반환 코드 {result.returncode}")
-    
+        logger.error(f"PCM 디코딩 실패: {error_message}")
+        raise Exception(f"PCM 디코딩 실패: 반환 코드 {result.returncode}")
+
     return output_path
 
-def get_audio_duration(audio_path):
-    """오디오 파일의 길이(초)를 반환"""
-    probe_cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of',
-                 'default=noprint_wrappers=1:nokey=1', audio_path]
-    result = subprocess.run(probe_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    
+def encode_pcm_to_mp3(pcm_path, output_path, bitrate="64k", sample_rate=PCM_SAMPLE_RATE):
+    """PCM 원시 파일을 MP3로 인코딩 (다운로드용)"""
+    cmd = [
+        'ffmpeg', '-y',
+        '-f', 's16le', '-ar', str(sample_rate), '-ac', '1', '-i', pcm_path,
+        '-b:a', bitrate,
+        output_path
+    ]
+    result = _run_media_command(cmd)
+
     if result.returncode != 0:
         error_message = result.stderr.decode('utf-8', errors='replace')
-        logger.error(f"오디오 길이 확인 실패: {error_message}")
-        raise Exception(f"오디오 길이 확인 실패: 반환 코드 {result.returncode}")
-    
-    return float(result.stdout.decode('utf-8').strip())
-
-def get_file_size_mb(file_path):
-    """파일 크기를 MB 단위로 반환"""
-    size_bytes = os.path.getsize(file_path)
-    return size_bytes / (1024 * 1024)
-
-def split_audio(audio_path, chunk_dir, chunk_length, task_id):
-    """오디오 파일을 지정된 길이의 청크로 분할"""
-    os.makedirs(chunk_dir, exist_ok=True)
-    
-    duration = get_audio_duration(audio_path)
-    num_chunks = int(duration / chunk_length) + 1
-    chunk_paths = []
-    
-    for i in range(num_chunks):
-        start_time = i * chunk_length
-        # 마지막 청크는 끝까지
-        end_time = min((i + 1) * chunk_length, duration)
-        
-        # 청크 파일 생성
-        chunk_file = os.path.join(chunk_dir, f"chunk_{i}.mp3")
-        
-        # ffmpeg로 청크 추출
-        cmd = [
-            'ffmpeg', '-y', '-i', audio_path,
-            '-ss', str(start_time), '-to', str(end_time),
-            '-c:a', 'libmp3lame', '-b:a', '32k',
-            chunk_file
-        ]
-        
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        if result.returncode != 0:
-            error_message = result.stderr.decode('utf-8', errors='replace')
-            logger.error(f"오디오 청크 분할 실패: {error_message}")
-            raise Exception(f"오디오 청크 분할 실패: 반환 코드 {result.returncode}")
-        
-        chunk_paths.append(chunk_file)
-    
-    return chunk_paths, num_chunks
\ No newline at end of file
+        logger.error(f"MP3 인코딩 실패: {error_message}")
+        raise Exception(f"MP3 인코딩 실패: 반환 코드 {result.returncode}")
+
+    return output_path
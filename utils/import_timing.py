@@ -0,0 +1,119 @@
+"""
+프로젝트 모듈 import 시간 측정
+
+app.py 맨 앞에서 install()을 호출하면 이후 import되는 프로젝트 모듈의
+실행 시간(하위 import 포함/제외)을 기록한다. torch 같은 무거운 외부 패키지를
+모듈 수준에서 import하면 해당 프로젝트 모듈의 시간에 그대로 드러난다.
+config를 import하기 전에 설치해야 하므로 표준 라이브러리만 사용한다.
+"""
+import os
+import sys
+import time
+import threading
+import importlib.machinery
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_timings = {}  # 모듈 이름 → {"seconds", "self_seconds"}
+_stack = threading.local()
+_lock = threading.Lock()
+_installed_at = None
+_startup_seconds = None
+
+
+def _project_top_level_names():
+    names = set()
+    for entry in os.listdir(PROJECT_ROOT):
+        path = os.path.join(PROJECT_ROOT, entry)
+        if entry.endswith(".py"):
+            names.add(entry[:-3])
+        elif os.path.isdir(path) and os.path.exists(os.path.join(path, "__init__.py")):
+            names.add(entry)
+    return names
+
+
+class _TimedLoader:
+    """원래 로더에 위임하면서 exec_module 시간만 측정"""
+
+    def __init__(self, loader, name):
+        self._loader = loader
+        self._name = name
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        frames = getattr(_stack, "frames", None)
+        if frames is None:
+            frames = _stack.frames = []
+        frames.append(0.0)  # 하위 모듈 import에 쓴 시간
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = frames.pop()
+            if frames:
+                frames[-1] += elapsed
+            with _lock:
+                _timings[self._name] = {
+                    "seconds": round(elapsed, 3),
+                    "self_seconds": round(elapsed - children, 3)
+                }
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+
+class _TimingFinder:
+    """프로젝트 모듈만 찾아 로더를 감싸는 meta path finder"""
+
+    def __init__(self, top_level_names):
+        self._top_level_names = top_level_names
+
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] not in self._top_level_names:
+            return None
+        if path is None:
+            path = [PROJECT_ROOT]
+        spec = importlib.machinery.PathFinder.find_spec(name, path, target)
+        if spec is None or spec.loader is None or not hasattr(spec.loader, "exec_module"):
+            return spec
+        spec.loader = _TimedLoader(spec.loader, name)
+        return spec
+
+
+def install():
+    """import 시간 측정 시작 (여러 번 호출해도 한 번만 설치)"""
+    global _installed_at
+    if any(isinstance(finder, _TimingFinder) for finder in sys.meta_path):
+        return
+    _installed_at = time.perf_counter()
+    sys.meta_path.insert(0, _TimingFinder(_project_top_level_names()))
+
+def mark_startup_complete():
+    """앱 초기화 완료 시점 기록 (install 이후 걸린 시간 반환)"""
+    global _startup_seconds
+    if _installed_at is not None:
+        _startup_seconds = round(time.perf_counter() - _installed_at, 3)
+    return _startup_seconds
+
+def get_import_timings(limit=None):
+    """
+    모듈별 import 시간 (오래 걸린 순)
+    seconds는 하위 import 포함, self_seconds는 해당 모듈 자체 코드와 외부 패키지 import 시간
+    """
+    with _lock:
+        timings = [{"module": name, **values} for name, values in _timings.items()]
+    timings.sort(key=lambda item: item["self_seconds"], reverse=True)
+    return timings[:limit] if limit else timings
+
+def get_startup_report(limit=10):
+    """전체 import 시간, 앱 초기화 시간과 오래 걸린 모듈 목록"""
+    with _lock:
+        total = sum(values["self_seconds"] for values in _timings.values())
+    return {
+        "import_seconds": round(total, 3),
+        "startup_seconds": _startup_seconds,
+        "slowest_modules": get_import_timings(limit)
+    }
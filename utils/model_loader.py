@@ -0,0 +1,107 @@
+import os
+import time
+import threading
+from config import logger, TORCH_NUM_THREADS
+
+# 이름 → LazyModel (각 모듈이 import 시 등록, 실제 로드는 처음 사용할 때)
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class LazyModel:
+    """
+    처음 사용할 때 한 번만 로드하는 모델 (여러 스레드가 동시에 요청해도 로드는 한 번)
+    로드에 실패하면 오류를 기록하고 다음 호출 때 다시 시도
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self._loader = loader
+        self._model = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.error = None
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def get(self):
+        """모델 반환 (로드되지 않았으면 로드, 실패 시 예외 발생)"""
+        model = self._model
+        if model is not None:
+            return model
+
+        with self._lock:
+            if self._model is not None:
+                return self._model
+
+            started = time.time()
+            logger.info(f"모델 로드 시작: {self.name}")
+            try:
+                model = self._loader()
+            except Exception as e:
+                self.error = str(e)
+                logger.error(f"모델 로드 실패: {self.name} - {str(e)}")
+                raise
+            self.load_seconds = round(time.time() - started, 2)
+            self.error = None
+            self._model = model
+            logger.info(f"모델 로드 완료: {self.name} ({self.load_seconds}초)")
+            return model
+
+    def status(self):
+        return {"loaded": self.loaded, "load_seconds": self.load_seconds, "error": self.error}
+
+
+_torch_configured = False
+_torch_lock = threading.Lock()
+
+def configure_torch_threads(num_threads=TORCH_NUM_THREADS):
+    """
+    프로세스 내 torch 스레드 수 제한 (모델 로더에서 torch import 전에 호출)
+    CPU 풀의 단계들이 동시에 실행될 때 서로의 코어를 빼앗지 않도록 한다.
+    """
+    global _torch_configured
+    with _torch_lock:
+        if _torch_configured:
+            return
+        os.environ.setdefault("OMP_NUM_THREADS", str(num_threads))
+        os.environ.setdefault("MKL_NUM_THREADS", str(num_threads))
+
+        import torch
+        torch.set_num_threads(num_threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # 이미 병렬 작업이 실행된 뒤에는 변경 불가
+        _torch_configured = True
+    logger.info(f"torch 스레드 수 설정: {num_threads}")
+
+def register_model(name, loader):
+    """지연 로드 모델 등록"""
+    with _registry_lock:
+        model = _registry.setdefault(name, LazyModel(name, loader))
+    return model
+
+def warm_up_models(names=None):
+    """등록된 모델(또는 지정한 모델)을 미리 로드하고 모델별 상태 반환"""
+    with _registry_lock:
+        targets = dict(_registry)
+    if names:
+        unknown = set(names) - set(targets)
+        if unknown:
+            raise ValueError(f"등록되지 않은 모델: {', '.join(sorted(unknown))}")
+        targets = {name: targets[name] for name in names}
+
+    for model in targets.values():
+        try:
+            model.get()
+        except Exception:
+            pass  # 오류는 상태에 기록됨
+    return {name: model.status() for name, model in targets.items()}
+
+def get_model_status():
+    """등록된 모델별 로드 상태 반환"""
+    with _registry_lock:
+        return {name: model.status() for name, model in _registry.items()}
@@ -0,0 +1,46 @@
+"""
+16kHz 모노 PCM(s16le) 원시 오디오 파일 읽기 유틸리티
+
+Whisper 워커 프로세스에서도 import되므로 config 등 무거운 모듈에 의존하지 않는다.
+"""
+import os
+import numpy as np
+
+PCM_SAMPLE_RATE = 16000  # Whisper 입력 샘플링 레이트
+PCM_SAMPLE_WIDTH = 2  # s16le = 샘플당 2바이트
+
+
+def pcm_num_samples(pcm_path):
+    """PCM 파일의 전체 샘플 수"""
+    return os.path.getsize(pcm_path) // PCM_SAMPLE_WIDTH
+
+
+def pcm_duration(pcm_path):
+    """PCM 파일의 길이(초)"""
+    return pcm_num_samples(pcm_path) / PCM_SAMPLE_RATE
+
+
+def open_pcm(pcm_path):
+    """
+    PCM 파일을 int16 memmap으로 열기 (디스크에서 필요한 부분만 읽음)
+    빈 파일(무음/중단된 디코딩)은 memmap을 만들 수 없으므로 빈 배열 반환
+    """
+    num_samples = pcm_num_samples(pcm_path)
+    if num_samples == 0:
+        return np.zeros(0, dtype=np.int16)
+    # 마지막 샘플이 잘린 파일(홀수 바이트)은 완전한 샘플까지만 사용
+    return np.memmap(pcm_path, dtype=np.int16, mode='r', shape=(num_samples,))
+
+
+def read_pcm(pcm_path, start=0, end=None):
+    """PCM 파일의 [start, end) 샘플 구간을 Whisper 입력용 float32 배열로 반환"""
+    samples = open_pcm(pcm_path)
+    return samples[start:end].astype(np.float32) / 32768.0
+
+
+def read_pcm_segments(pcm_path, segments):
+    """여러 샘플 구간 [(start, end), ...]을 이어 붙여 하나의 float32 배열로 반환"""
+    if not segments:
+        return np.zeros(0, dtype=np.float32)
+    samples = open_pcm(pcm_path)
+    return np.concatenate([samples[start:end] for start, end in segments]).astype(np.float32) / 32768.0
@@ -0,0 +1,399 @@
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+from config import logger
+from utils.db_utils import get_connection
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_expires_at REAL,
+    owner TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_task ON jobs(task_id);
+"""
+
+# 작업 상태
+STATUS_QUEUED = "queued"
+STATUS_PROCESSING = "processing"
+STATUS_DEAD = "dead"
+
+
+class PersistentTaskQueue:
+    """
+    SQLite(WAL) 기반 영속 작업 큐 - queue.Queue와 같은 put/get/task_done 인터페이스
+
+    - get()으로 가져간 작업은 가시성 타임아웃(lease) 동안 다른 워커에게 보이지 않음
+    - 처리 중인 작업의 lease는 하트비트 스레드가 주기적으로 연장
+    - 실패한 작업은 재시도 횟수까지 지연 후 다시 대기열로, 초과하면 dead 상태로 격리
+    - 재시작 시 이전 프로세스가 처리 중이던 작업은 다시 대기열로 복구
+    - put(None)은 워커 종료 신호로 메모리에서만 처리
+    """
+
+    def __init__(self, db_path, visibility_timeout=600, max_attempts=3, retry_delay=30, poll_interval=1.0):
+        self.db_path = db_path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self._init_process_state()
+        # fork된 자식 프로세스(gunicorn/worker.py의 파이프라인 워커)는 별도의 소유자로 구분
+        # (형제 프로세스가 같은 소유자 토큰을 쓰면 비정상 종료한 형제의 작업을 복구하지 못함)
+        os.register_at_fork(after_in_child=self._init_process_state)
+
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _init_process_state(self):
+        """프로세스별 소유자 토큰과 잠금/처리 중 작업 상태 초기화"""
+        # 같은 PID가 재사용되어도 구분되도록 실행마다 고유 토큰 포함
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._condition = threading.Condition()
+        self._stop_signals = 0
+        self._local = threading.local()  # 워커 스레드별 현재 작업
+        self._owned = set()  # 이 프로세스가 처리 중인 작업 ID (lease 연장 대상)
+        self._owned_lock = threading.Lock()
+        self._heartbeat_thread = None
+
+    def _connect(self):
+        return get_connection(self.db_path)
+
+    # --- queue.Queue 호환 인터페이스 ---
+
+    def put(self, task):
+        """작업 추가 (task는 (task_id, file_path, url, callback_url, lecture_id, remaining_days) 튜플)"""
+        if task is None:
+            with self._condition:
+                self._stop_signals += 1
+                self._condition.notify()
+            return
+
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO jobs (task_id, payload, status, available_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (task[0], json.dumps(list(task), ensure_ascii=False), STATUS_QUEUED, now, now, now)
+                )
+        finally:
+            conn.close()
+
+        with self._condition:
+            self._condition.notify()
+
+    def get(self, block=True, timeout=None):
+        """
+        처리할 작업을 가져와 lease를 설정 (종료 신호면 None 반환)
+        다른 프로세스가 추가한 작업도 볼 수 있도록 poll_interval마다 DB 확인
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            with self._condition:
+                if self._stop_signals > 0:
+                    self._stop_signals -= 1
+                    return None
+
+            task = self._claim()
+            if task is not None:
+                return task
+
+            if not block or (deadline is not None and time.time() >= deadline):
+                return None
+
+            with self._condition:
+                wait_time = self.poll_interval
+                if deadline is not None:
+                    wait_time = min(wait_time, max(0, deadline - time.time()))
+                self._condition.wait(wait_time)
+
+    def task_done(self):
+        """현재 스레드가 처리한 작업 완료 처리 (큐에서 제거)"""
+        job_id = self._pop_current()
+        if job_id is None:
+            return
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        finally:
+            conn.close()
+
+    def fail(self, error):
+        """
+        현재 스레드가 처리한 작업 실패 처리
+        재시도 가능하면 지연 후 다시 대기열로, 아니면 dead 상태로 격리
+        반환값: 재시도 예정이면 True
+        """
+        job_id = self._pop_current()
+        if job_id is None:
+            return False
+
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT task_id, attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is None:
+                    return False
+
+                if row["attempts"] >= self.max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, owner = NULL, lease_expires_at = NULL, last_error = ?, updated_at = ? WHERE id = ?",
+                        (STATUS_DEAD, str(error), now, job_id)
+                    )
+                    logger.error(f"작업 재시도 한도 초과, dead-letter 처리: {row['task_id']} ({row['attempts']}회 시도)")
+                    return False
+
+                # 시도 횟수에 비례하여 재시도 지연
+                conn.execute(
+                    "UPDATE jobs SET status = ?, owner = NULL, lease_expires_at = NULL, last_error = ?, "
+                    "available_at = ?, updated_at = ? WHERE id = ?",
+                    (STATUS_QUEUED, str(error), now + self.retry_delay * row["attempts"], now, job_id)
+                )
+                logger.warning(f"작업 재시도 예약: {row['task_id']} ({row['attempts']}/{self.max_attempts})")
+                return True
+        finally:
+            conn.close()
+
+    def qsize(self):
+        """대기 중인 작업 수"""
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (STATUS_QUEUED,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    # --- 추가 기능 ---
+
+    def current_attempt(self):
+        """현재 스레드가 처리 중인 작업의 (시도 횟수, 최대 시도 횟수)"""
+        return getattr(self._local, "attempts", 0), self.max_attempts
+
+    def cancel(self, task_id):
+        """아직 시작되지 않은 작업을 대기열에서 제거"""
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "DELETE FROM jobs WHERE task_id = ? AND status = ?", (task_id, STATUS_QUEUED)
+                )
+                return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def resume(self, task):
+        """
+        작업 재개 - 대기 중이거나 처리 중인 작업이 없을 때만 추가
+        dead 상태 작업은 시도 횟수를 초기화하여 다시 대기열로, 없으면 새로 추가
+        확인과 추가를 하나의 트랜잭션으로 처리하여 동시 요청이 같은 작업을 두 번 추가하지 않음
+        반환값: 추가했으면 True, 이미 진행 중이면 False
+        """
+        task_id = task[0]
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                active = conn.execute(
+                    "SELECT 1 FROM jobs WHERE task_id = ? AND status IN (?, ?) LIMIT 1",
+                    (task_id, STATUS_QUEUED, STATUS_PROCESSING)
+                ).fetchone()
+                if active is not None:
+                    conn.execute("COMMIT")
+                    return False
+
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = 0, last_error = NULL, available_at = ?, updated_at = ? "
+                    "WHERE task_id = ? AND status = ?",
+                    (STATUS_QUEUED, now, now, task_id, STATUS_DEAD)
+                )
+                if cursor.rowcount == 0:
+                    conn.execute(
+                        "INSERT INTO jobs (task_id, payload, status, available_at, created_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (task_id, json.dumps(list(task), ensure_ascii=False), STATUS_QUEUED, now, now, now)
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+        with self._condition:
+            self._condition.notify()
+        return True
+
+    def dead_letters(self, limit=100):
+        """재시도 한도를 초과한 작업 목록"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT task_id, attempts, last_error, created_at, updated_at FROM jobs "
+                "WHERE status = ? ORDER BY updated_at DESC LIMIT ?",
+                (STATUS_DEAD, limit)
+            ).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def recover_inflight(self):
+        """
+        재시작 시 처리 중 상태로 남은 작업을 다시 대기열로 복구
+        (같은 호스트에서 종료된 프로세스의 작업 또는 lease가 만료된 작업)
+        """
+        hostname = socket.gethostname()
+        now = time.time()
+        recovered = 0
+
+        conn = self._connect()
+        try:
+            with conn:
+                rows = conn.execute(
+                    "SELECT id, task_id, owner, lease_expires_at FROM jobs WHERE status = ?",
+                    (STATUS_PROCESSING,)
+                ).fetchall()
+                for row in rows:
+                    owner_host, owner_pid, _ = ((row["owner"] or "").split(":") + ["", "", ""])[:3]
+                    orphaned = owner_host == hostname and (
+                        row["owner"] != self.owner and (str(os.getpid()) == owner_pid or not _pid_alive(owner_pid))
+                    )
+                    expired = row["lease_expires_at"] is not None and row["lease_expires_at"] < now
+                    if orphaned or expired:
+                        conn.execute(
+                            "UPDATE jobs SET status = ?, owner = NULL, lease_expires_at = NULL, "
+                            "available_at = ?, updated_at = ? WHERE id = ?",
+                            (STATUS_QUEUED, now, now, row["id"])
+                        )
+                        recovered += 1
+                        logger.info(f"처리 중이던 작업 복구: {row['task_id']}")
+        finally:
+            conn.close()
+
+        return recovered
+
+    # --- 내부 구현 ---
+
+    def _claim(self):
+        """대기 중이거나 lease가 만료된 작업 하나를 원자적으로 가져옴"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = conn.execute(
+                        "SELECT id, task_id, payload, attempts FROM jobs "
+                        "WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at < ?) "
+                        "ORDER BY id LIMIT 1",
+                        (STATUS_QUEUED, now, STATUS_PROCESSING, now)
+                    ).fetchone()
+                    if row is None:
+                        conn.execute("COMMIT")
+                        return None
+
+                    # lease가 만료된 작업도 시도 횟수를 초과했으면 격리
+                    if row["attempts"] >= self.max_attempts:
+                        conn.execute(
+                            "UPDATE jobs SET status = ?, owner = NULL, lease_expires_at = NULL, "
+                            "last_error = COALESCE(last_error, ?), updated_at = ? WHERE id = ?",
+                            (STATUS_DEAD, "처리 시간 초과", now, row["id"])
+                        )
+                        logger.error(f"작업 재시도 한도 초과, dead-letter 처리: {row['task_id']}")
+                        continue
+
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, owner = ?, "
+                        "lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                        (STATUS_PROCESSING, self.owner, now + self.visibility_timeout, now, row["id"])
+                    )
+                    conn.execute("COMMIT")
+                    break
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+        self._local.job_id = row["id"]
+        self._local.attempts = row["attempts"] + 1
+        with self._owned_lock:
+            self._owned.add(row["id"])
+        self._ensure_heartbeat()
+        return tuple(json.loads(row["payload"]))
+
+    def _pop_current(self):
+        job_id = getattr(self._local, "job_id", None)
+        self._local.job_id = None
+        if job_id is not None:
+            with self._owned_lock:
+                self._owned.discard(job_id)
+        return job_id
+
+    def _ensure_heartbeat(self):
+        """처리 중인 작업의 lease를 연장하는 하트비트 스레드 (프로세스당 1개)"""
+        if self._heartbeat_thread is not None and self._heartbeat_thread.is_alive():
+            return
+        with self._owned_lock:
+            if self._heartbeat_thread is not None and self._heartbeat_thread.is_alive():
+                return
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat, daemon=True)
+            self._heartbeat_thread.start()
+
+    def _heartbeat(self):
+        interval = max(1, self.visibility_timeout / 3)
+        while True:
+            time.sleep(interval)
+            with self._owned_lock:
+                owned = list(self._owned)
+            if not owned:
+                continue
+            try:
+                now = time.time()
+                conn = self._connect()
+                try:
+                    with conn:
+                        conn.executemany(
+                            "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND owner = ?",
+                            [(now + self.visibility_timeout, now, job_id, self.owner) for job_id in owned]
+                        )
+                finally:
+                    conn.close()
+            except Exception as e:
+                logger.warning(f"작업 lease 연장 실패: {str(e)}")
+
+
+def _pid_alive(pid):
+    """같은 호스트의 프로세스가 살아 있는지 확인"""
+    try:
+        pid = int(pid)
+    except (TypeError, ValueError):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
@@ -0,0 +1,141 @@
+import json
+import time
+import threading
+from config import logger
+from utils.db_utils import get_connection
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    task_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL,
+    message TEXT,
+    result TEXT,
+    stages TEXT,
+    timestamp REAL NOT NULL,
+    seq INTEGER NOT NULL,
+    origin TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_progress_seq ON progress(seq);
+"""
+
+# 종료 상태 항목 정리 최소 간격(초)
+PURGE_INTERVAL = 60
+
+
+class ProgressDatabase:
+    """
+    여러 프로세스(API 서버, 독립 워커)가 공유하는 진행 상황 테이블 (SQLite WAL)
+
+    - 기록할 때마다 전역 순번(seq)을 증가시켜 다른 프로세스가 변경분만 조회
+    - 종료 상태(completed/failed) 항목은 ttl이 지나면 정리
+    """
+
+    def __init__(self, db_path, ttl=3600, terminal_statuses=("completed", "failed")):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.terminal_statuses = tuple(terminal_statuses)
+        self._last_purged = 0.0
+        self._purge_lock = threading.Lock()
+
+        conn = get_connection(self.db_path)
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def write(self, task_id, entry, origin=None):
+        """진행 상황 기록 (실패해도 처리를 멈추지 않도록 경고만 남김)"""
+        try:
+            conn = get_connection(self.db_path)
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO progress (task_id, status, progress, message, result, stages, timestamp, seq, origin) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM progress), ?)",
+                        (
+                            task_id, entry["status"], entry.get("progress", 0), entry.get("message", ""),
+                            json.dumps(entry["result"], ensure_ascii=False) if entry.get("result") else None,
+                            json.dumps(entry["stages"], ensure_ascii=False) if entry.get("stages") is not None else None,
+                            entry.get("timestamp", time.time()), origin
+                        )
+                    )
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                self._purge(conn)
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"진행 상황 기록 실패: {task_id} - {str(e)}")
+
+    def read(self, task_id):
+        conn = get_connection(self.db_path)
+        try:
+            row = conn.execute("SELECT * FROM progress WHERE task_id = ?", (task_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._to_entry(row) if row is not None else None
+
+    def read_all(self):
+        conn = get_connection(self.db_path)
+        try:
+            rows = conn.execute("SELECT * FROM progress ORDER BY seq").fetchall()
+        finally:
+            conn.close()
+        return {row["task_id"]: self._to_entry(row) for row in rows}
+
+    def read_since(self, seq, exclude_origin=None):
+        """seq 이후 변경된 항목 [(task_id, 진행 상황), ...]과 마지막 seq 반환"""
+        conn = get_connection(self.db_path)
+        try:
+            rows = conn.execute("SELECT * FROM progress WHERE seq > ? ORDER BY seq", (seq,)).fetchall()
+        finally:
+            conn.close()
+        last_seq = rows[-1]["seq"] if rows else seq
+        updates = [(row["task_id"], self._to_entry(row)) for row in rows if row["origin"] != exclude_origin]
+        return updates, last_seq
+
+    def max_seq(self):
+        conn = get_connection(self.db_path)
+        try:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM progress").fetchone()[0]
+        finally:
+            conn.close()
+
+    def count(self):
+        conn = get_connection(self.db_path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM progress").fetchone()[0]
+        finally:
+            conn.close()
+
+    def _purge(self, conn):
+        """ttl이 지난 종료 상태 항목 정리 (PURGE_INTERVAL마다 한 번)"""
+        now = time.time()
+        with self._purge_lock:
+            if now - self._last_purged < PURGE_INTERVAL:
+                return
+            self._last_purged = now
+        placeholders = ",".join("?" * len(self.terminal_statuses))
+        with conn:
+            conn.execute(
+                f"DELETE FROM progress WHERE status IN ({placeholders}) AND timestamp < ?",
+                (*self.terminal_statuses, now - self.ttl)
+            )
+
+    @staticmethod
+    def _to_entry(row):
+        entry = {
+            "status": row["status"],
+            "progress": row["progress"],
+            "message": row["message"],
+            "timestamp": row["timestamp"]
+        }
+        if row["result"]:
+            entry["result"] = json.loads(row["result"])
+        if row["stages"]:
+            entry["stages"] = json.loads(row["stages"])
+        return entry
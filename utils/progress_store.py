@@ -0,0 +1,277 @@
+import time
+import uuid
+import heapq
+import threading
+from collections import OrderedDict
+
+# 완료 후 일정 시간이 지나면 제거되는 종료 상태
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class ProgressStore:
+    """
+    작업 진행 상황 저장소
+
+    - 종료 상태(completed/failed) 작업은 만료 힙에 등록하고 단일 reaper 스레드가 제거
+      (작업마다 스레드를 만들지 않으므로 처리량과 무관하게 스레드 수가 일정)
+    - 같은 상태/메시지로 짧은 간격에 들어오는 업데이트(다운로드 훅 등)는 최신 상태만 저장하고
+      구독자/공유 DB 전달을 병합 (병합 구간이 끝나면 reaper 스레드가 마지막 상태를 전달)
+    - subscribe()로 등록한 구독자에게 업데이트를 전달 (SSE 진행 상황 스트림용)
+    - shared_db(ProgressDatabase)가 있으면 모든 업데이트를 공유 DB에 기록하고 조회도 DB에서 수행
+      (독립 워커 프로세스의 업데이트는 동기화 스레드가 sync_interval마다 읽어 구독자에게 전달)
+    """
+
+    def __init__(self, ttl=3600, coalesce_interval=0.5, shared_db=None, sync_interval=0.5):
+        self.ttl = ttl
+        self.coalesce_interval = coalesce_interval
+        self.shared_db = shared_db
+        self.sync_interval = sync_interval
+        self.origin = uuid.uuid4().hex  # 자기 업데이트를 동기화에서 제외하기 위한 식별자
+
+        self._entries = {}
+        self._expiry_heap = []  # (만료 시각, task_id, 세대)
+        self._generations = {}  # task_id → 유효한 만료 예약 세대
+        self._condition = threading.Condition()
+        self._reaper = None
+        self._subscribers = set()
+        self._published = {}  # task_id → (마지막 전달 시각, 전달한 진행률)
+        self._flush_due = {}  # task_id → 병합된 최신 상태를 전달할 시각
+        self._sync_thread = None
+        self._sync_seq = 0
+
+    def update(self, task_id, status, progress=0, message="", result=None, stages=None):
+        """진행 상황 업데이트 (전달이 병합된 경우 False 반환, stages는 단계별 상태)"""
+        now = time.time()
+        with self._condition:
+            entry = self._entries.get(task_id)
+            published = self._published.get(task_id)
+
+            # 같은 상태/메시지의 잦은 업데이트는 진행률 변화가 작으면 전달을 병합 (메시지가 바뀌면 바로 전달)
+            coalesce = (entry is not None and published is not None and result is None and stages is None
+                        and entry.get("status") == status
+                        and entry.get("message") == message
+                        and now - published[0] < self.coalesce_interval
+                        and abs(progress - published[1]) < 1)
+
+            if entry is None:
+                entry = {}
+                self._entries[task_id] = entry
+
+            entry.update({
+                "status": status,
+                "progress": progress,
+                "message": message,
+                "timestamp": now
+            })
+
+            if result:
+                entry["result"] = result
+            if stages is not None:
+                entry["stages"] = stages
+
+            if status in TERMINAL_STATUSES:
+                # 완료된 작업은 일정 시간 후 제거 (클린업)
+                self._schedule_expiry(task_id, now + self.ttl)
+            else:
+                # 재시도 등으로 다시 진행 중이 되면 만료 예약 취소
+                self._generations.pop(task_id, None)
+
+            if coalesce:
+                # 최신 상태는 저장해 두고 병합 구간이 끝나면 전달
+                if task_id not in self._flush_due:
+                    self._flush_due[task_id] = published[0] + self.coalesce_interval
+                    self._wake_reaper()
+                return False
+
+            self._flush_due.pop(task_id, None)
+            snapshot = self._record_published(task_id, now)
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            subscriber.publish(task_id, snapshot)
+        return True
+
+    def _record_published(self, task_id, now):
+        """현재 상태를 전달 완료로 기록하고 공유 DB에 기록 (_condition 보유 상태에서 호출)"""
+        snapshot = dict(self._entries[task_id])
+        self._published[task_id] = (now, snapshot.get("progress", 0))
+        # 같은 작업의 기록 순서가 뒤바뀌지 않도록 잠금 안에서 기록
+        if self.shared_db is not None:
+            self.shared_db.write(task_id, snapshot, self.origin)
+        return snapshot
+
+    def get(self, task_id):
+        """특정 작업의 진행 상황 (복사본)"""
+        if self.shared_db is not None:
+            return self.shared_db.read(task_id)
+        with self._condition:
+            entry = self._entries.get(task_id)
+            return dict(entry) if entry is not None else None
+
+    def get_all(self):
+        """모든 작업의 진행 상황 (복사본)"""
+        if self.shared_db is not None:
+            return self.shared_db.read_all()
+        with self._condition:
+            return {task_id: dict(entry) for task_id, entry in self._entries.items()}
+
+    def subscribe(self, task_ids=None, max_pending=100):
+        """
+        진행 상황 구독 등록 (task_ids가 없으면 모든 작업)
+        등록 시점의 현재 상태를 먼저 전달한 뒤 이후 업데이트를 전달한다.
+        """
+        subscription = ProgressSubscription(self, task_ids, max_pending)
+        if self.shared_db is not None:
+            self._ensure_sync()
+            with self._condition:
+                self._subscribers.add(subscription)
+            for task_id, entry in self.shared_db.read_all().items():
+                subscription.publish(task_id, entry)
+            return subscription
+
+        with self._condition:
+            self._subscribers.add(subscription)
+            for task_id, entry in self._entries.items():
+                subscription.publish(task_id, dict(entry))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._condition:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._condition:
+            return len(self._subscribers)
+
+    def __len__(self):
+        if self.shared_db is not None:
+            return self.shared_db.count()
+        with self._condition:
+            return len(self._entries)
+
+    def _ensure_sync(self):
+        """다른 프로세스의 업데이트를 구독자에게 전달하는 동기화 스레드 시작 (최초 구독 시)"""
+        with self._condition:
+            if self._sync_thread is not None and self._sync_thread.is_alive():
+                return
+            # 구독 시점의 현재 상태는 subscribe()에서 전달하므로 이후 변경분부터 동기화
+            self._sync_seq = self.shared_db.max_seq()
+            self._sync_thread = threading.Thread(target=self._sync, daemon=True)
+            self._sync_thread.start()
+
+    def _sync(self):
+        while True:
+            time.sleep(self.sync_interval)
+            with self._condition:
+                subscribers = list(self._subscribers)
+            try:
+                updates, self._sync_seq = self.shared_db.read_since(self._sync_seq, exclude_origin=self.origin)
+            except Exception:
+                continue  # DB 잠금 등 일시적 오류는 다음 주기에 다시 시도
+            for task_id, entry in updates:
+                for subscriber in subscribers:
+                    subscriber.publish(task_id, entry)
+
+    def _schedule_expiry(self, task_id, expires_at):
+        """만료 예약 (_condition 보유 상태에서 호출)"""
+        generation = self._generations.get(task_id, 0) + 1
+        self._generations[task_id] = generation
+        heapq.heappush(self._expiry_heap, (expires_at, task_id, generation))
+
+        if self._expiry_heap[0][1] == task_id:
+            # 가장 빠른 만료 시각이 바뀌었으면 reaper 깨우기
+            self._wake_reaper()
+
+    def _wake_reaper(self):
+        """reaper 스레드 시작 또는 깨우기 (_condition 보유 상태에서 호출)"""
+        if self._reaper is None or not self._reaper.is_alive():
+            self._reaper = threading.Thread(target=self._reap, daemon=True)
+            self._reaper.start()
+        else:
+            self._condition.notify()
+
+    def _flush_coalesced(self, now):
+        """병합 구간이 끝난 작업의 최신 상태 전달 (_condition 보유 상태에서 호출)"""
+        for task_id in [task_id for task_id, due in self._flush_due.items() if due <= now]:
+            del self._flush_due[task_id]
+            if task_id not in self._entries:
+                continue
+            snapshot = self._record_published(task_id, now)
+            for subscriber in self._subscribers:
+                subscriber.publish(task_id, snapshot)
+
+    def _reap(self):
+        """병합된 업데이트 전달 및 만료 힙의 가장 빠른 항목까지 대기 후 만료된 작업 제거"""
+        with self._condition:
+            while True:
+                now = time.time()
+                self._flush_coalesced(now)
+
+                next_times = list(self._flush_due.values())
+                if self._expiry_heap:
+                    next_times.append(self._expiry_heap[0][0])
+                if not next_times:
+                    self._condition.wait()
+                    continue
+
+                wait_time = min(next_times) - now
+                if wait_time > 0:
+                    self._condition.wait(wait_time)
+                    continue
+
+                if not self._expiry_heap or self._expiry_heap[0][0] > now:
+                    continue
+
+                expires_at, task_id, generation = heapq.heappop(self._expiry_heap)
+                # 취소되었거나 다시 예약된 항목은 무시
+                if self._generations.get(task_id) == generation:
+                    del self._generations[task_id]
+                    self._entries.pop(task_id, None)
+                    self._published.pop(task_id, None)
+                    self._flush_due.pop(task_id, None)
+
+
+class ProgressSubscription:
+    """
+    구독자별 버퍼 - 작업별 최신 상태만 보관하므로 느린 구독자는 중간 업데이트를 건너뛴다.
+    버퍼가 가득 차면 가장 오래된 작업의 업데이트를 버린다.
+    """
+
+    def __init__(self, store, task_ids, max_pending):
+        self.store = store
+        self.task_ids = set(task_ids) if task_ids else None
+        self.max_pending = max_pending
+        self.dropped = 0
+
+        self._pending = OrderedDict()  # task_id → 최신 진행 상황
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def publish(self, task_id, entry):
+        if self.task_ids is not None and task_id not in self.task_ids:
+            return
+        with self._condition:
+            if self._closed:
+                return
+            self._pending.pop(task_id, None)
+            self._pending[task_id] = entry
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """버퍼에 쌓인 업데이트를 [(task_id, 진행 상황), ...]로 반환 (시간 초과 시 빈 목록)"""
+        with self._condition:
+            if not self._pending and not self._closed:
+                self._condition.wait(timeout)
+            updates = list(self._pending.items())
+            self._pending.clear()
+            return updates
+
+    def close(self):
+        self.store.unsubscribe(self)
+        with self._condition:
+            self._closed = True
+            self._pending.clear()
+            self._condition.notify_all()
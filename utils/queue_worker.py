@@ -1,80 +1,104 @@
 import threading
-import queue
 import time
 from concurrent.futures import ThreadPoolExecutor
-from config import logger, MAX_WORKERS
+from config import (
+    logger, MAX_WORKERS, QUEUE_DB_PATH, QUEUE_VISIBILITY_TIMEOUT,
+    QUEUE_MAX_ATTEMPTS, QUEUE_RETRY_DELAY, PROGRESS_TTL, PROGRESS_COALESCE_INTERVAL,
+    PROGRESS_SHARED, PROGRESS_DB_PATH, PROGRESS_SYNC_INTERVAL
+)
+from utils.persistent_queue import PersistentTaskQueue
+from utils.progress_store import ProgressStore, TERMINAL_STATUSES
+from utils.progress_db import ProgressDatabase
+from utils.async_loop import start_event_loop, stop_event_loop
+from utils.checkpoint import purge_expired_checkpoints
 
-# 작업 큐 및 진행 상황 추적
-task_queue = queue.Queue()
-progress_tracker = {}
-lock = threading.Lock()
+# 작업 큐 (SQLite 영속 큐)
+task_queue = PersistentTaskQueue(
+    QUEUE_DB_PATH,
+    visibility_timeout=QUEUE_VISIBILITY_TIMEOUT,
+    max_attempts=QUEUE_MAX_ATTEMPTS,
+    retry_delay=QUEUE_RETRY_DELAY
+)
+# 진행 상황 저장소 (단일 reaper 스레드로 완료 작업 만료 처리, 공유 DB가 있으면 프로세스 간 공유)
+progress_store = ProgressStore(
+    ttl=PROGRESS_TTL,
+    coalesce_interval=PROGRESS_COALESCE_INTERVAL,
+    shared_db=ProgressDatabase(PROGRESS_DB_PATH, PROGRESS_TTL, TERMINAL_STATUSES) if PROGRESS_SHARED else None,
+    sync_interval=PROGRESS_SYNC_INTERVAL
+)
 
 # 스레드 풀 생성
 executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
 
-def update_progress(task_id, status, progress=0, message="", result=None):
-    """진행 상황 업데이트"""
-    with lock:
-        if task_id not in progress_tracker:
-            progress_tracker[task_id] = {}
-
-        progress_tracker[task_id].update({
-            "status": status,
-            "progress": progress,
-            "message": message,
-            "timestamp": time.time()
-        })
-
-        if result:
-            progress_tracker[task_id]["result"] = result
+# 단계 그래프(utils.stage_graph)에서 실행 중인 단계 정보 (스레드별)
+stage_context = threading.local()
 
-        # 완료된 작업은 일정 시간 후 제거 (클린업)
-        if status == "completed" or status == "failed":
-            def cleanup():
-                time.sleep(3600)  # 1시간 후 제거
-                with lock:
-                    if task_id in progress_tracker:
-                        del progress_tracker[task_id]
-
-            cleanup_thread = threading.Thread(target=cleanup)
-            cleanup_thread.daemon = True
-            cleanup_thread.start()
+def update_progress(task_id, status, progress=0, message="", result=None):
+    """진행 상황 업데이트 (단계 그래프 실행 중이면 해당 단계의 상태로 기록)"""
+    graph = getattr(stage_context, "graph", None)
+    if graph is not None and graph.task_id == task_id:
+        graph.report(stage_context.stage, status, message, result)
+        return
+    progress_store.update(task_id, status, progress, message, result)
 
 def get_progress(task_id):
     """특정 작업의 진행 상황 조회"""
-    with lock:
-        if task_id not in progress_tracker:
-            return None
-        return progress_tracker[task_id]
+    return progress_store.get(task_id)
 
 def get_all_progress():
     """모든 작업의 진행 상황 조회"""
-    with lock:
-        return progress_tracker.copy()
+    return progress_store.get_all()
+
+def is_last_attempt():
+    """현재 워커 스레드의 작업이 마지막 시도인지 (실패 시 재시도되지 않는지) 확인"""
+    attempts, max_attempts = task_queue.current_attempt()
+    return attempts == 0 or attempts >= max_attempts
 
 def worker_function(processor_func):
     def worker():
         while True:
+            # 작업 큐에서 작업 가져오기
+            task = task_queue.get()
+            if task is None:  # 종료 신호
+                break
+
             try:
-                # 작업 큐에서 작업 가져오기
-                task = task_queue.get()
                 if len(task) >= 6:  # 새 형식 (remaining_days 포함)
-                    task_id, file_path, youtube_url, callback_url, lecture_id, remaining_days = task
+                    task_id, file_path, youtube_url, callback_url, lecture_id, remaining_days = task[:6]
                 else:  # 이전 형식 호환성 유지
                     task_id, file_path, youtube_url, callback_url, lecture_id = task
                     remaining_days = 5  # 기본값
+                # 중복 업로드 결과 재사용 작업은 7번째 값으로 이전 작업 ID 전달
+                reuse_from = task[6] if len(task) >= 7 else None
                 
                 # 프로세서 함수 호출 (남은 일수 전달)
-                processor_func(task_id, file_path, youtube_url, callback_url, lecture_id, remaining_days)
+                processor_func(task_id, file_path, youtube_url, callback_url, lecture_id, remaining_days,
+                               reuse_from=reuse_from)
                 
                 # 작업 완료 표시
                 task_queue.task_done()
             except Exception as e:
                 logger.error(f"작업 처리 중 오류 발생: {str(e)}")
+                # 재시도 가능하면 다시 대기열로, 아니면 dead-letter 처리
+                if task_queue.fail(str(e)):
+                    attempts, max_attempts = task_queue.current_attempt()
+                    update_progress(task[0], "queued", 0, f"처리 실패, 재시도 대기 중 ({attempts}/{max_attempts})")
     return worker
 
 def start_workers(worker_function, num_workers=MAX_WORKERS):
-    """워커 스레드들을 시작"""
+    """워커 스레드들을 시작 (이전 실행에서 처리 중이던 작업은 먼저 대기열로 복구)"""
+    # LLM 호출 등 비동기 I/O를 실행할 이벤트 루프
+    start_event_loop()
+
+    recovered = task_queue.recover_inflight()
+    if recovered:
+        logger.info(f"처리 중이던 작업 {recovered}개를 대기열로 복구")
+
+    # 오래된 실패 작업의 체크포인트와 재개용 업로드 파일 정리
+    purged = purge_expired_checkpoints()
+    if purged:
+        logger.info(f"만료된 체크포인트 {purged}개 정리")
+
     worker_threads = []
     for _ in range(num_workers):
         t = threading.Thread(target=worker_function)
@@ -83,10 +107,16 @@ def start_workers(worker_function, num_workers=MAX_WORKERS):
         worker_threads.append(t)
     return worker_threads
 
-def stop_workers(num_workers=MAX_WORKERS):
-    """워커 스레드들을 중지"""
+def stop_workers(num_workers=MAX_WORKERS, worker_threads=None, timeout=None):
+    """워커 스레드들을 중지 (worker_threads를 주면 처리 중인 작업이 끝날 때까지 최대 timeout초 대기)"""
     for _ in range(num_workers):
         task_queue.put(None)
+
+    if worker_threads:
+        deadline = time.time() + timeout if timeout is not None else None
+        for t in worker_threads:
+            t.join(None if deadline is None else max(0, deadline - time.time()))
     
     # ThreadPoolExecutor 종료
-    executor.shutdown(wait=False)
\ No newline at end of file
+    executor.shutdown(wait=False)
+    stop_event_loop()
\ No newline at end of file
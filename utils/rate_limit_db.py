@@ -0,0 +1,149 @@
+import time
+from utils.db_utils import get_connection
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS slots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS gate (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    blocked_until REAL NOT NULL
+);
+"""
+
+# 다른 프로세스가 동시 실행 슬롯을 반환했는지 다시 확인하는 간격(초)
+SLOT_POLL_INTERVAL = 0.5
+
+
+class SharedRateLimiter:
+    """
+    여러 프로세스가 공유하는 호출 한도 (SQLite WAL)
+
+    - 분당 요청 수/토큰 수 버킷, 동시 실행 슬롯, 429 응답에 따른 전체 대기 시각을 한 DB에 저장
+    - 확인과 차감을 BEGIN IMMEDIATE 트랜잭션으로 처리하여 프로세스 간에 한도를 나누어 씀
+    - 슬롯은 slot_ttl이 지나면 만료 (반환하지 못하고 종료된 프로세스의 슬롯 회수)
+    - 시각은 프로세스 간에 비교할 수 있도록 time.time() 사용
+    """
+
+    shared = True
+
+    def __init__(self, db_path, rpm, tpm, max_concurrency, slot_ttl):
+        self.db_path = db_path
+        self.limits = {"requests": float(rpm), "tokens": float(tpm)}
+        self.max_concurrency = max_concurrency
+        self.slot_ttl = slot_ttl
+
+        conn = get_connection(self.db_path)
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _available(self, conn, name, now):
+        capacity = self.limits[name]
+        row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return capacity
+        return min(capacity, row["tokens"] + (now - row["updated"]) * capacity / 60.0)
+
+    def _set(self, conn, name, tokens, now):
+        conn.execute(
+            "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)", (name, tokens, now)
+        )
+
+    def _wait_time(self, available, name, amount):
+        capacity = self.limits[name]
+        amount = min(amount, capacity)
+        return 0.0 if available >= amount else (amount - available) / (capacity / 60.0)
+
+    def _blocked_until(self, conn):
+        row = conn.execute("SELECT blocked_until FROM gate WHERE id = 1").fetchone()
+        return row["blocked_until"] if row else 0.0
+
+    def try_acquire(self, cost):
+        """
+        한도 여유가 있으면 요청 1개/토큰 cost개를 차감하고 슬롯을 잡아 (슬롯 ID, 0) 반환
+        여유가 없으면 (None, 다시 확인할 때까지 기다릴 시간(초))
+        """
+        now = time.time()
+        conn = get_connection(self.db_path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM slots WHERE expires_at < ?", (now,))
+                in_flight = conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0]
+                requests = self._available(conn, "requests", now)
+                tokens = self._available(conn, "tokens", now)
+                delay = max(
+                    self._blocked_until(conn) - now,
+                    self._wait_time(requests, "requests", 1),
+                    self._wait_time(tokens, "tokens", cost)
+                )
+                if in_flight >= self.max_concurrency:
+                    delay = max(delay, SLOT_POLL_INTERVAL)
+                if delay > 0:
+                    conn.execute("COMMIT")
+                    return None, delay
+
+                self._set(conn, "requests", requests - 1, now)
+                self._set(conn, "tokens", tokens - min(cost, self.limits["tokens"]), now)
+                slot = conn.execute(
+                    "INSERT INTO slots (expires_at) VALUES (?)", (now + self.slot_ttl,)
+                ).lastrowid
+                conn.execute("COMMIT")
+                return slot, 0.0
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def release(self, slot, reserved, used):
+        """슬롯 반환, 실제 사용 토큰이 예약보다 적으면 차이를 돌려줌"""
+        now = time.time()
+        conn = get_connection(self.db_path)
+        try:
+            with conn:
+                conn.execute("DELETE FROM slots WHERE id = ?", (slot,))
+                if used < reserved:
+                    tokens = self._available(conn, "tokens", now)
+                    self._set(conn, "tokens", min(self.limits["tokens"], tokens + reserved - used), now)
+        finally:
+            conn.close()
+
+    def block(self, seconds):
+        """모든 프로세스의 호출을 seconds 동안 멈춤 (429 응답)"""
+        until = time.time() + seconds
+        conn = get_connection(self.db_path)
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO gate (id, blocked_until) VALUES (1, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET blocked_until = MAX(blocked_until, excluded.blocked_until)",
+                    (until,)
+                )
+        finally:
+            conn.close()
+
+    def snapshot(self):
+        """현재 한도 상태 (모든 프로세스 합계)"""
+        now = time.time()
+        conn = get_connection(self.db_path)
+        try:
+            return {
+                "in_flight": conn.execute("SELECT COUNT(*) FROM slots WHERE expires_at >= ?", (now,)).fetchone()[0],
+                "available_requests": int(self._available(conn, "requests", now)),
+                "available_tokens": int(self._available(conn, "tokens", now)),
+                "blocked_seconds": max(0.0, self._blocked_until(conn) - now)
+            }
+        finally:
+            conn.close()
+
+    def reset(self):
+        """이벤트 루프가 다시 시작될 때 호출 (공유 슬롯은 만료 시각으로 회수)"""
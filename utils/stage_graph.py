@@ -0,0 +1,137 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import logger
+from utils.queue_worker import progress_store, stage_context
+
+# 단계 상태
+STAGE_PENDING = "pending"
+STAGE_RUNNING = "running"
+STAGE_COMPLETED = "completed"
+STAGE_FAILED = "failed"
+STAGE_SKIPPED = "skipped"
+
+
+class StageGraph:
+    """
+    작업 단계 의존성 그래프 - 선행 단계가 모두 끝난 단계를 동시에 실행
+
+    - 각 단계 함수는 지금까지의 단계 결과 딕셔너리(단계 이름 → 반환값)를 인자로 받는다.
+    - 전체 진행률은 완료된 단계의 가중치 합으로 start_progress~end_progress 사이에 매핑
+    - 단계 실행 중 호출된 update_progress는 해당 단계의 상태로 기록되어 진행률이 역행하지 않는다.
+    - 한 단계가 실패하면 아직 시작하지 않은 단계는 건너뛰고, 실행 중인 단계가 끝난 뒤 예외를 다시 발생
+    """
+
+    def __init__(self, task_id, start_progress=70, end_progress=99):
+        self.task_id = task_id
+        self.start_progress = start_progress
+        self.end_progress = end_progress
+
+        self._stages = {}  # 이름 → {"func", "deps", "weight", "label"}
+        self._states = {}  # 이름 → {"status", "message", "elapsed"}
+        self._results = {}
+        self._progress_result = {}  # 단계들이 보고한 결과(퀴즈, 학습 계획 등) 병합
+        self._lock = threading.Lock()
+
+    def add(self, name, func, deps=(), weight=1, label=None):
+        """단계 추가 (deps의 단계가 모두 완료되어야 실행)"""
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"선행 단계가 등록되지 않았습니다: {dep}")
+        self._stages[name] = {"func": func, "deps": tuple(deps), "weight": weight, "label": label or name}
+        self._states[name] = {"status": STAGE_PENDING, "message": "", "elapsed": None}
+
+    def run(self):
+        """그래프 실행 후 단계별 결과 딕셔너리 반환"""
+        started_at = {}
+        futures = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=max(1, len(self._stages))) as executor:
+            while True:
+                # 실패가 없으면 실행 가능한 단계 모두 시작
+                if error is None:
+                    for name, stage in self._stages.items():
+                        if self._states[name]["status"] != STAGE_PENDING:
+                            continue
+                        if all(self._states[dep]["status"] == STAGE_COMPLETED for dep in stage["deps"]):
+                            self._set_state(name, STAGE_RUNNING, f"{stage['label']} 중...")
+                            started_at[name] = time.time()
+                            futures[executor.submit(self._run_stage, name)] = name
+
+                if not futures:
+                    break
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures.pop(future)
+                    elapsed = time.time() - started_at[name]
+                    try:
+                        result = future.result()
+                        with self._lock:
+                            self._results[name] = result
+                            self._states[name]["elapsed"] = round(elapsed, 2)
+                        self._set_state(name, STAGE_COMPLETED, f"{self._stages[name]['label']} 완료")
+                        logger.info(f"단계 완료: {self.task_id} {name} ({elapsed:.2f}초)")
+                    except Exception as e:
+                        logger.error(f"단계 실패: {self.task_id} {name} - {str(e)}")
+                        self._set_state(name, STAGE_FAILED, f"{self._stages[name]['label']} 실패: {str(e)}")
+                        if error is None:
+                            error = e
+
+        if error is not None:
+            with self._lock:
+                for state in self._states.values():
+                    if state["status"] == STAGE_PENDING:
+                        state["status"] = STAGE_SKIPPED
+            self._publish()
+            raise error
+
+        return dict(self._results)
+
+    def _run_stage(self, name):
+        # 단계 함수 안의 update_progress 호출을 이 단계의 상태로 기록
+        stage_context.graph = self
+        stage_context.stage = name
+        with self._lock:
+            results = dict(self._results)
+        try:
+            return self._stages[name]["func"](results)
+        finally:
+            stage_context.graph = None
+            stage_context.stage = None
+
+    def report(self, name, status, message="", result=None):
+        """단계 실행 중 update_progress 호출 처리 (실패 상태는 단계 종료 시 기록)"""
+        with self._lock:
+            if result:
+                self._progress_result.update(result)
+            if status != "failed":
+                self._states[name]["message"] = message
+        self._publish()
+
+    def _set_state(self, name, status, message):
+        with self._lock:
+            self._states[name]["status"] = status
+            self._states[name]["message"] = message
+        self._publish()
+
+    def _publish(self):
+        """단계별 상태를 하나의 진행 상황으로 집계하여 기록"""
+        with self._lock:
+            total_weight = sum(stage["weight"] for stage in self._stages.values()) or 1
+            done_weight = sum(
+                self._stages[name]["weight"] for name, state in self._states.items()
+                if state["status"] == STAGE_COMPLETED
+            )
+            progress = self.start_progress + (self.end_progress - self.start_progress) * done_weight / total_weight
+
+            running = [
+                state["message"] or self._stages[name]["label"]
+                for name, state in self._states.items() if state["status"] == STAGE_RUNNING
+            ]
+            message = ", ".join(running) if running else "단계 처리 중..."
+            stages = {name: dict(state) for name, state in self._states.items()}
+            result = dict(self._progress_result) or None
+
+        progress_store.update(self.task_id, "processing", round(progress, 1), message, result, stages=stages)
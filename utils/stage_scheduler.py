@@ -0,0 +1,165 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import logger, IO_POOL_WORKERS, CPU_POOL_WORKERS, STAGE_CONCURRENCY
+from utils.queue_worker import stage_context
+
+# 풀 종류
+POOL_IO = "io"
+POOL_CPU = "cpu"
+
+# 단계 → 실행할 풀 (등록되지 않은 단계는 I/O 풀)
+STAGE_POOLS = {
+    "captions": POOL_IO,
+    "download": POOL_IO,
+    "enhance": POOL_IO,
+    "summary": POOL_IO,
+    "quiz": POOL_IO,
+    "study_plan": POOL_IO,
+    "document": POOL_CPU,
+    "extract_audio": POOL_CPU,
+    "prepare_audio": POOL_CPU,
+    "transcribe": POOL_CPU,
+    "index": POOL_CPU,
+}
+
+# 처리량 계산 구간(초)
+THROUGHPUT_WINDOW = 300
+
+
+class StageScheduler:
+    """
+    파이프라인 단계를 종류별 스레드 풀에 배정하는 스케줄러
+
+    - 다운로드/LLM 대기처럼 I/O를 기다리는 단계는 넓은 I/O 풀, ffmpeg/Whisper/임베딩은 좁은 CPU 풀에서 실행
+    - 단계별 동시 실행 한도는 호출 스레드에서 먼저 확보하므로, 한도에 막힌 단계가 풀 스레드를 점유하지 않는다.
+    - 호출 스레드의 단계 그래프 정보(stage_context)를 풀 스레드로 전달하여 진행 상황이 같은 단계로 기록된다.
+    - 단계별 완료/실패 수, 대기/실행 시간, 최근 처리량을 집계
+    """
+
+    def __init__(self, io_workers, cpu_workers, stage_pools, stage_limits):
+        self._pools = {
+            POOL_IO: ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="io-stage"),
+            POOL_CPU: ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="cpu-stage"),
+        }
+        self._pool_sizes = {POOL_IO: io_workers, POOL_CPU: cpu_workers}
+        self._stage_pools = dict(stage_pools)
+        self._limits = {stage: threading.BoundedSemaphore(limit) for stage, limit in stage_limits.items() if limit > 0}
+        self._stage_limits = dict(stage_limits)
+        self._local = threading.local()
+
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def run(self, stage, func, *args, **kwargs):
+        """단계 함수를 해당 풀에서 실행하고 결과를 기다려 반환 (예외는 그대로 전달)"""
+        pool = self._stage_pools.get(stage, POOL_IO)
+        queued_at = time.monotonic()
+        self._update(stage, pool, waiting=1)
+
+        # 같은 풀의 스레드에서 다시 호출하면 풀이 가득 찼을 때 교착되므로 바로 실행
+        if getattr(self._local, "pool", None) == pool:
+            return self._execute(stage, pool, queued_at, None, func, args, kwargs)
+
+        limit = self._limits.get(stage)
+        if limit is not None:
+            limit.acquire()
+        try:
+            context = (getattr(stage_context, "graph", None), getattr(stage_context, "stage", None))
+            future = self._pools[pool].submit(self._execute, stage, pool, queued_at, context, func, args, kwargs)
+            return future.result()
+        finally:
+            if limit is not None:
+                limit.release()
+
+    def _execute(self, stage, pool, queued_at, context, func, args, kwargs):
+        started = time.monotonic()
+        self._update(stage, pool, waiting=-1, running=1, wait_seconds=started - queued_at)
+
+        previous_pool = getattr(self._local, "pool", None)
+        self._local.pool = pool
+        if context is not None:
+            stage_context.graph, stage_context.stage = context
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self._update(stage, pool, running=-1, failed=1, run_seconds=time.monotonic() - started)
+            raise
+        finally:
+            self._local.pool = previous_pool
+            if context is not None:
+                stage_context.graph = stage_context.stage = None
+
+        elapsed = time.monotonic() - started
+        self._update(stage, pool, running=-1, completed=1, run_seconds=elapsed)
+        logger.info(f"단계 실행 완료: {stage} ({pool} 풀, {elapsed:.2f}초)")
+        return result
+
+    def _update(self, stage, pool, waiting=0, running=0, completed=0, failed=0, wait_seconds=0.0, run_seconds=0.0):
+        with self._lock:
+            stats = self._stats.get(stage)
+            if stats is None:
+                stats = self._stats[stage] = {
+                    "pool": pool, "waiting": 0, "running": 0, "completed": 0, "failed": 0,
+                    "wait_seconds": 0.0, "run_seconds": 0.0, "max_run_seconds": 0.0,
+                    "finished_at": deque()
+                }
+            stats["waiting"] += waiting
+            stats["running"] += running
+            stats["completed"] += completed
+            stats["failed"] += failed
+            stats["wait_seconds"] += wait_seconds
+            stats["run_seconds"] += run_seconds
+            stats["max_run_seconds"] = max(stats["max_run_seconds"], run_seconds)
+            if completed:
+                stats["finished_at"].append(time.monotonic())
+            self._trim(stats)
+
+    @staticmethod
+    def _trim(stats):
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW
+        finished_at = stats["finished_at"]
+        while finished_at and finished_at[0] < cutoff:
+            finished_at.popleft()
+
+    def get_stats(self):
+        """풀 크기, 단계별 한도와 대기/실행 수, 평균 시간, 최근 분당 처리량"""
+        stages = {}
+        with self._lock:
+            for stage, stats in self._stats.items():
+                self._trim(stats)
+                finished = stats["completed"] + stats["failed"]
+                stages[stage] = {
+                    "pool": stats["pool"],
+                    "limit": self._stage_limits.get(stage, self._pool_sizes[stats["pool"]]),
+                    "waiting": stats["waiting"],
+                    "running": stats["running"],
+                    "completed": stats["completed"],
+                    "failed": stats["failed"],
+                    "avg_wait_seconds": round(stats["wait_seconds"] / finished, 2) if finished else 0.0,
+                    "avg_run_seconds": round(stats["run_seconds"] / finished, 2) if finished else 0.0,
+                    "max_run_seconds": round(stats["max_run_seconds"], 2),
+                    "per_minute": round(len(stats["finished_at"]) * 60 / THROUGHPUT_WINDOW, 2)
+                }
+        return {"pools": dict(self._pool_sizes), "stages": stages}
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=False)
+
+
+# 공유 스케줄러
+stage_scheduler = StageScheduler(IO_POOL_WORKERS, CPU_POOL_WORKERS, STAGE_POOLS, STAGE_CONCURRENCY)
+
+def run_stage(stage, func, *args, **kwargs):
+    """단계 함수를 단계 종류에 맞는 풀에서 실행 (결과를 기다림)"""
+    return stage_scheduler.run(stage, func, *args, **kwargs)
+
+def get_stage_stats():
+    """단계별 처리량/대기 통계 반환"""
+    return stage_scheduler.get_stats()
+
+def shutdown_stage_scheduler():
+    """단계 스케줄러 풀 종료"""
+    stage_scheduler.shutdown()
@@ -0,0 +1,53 @@
+"""
+모델 미리 로드 / 모듈 import 시간 측정 CLI
+
+    python warmup.py                 # 모든 모델 로드 (처음 실행 시 가중치 다운로드)
+    python warmup.py whisper         # 지정한 모델만 로드
+    python warmup.py --imports-only  # 모듈별 import 시간만 출력
+
+이미지 빌드나 배포 직후 실행하면 첫 요청에서 모델을 내려받거나 로드하느라 지연되지 않는다.
+"""
+import sys
+import argparse
+
+from utils import import_timing
+import_timing.install()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="모델 미리 로드 및 import 시간 측정")
+    parser.add_argument("models", nargs="*", help="로드할 모델 이름 (생략 시 전체)")
+    parser.add_argument("--imports-only", action="store_true", help="모델은 로드하지 않고 import 시간만 출력")
+    args = parser.parse_args()
+
+    # 앱이 사용하는 모듈 import (모델 등록 포함, 워커는 시작하지 않음)
+    import main_processor  # noqa: F401
+    import ai_services.vector_db  # noqa: F401
+    from utils.model_loader import warm_up_models
+
+    report = import_timing.get_startup_report(limit=15)
+    print(f"모듈 import 시간: {report['import_seconds']}초")
+    for item in report["slowest_modules"]:
+        print(f"  {item['module']:<40} {item['self_seconds']:>7.3f}초 (하위 포함 {item['seconds']:.3f}초)")
+
+    if args.imports_only:
+        return 0
+
+    try:
+        status = warm_up_models(args.models or None)
+    except ValueError as e:
+        print(str(e))
+        return 2
+
+    failed = False
+    for name, model in status.items():
+        if model["error"]:
+            failed = True
+            print(f"모델 로드 실패: {name} - {model['error']}")
+        else:
+            print(f"모델 로드 완료: {name} ({model['load_seconds']}초)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
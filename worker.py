@@ -0,0 +1,144 @@
+"""
+독립 워커 프로세스
+
+    python worker.py               # MAX_WORKERS개의 조율 스레드로 작업 처리
+    python worker.py --threads 4
+    python worker.py --processes 3 # 모델을 로드한 뒤 워커 프로세스 3개를 fork (모델 메모리 공유)
+
+공유 작업 큐(SQLite)에서 작업을 가져와 처리하고, 진행 상황과 결과는 공유 저장소
+(STATE_FOLDER의 SQLite, RESULTS_FOLDER/DATA_FOLDER/INDEX_FOLDER의 파일)에 기록한다.
+같은 호스트 또는 공유 볼륨에서 여러 프로세스/컨테이너로 실행하면 처리량이 늘어난다.
+API 서버를 RUN_WORKERS_IN_APP=false로 실행하면 요청 접수/조회만 담당한다.
+gunicorn으로 실행하면(gunicorn.conf.py) 마스터가 run_supervisor로 워커 프로세스를 시작한다.
+"""
+import os
+import gc
+import sys
+import time
+import signal
+import argparse
+import threading
+
+from config import logger, MAX_WORKERS, MODEL_WARMUP_ON_START, WORKER_SHUTDOWN_TIMEOUT
+
+# 작업 큐/처리 모듈은 함수 안에서 import
+# (spawn으로 시작한 Whisper 변환 프로세스가 이 파일을 __mp_main__으로 다시 실행할 때 가져오지 않도록)
+
+
+def run_worker(threads=MAX_WORKERS, warm_up=MODEL_WARMUP_ON_START):
+    """현재 프로세스에서 작업 처리 (종료 신호를 받으면 처리 중인 작업을 마치고 0 반환)"""
+    from utils.queue_worker import worker_function, start_workers, stop_workers
+    from utils.model_loader import warm_up_models
+    from utils.stage_scheduler import shutdown_stage_scheduler
+    from main_processor import process_lecture
+    from ai_services.global_index import flush_global_index
+    from ai_services.whisper_pool import shutdown_transcription_pool
+
+    stop_event = threading.Event()
+
+    def handle_signal(signum, frame):
+        logger.info(f"종료 신호 수신 ({signal.Signals(signum).name}), 처리 중인 작업 완료 후 종료")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    worker_threads = start_workers(worker_function(process_lecture), threads)
+    logger.info(f"독립 워커 시작: 조율 스레드 {threads}개 (pid {os.getpid()})")
+
+    if warm_up:
+        threading.Thread(target=warm_up_models, daemon=True).start()
+
+    while not stop_event.is_set():
+        stop_event.wait(1)
+
+    # 새 작업은 가져가지 않고 처리 중인 작업은 기다림 (시간 초과 시 lease 만료 후 다른 워커가 재처리)
+    stop_workers(threads, worker_threads, WORKER_SHUTDOWN_TIMEOUT)
+    shutdown_stage_scheduler()
+    shutdown_transcription_pool()
+    flush_global_index()
+    logger.info(f"독립 워커 종료 (pid {os.getpid()})")
+    return 0
+
+
+def _fork_worker(threads):
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            code = run_worker(threads, warm_up=False)
+        except Exception as e:
+            logger.error(f"워커 프로세스 오류: {str(e)}")
+        finally:
+            # 부모에서 등록한 atexit 정리 함수가 자식에서 실행되지 않도록 바로 종료
+            os._exit(code)
+    return pid
+
+
+def run_supervisor(processes, threads=MAX_WORKERS, warm_up=MODEL_WARMUP_ON_START):
+    """
+    모델을 먼저 로드한 뒤 워커 프로세스를 processes개 fork (모델 메모리는 copy-on-write로 공유)
+    비정상 종료한 워커 프로세스는 다시 시작하고, 종료 신호를 받으면 워커에 전달한 뒤 모두 끝날 때까지 대기
+    fork 전에 스레드가 없어야 하므로 이 프로세스는 단일 스레드로 자식 프로세스만 관리한다.
+    """
+    from utils.model_loader import warm_up_models
+    # fork 전에 처리 모듈을 import하여 워커 프로세스가 공유
+    import main_processor  # noqa: F401
+
+    if warm_up:
+        warm_up_models()
+    # fork 이후 gc가 공유 객체의 참조 정보를 갱신하며 메모리 페이지를 복사하지 않도록 고정
+    gc.freeze()
+
+    stopping = False
+    children = set()
+
+    def handle_signal(signum, frame):
+        nonlocal stopping
+        if not stopping:
+            logger.info(f"종료 신호 수신 ({signal.Signals(signum).name}), 워커 프로세스 {len(children)}개 종료 대기")
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    for _ in range(processes):
+        children.add(_fork_worker(threads))
+    logger.info(f"워커 프로세스 {processes}개 시작 (프로세스당 조율 스레드 {threads}개)")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        if pid not in children:
+            continue
+        children.discard(pid)
+
+        if not stopping:
+            logger.warning(f"워커 프로세스 종료 (pid {pid}, 종료 코드 {os.waitstatus_to_exitcode(status)}), 다시 시작")
+            time.sleep(1)  # 시작 직후 계속 실패하는 경우 재시작 반복 완화
+            children.add(_fork_worker(threads))
+
+    logger.info("워커 프로세스 모두 종료")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="강의 처리 독립 워커")
+    parser.add_argument("--threads", type=int, default=MAX_WORKERS, help="프로세스당 작업 조율 스레드 수")
+    parser.add_argument("--processes", type=int, default=1, help="워커 프로세스 수 (2 이상이면 모델 로드 후 fork)")
+    args = parser.parse_args()
+
+    if args.processes > 1:
+        return run_supervisor(args.processes, args.threads)
+    return run_worker(args.threads)
+
+
+if __name__ == "__main__":
+    sys.exit(main())